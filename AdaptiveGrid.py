@@ -0,0 +1,154 @@
+"""
+Adaptive quadtree grid planner.
+
+Instead of one uniform grid at `radius_m * 0.8`, the planner starts from a
+coarse grid (cells `coarse_factor` times larger) and refines it from what the
+searches return:
+
+- a (cell, keyword) search that reaches the result ceiling is saturated —
+  Google cut the list — so the cell is split into 4 children at half the
+  radius, down to `min_radius_m`;
+- a search that comes back under the ceiling is not split, so an empty or
+  sparse cell costs one search per keyword however large it is;
+- a child quadrant in which the saturated parent's own search found no
+  place is skipped for that keyword.
+
+The skip rests on the parent's result set, never on a sibling's: the
+children that are kept are queued together, so an empty or failed child
+cannot hold the others back. Without the parent's places (a resumed or
+cached job) every child is queued.
+
+Jobs are (lat, lon, keyword, radius_m) tuples; the scraper honours the
+per-job radius. Feed every finished job back with `feedback()` to get the
+next round.
+"""
+
+import logging
+from typing import NamedTuple
+
+import numpy as np
+import shapely.geometry as geom
+from shapely.prepared import prep
+
+from Journal import job_key
+
+SPACING_FACTOR = 0.8   # grid spacing as a fraction of the search radius, as in Main
+
+
+class Cell(NamedTuple):
+    x: float            # center, EPSG:5880 meters
+    y: float
+    side: float
+    parent: tuple | None
+
+    @property
+    def id(self) -> tuple:
+        return round(self.x, 1), round(self.y, 1), round(self.side, 1)
+
+
+class AdaptivePlanner:
+    def __init__(self, ecity, radius_m: int, keywords: list, coarse_factor: int = 4,
+                 min_radius_m: float | None = None, ceiling: int = 110):
+        from pyproj import Transformer
+
+        self.ecity = ecity
+        self.area = prep(ecity)
+        self.radius_m = radius_m
+        self.keywords = list(keywords)
+        self.coarse_factor = coarse_factor
+        self.min_radius_m = min_radius_m or radius_m / 4
+        self.ceiling = ceiling
+        self.to_wgs = Transformer.from_crs("EPSG:5880", "EPSG:4326", always_xy=True)
+        self.to_m = Transformer.from_crs("EPSG:4326", "EPSG:5880", always_xy=True)
+
+        self.jobs_by_key: dict[tuple, tuple[Cell, str]] = {}
+        self.jobs_planned = 0
+        self.splits = 0
+        self.skipped = 0
+        self.saturated_leaves = 0
+
+    # ── geometry ──
+    def _intersects(self, x, y, side) -> bool:
+        h = side / 2
+        return self.area.intersects(geom.box(x - h, y - h, x + h, y + h))
+
+    def _root_cells(self) -> list[Cell]:
+        side = self.radius_m * SPACING_FACTOR * self.coarse_factor
+        minx, miny, maxx, maxy = self.ecity.bounds
+        return [
+            Cell(x, y, side, None)
+            for x in np.arange(minx + side / 2, maxx + side / 2, side)
+            for y in np.arange(miny + side / 2, maxy + side / 2, side)
+            if self._intersects(x, y, side)
+        ]
+
+    def _children(self, cell: Cell) -> list[Cell]:
+        q, side = cell.side / 4, cell.side / 2
+        return [
+            Cell(cell.x + dx, cell.y + dy, side, cell.id)
+            for dx in (-q, q) for dy in (-q, q)
+            if self._intersects(cell.x + dx, cell.y + dy, side)
+        ]
+
+    def _occupied(self, children: list[Cell], coords) -> list[Cell]:
+        """The children holding at least one of the parent's places (all of them if those are unknown)."""
+        if not coords:
+            return children
+        lats, lons = np.asarray(coords, dtype=float).T
+        xs, ys = self.to_m.transform(lons, lats)
+        return [
+            c for c in children
+            if np.any((np.abs(xs - c.x) <= c.side / 2) & (np.abs(ys - c.y) <= c.side / 2))
+        ]
+
+    def _job(self, cell: Cell, kw: str) -> tuple:
+        lon, lat = self.to_wgs.transform(cell.x, cell.y)
+        lat, lon = round(lat, 5), round(lon, 5)
+        self.jobs_by_key[job_key(lat, lon, kw)] = (cell, kw)
+        self.jobs_planned += 1
+        return lat, lon, kw, int(round(cell.side / SPACING_FACTOR))
+
+    # ── planning ──
+    def initial_jobs(self) -> list[tuple]:
+        roots = self._root_cells()
+        logging.info("🌳 Adaptive grid: %d coarse cells at %dm radius",
+                     len(roots), self.radius_m * self.coarse_factor)
+        return [self._job(cell, kw) for cell in roots for kw in self.keywords]
+
+    def feedback(self, outcomes) -> list[tuple]:
+        """
+        Takes (job, found[, coords]) from a finished round, ``coords`` being the
+        (lat, lon) of the places the search found; returns the next round.
+        """
+        next_jobs = []
+        for job, found, *coords in outcomes:
+            entry = self.jobs_by_key.pop(job_key(*job[:3]), None)
+            if entry is None:
+                continue
+            cell, kw = entry
+            if found is None or found < self.ceiling:
+                continue
+            children = self._children(cell)
+            if not children or cell.side / 2 / SPACING_FACTOR < self.min_radius_m:
+                self.saturated_leaves += 1
+                continue
+            self.splits += 1
+            kept = self._occupied(children, coords[0] if coords else None)
+            self.skipped += len(children) - len(kept)
+            next_jobs.extend(self._job(child, kw) for child in kept)
+        return next_jobs
+
+    def report(self, uniform_jobs: int) -> dict:
+        saved = uniform_jobs - self.jobs_planned
+        logging.info(
+            "🌳 Adaptive grid ran %d jobs vs %d uniform (%d saved, %.0f%%): "
+            "%d splits, %d empty quadrants skipped, %d cells still saturated at min radius",
+            self.jobs_planned, uniform_jobs, saved,
+            100 * saved / uniform_jobs if uniform_jobs else 0,
+            self.splits, self.skipped, self.saturated_leaves
+        )
+        return {
+            "jobs": self.jobs_planned, "uniform_jobs": uniform_jobs, "saved": saved,
+            "splits": self.splits, "skipped": self.skipped,
+            "saturated_leaves": self.saturated_leaves,
+        }
@@ -0,0 +1,395 @@
+"""
+Asyncio scraper: several tabs per Chrome, several Chromes per process.
+
+The Selenium scraper spends most of every job asleep, first waiting for the
+page and then for more cards after each scroll. Here every tab is a
+coroutine, so while one tab sleeps the others navigate, scroll and parse:
+
+    browsers × tabs  jobs in flight per process
+
+The tabs of one browser share its browser, GPU and network processes and its
+HTTP cache, so an extra tab costs a fraction of the memory of an extra Chrome.
+
+Chromium is driven through Playwright's async API, imported lazily so the
+Selenium path does not need it:
+
+    pip install playwright && playwright install chromium
+
+Everything after the panel HTML is in hand — radius filter, item building,
+panel recording, journal, Parquet sink, keyword pruning, stats — is inherited
+from GoogleMapsScraper.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import time
+
+from Metrics import JobTiming
+from Throttle import PAGE_PROBE_FN, PANEL_STATE_FN, classify_failure, pacing_delay, wait_for_turn
+from GoogleMapsScraper import (
+    _SCROLL_WAIT_FN, BLOCKED_URL_PATTERNS, CARD_SELECTOR, END_OF_LIST_SELECTOR, LEAN_ARGS,
+    STALL_WAITS, GoogleMapsScraper, _attempt_note, _wait_ms, extract_panel_items, search_url,
+)
+
+_SCROLL_JS = "panel => panel.scrollBy(0, panel.clientHeight)"
+
+# same probe as the Selenium path, in Playwright's (element, arg) form
+_PROBE_JS = """
+(panel, [cards, end]) => [
+    panel.querySelectorAll(cards).length,
+    panel.innerHTML.length,
+    panel.querySelector(end) !== null
+]
+"""
+
+# Chrome throttles timers and rendering in tabs it considers backgrounded;
+# here every tab is working, so that has to be off
+ASYNC_ARGS = [
+    "--lang=es-419",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+]
+
+
+class _Tab:
+    """One page plus the network counters fed by its CDP session."""
+
+    def __init__(self, name: str, page, cdp):
+        self.name = name
+        self.page = page
+        self.point_state: dict = {}
+        self.coords = None   # (lat, lon) of the places its last live search found
+        self.claims: list[int] = []   # places its current job built, claimed after hand-off
+        self.bytes = self.requests = self.blocked = 0
+        cdp.on("Network.loadingFinished", self._finished)
+        cdp.on("Network.loadingFailed", self._failed)
+
+    def _finished(self, params):
+        self.bytes += int(params.get("encodedDataLength", 0))
+        self.requests += 1
+
+    def _failed(self, params):
+        if params.get("blockedReason"):
+            self.blocked += 1
+
+    def take_network(self) -> dict:
+        """What the tab transferred since the last call."""
+        out = {"bytes": self.bytes, "requests": self.requests, "blocked": self.blocked}
+        self.bytes = self.requests = self.blocked = 0
+        return out
+
+
+class AsyncScraper(GoogleMapsScraper):
+    def __init__(self, city_name: str, radius_m: int = 1000, browsers: int = 1, tabs: int = 4,
+                 headless: bool = True, lean: bool = True, profile_dir: str | None = None,
+                 jobs: list | None = None, **kwargs):
+        if browsers < 1 or tabs < 1:
+            raise ValueError("browsers and tabs must both be at least 1")
+        super().__init__(None, jobs or [], city_name, radius_m, **kwargs)
+        self.browsers = browsers
+        self.tabs = tabs
+        self.headless = headless
+        self.lean = lean
+        self.profile_dir = profile_dir
+        self.worker_id = kwargs.get("worker_id", 0)
+        self.browser_mode = f"async-{'lean' if lean else 'full'}"
+        self.jobs_done = 0
+
+    # ── browsers and tabs ──
+    async def _open_context(self, pw, b: int):
+        args = ASYNC_ARGS + (LEAN_ARGS if self.lean else [])
+        viewport = {"width": 1024, "height": 768} if self.lean else {"width": 1920, "height": 1080}
+        if self.profile_dir:
+            # one profile per browser: Chrome locks a profile to a single process
+            path = os.path.abspath(os.path.join(self.profile_dir, f"worker-{self.worker_id}-b{b}"))
+            os.makedirs(path, exist_ok=True)
+            return await pw.chromium.launch_persistent_context(
+                path, headless=self.headless, args=args, viewport=viewport, locale="es-419"
+            )
+        browser = await pw.chromium.launch(headless=self.headless, args=args)
+        return await browser.new_context(viewport=viewport, locale="es-419")
+
+    async def _open_tabs(self, pw):
+        contexts, tabs = [], []
+        for b in range(self.browsers):
+            context = await self._open_context(pw, b)
+            contexts.append(context)
+            for t in range(self.tabs):
+                page = await context.new_page()
+                cdp = await context.new_cdp_session(page)
+                await cdp.send("Network.enable")
+                if self.lean:
+                    await cdp.send("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+                tabs.append(_Tab(f"b{b}t{t}", page, cdp))
+        logging.info("🗂️  Worker %s opened %d browser(s) × %d tabs (%s)",
+                     self.worker_id, self.browsers, self.tabs, self.browser_mode)
+        return contexts, tabs
+
+    # ── one job ──
+    async def _scroll_async(self, panel, s: dict):
+        if self.scroll_mode == "event":
+            return await self._scroll_event_async(panel, s)
+        # the legacy per-scroll parse has no async twin; it runs as incremental
+        return await self._scroll_incremental_async(panel, s)
+
+    async def _scroll_event_async(self, panel, s: dict):
+        """The event-driven scroll loop; Playwright awaits the observer's promise."""
+        t_start = time.perf_counter()
+        scrolls = n = stalls = 0
+        polled_chars = 0
+        reason = "max_scrolls"
+
+        while scrolls < s["scroll_max"]:
+            count, size, at_end, waited_ms = await panel.evaluate(
+                _SCROLL_WAIT_FN,
+                [CARD_SELECTOR, END_OF_LIST_SELECTOR,
+                 _wait_ms(self.pacer, s["min_wait_s"], s["scroll_timeout"])]
+            )
+            scrolls += 1
+            polled_chars += size
+            if at_end:
+                n, reason = count, "end_of_list"
+                break
+            if count > n:
+                n, stalls = count, 0
+                self.pacer.observe(waited_ms / 1000)
+            else:
+                stalls += 1
+                if stalls >= STALL_WAITS:
+                    reason = "stall"
+                    break
+
+        return self._scroll_done(await panel.inner_html(), scrolls, n, reason,
+                                 polled_chars, time.perf_counter() - t_start)
+
+    async def _scroll_incremental_async(self, panel, s: dict):
+        """The incremental scroll loop, sleeping with asyncio so other tabs run."""
+        t_start = time.perf_counter()
+        scrolls = 0
+        prev_n = n = 0
+        stall_time = 0
+        polled_chars = 0
+        reason = "max_scrolls"
+
+        while scrolls < s["scroll_max"]:
+            await panel.evaluate(_SCROLL_JS)
+            await asyncio.sleep(s["scroll_interval"])
+            scrolls += 1
+
+            n, size, at_end = await panel.evaluate(_PROBE_JS, [CARD_SELECTOR, END_OF_LIST_SELECTOR])
+            polled_chars += size
+
+            if at_end:
+                reason = "end_of_list"
+                break
+
+            if n > prev_n:
+                prev_n = n
+                stall_time = 0
+            else:
+                stall_time += s["scroll_interval"]
+
+            if stall_time >= s["scroll_timeout"]:
+                reason = "stall"
+                break
+
+        return self._scroll_done(await panel.inner_html(), scrolls, n, reason,
+                                 polled_chars, time.perf_counter() - t_start)
+
+    async def _scrape_job_async(self, tab: _Tab, idx, lat, lon, kw, radius_m=None, attempt=1):
+        """
+        Async twin of ``_scrape_job``. Returns (items, found, failed, outcome); the
+        journal checkpoint is written before returning.
+        """
+        if self.first_job_at is None:
+            self.first_job_at = time.time()
+        radius_m = radius_m or self.radius_m
+        s = self._job_settings(attempt)   # per job: tabs must not share escalated settings
+        page = tab.page
+        items, n_anchors, failed = [], None, True
+        page_ready_s = None
+        nav = None
+        outcome = "error"
+        places: list[int] = []
+        timeout_ms = s["wait_timeout"] * 1000
+        timing = JobTiming()   # wall-clock per tab: includes time other tabs held the loop
+        try:
+            lat, lon = float(lat), float(lon)
+            logging.info("Job %s: %s at (%.5f, %.5f)%s", idx, kw, lat, lon, _attempt_note(attempt, s))
+
+            with timing.phase("cache"):
+                cached = self._from_cache(lat, lon, kw, radius_m, places, tab.claims)
+            if cached is not None:
+                items, n_anchors = cached
+                failed, outcome = False, "cached"
+                return items, n_anchors, failed, outcome
+
+            with timing.phase("pace"):
+                delay = pacing_delay(self.throttle)
+                if delay:
+                    await asyncio.sleep(delay)
+            with timing.phase("navigate"):
+                nav = "full"   # each tab loads every search; in-page navigation is Selenium-only
+                await page.goto(search_url(kw, lat, lon, radius_m),
+                                wait_until="domcontentloaded", timeout=timeout_ms)
+            with timing.phase("wait_panel"):
+                state = await page.wait_for_function(PANEL_STATE_FN, timeout=timeout_ms, polling=500)
+            if await state.json_value() == "empty":
+                # Google answered: no results here (or one, opened as a place page)
+                logging.info("🔎 No result list for %s", kw)
+                items, n_anchors, failed, outcome = [], 0, False, "empty"
+                return items, n_anchors, failed, outcome
+            page_ready_s = timing.phases["navigate"] + timing.phases["wait_panel"]
+            with timing.phase("settle"):
+                await asyncio.sleep(1)
+
+            with timing.phase("scroll"):
+                panel = await page.query_selector(f"div[aria-label='Resultados de {kw}']")
+                if panel is None:
+                    raise RuntimeError(f"results panel for '{kw}' not found")
+                html, doc = await self._scroll_async(panel, s)
+            # set by _scroll_done in this same task, with no await in between
+            timing.move("scroll", "parse", self.last_parse_s)
+
+            if self.recorder is not None:
+                with timing.phase("record"):
+                    self.recorder.record(lat, lon, kw, radius_m, html)
+
+            stages, tab.coords = {}, []
+            items, n_anchors, skipped_outside_radius, skipped_seen = extract_panel_items(
+                self.parser, doc, lat, lon, kw, radius_m, stages, self.seen, places, tab.coords,
+                tab.claims
+            )
+            for stage, seconds in stages.items():
+                timing.add(stage, seconds)
+            logging.info("🔎 Found %d result links for %s", n_anchors, kw)
+            # a list with no result links is an answer too, as in the "empty" panel state
+            failed, outcome = False, "ok" if n_anchors else "empty"
+            if n_anchors:
+                with timing.phase("cache"):
+                    self._store_in_cache(lat, lon, kw, radius_m, html, items, n_anchors, skipped_seen)
+            if skipped_outside_radius:
+                logging.info("⛔ Filtered %d outside %dm radius", skipped_outside_radius, radius_m)
+            if skipped_seen:
+                logging.info("🧬 Skipped %d places already scraped by other jobs", skipped_seen)
+
+        except Exception as exc:
+            try:
+                page_info = await page.evaluate(PAGE_PROBE_FN)
+            except Exception:
+                page_info = None
+            failed, outcome = True, classify_failure(exc, page_info)
+            logging.error("Job %s failed (%s): %s", idx, outcome, exc)
+            self.error_logger.error(
+                "Job %s failed (%s) for %s at (%s,%s) %s",
+                idx, outcome, kw, lat, lon, repr(exc), exc_info=True
+            )
+            items = []
+        finally:
+            self._finish_job(idx, lat, lon, kw, items, "failed" if failed else "done",
+                             n_anchors, page_ready_s, tab.take_network(), outcome, timing, places, nav)
+
+        return items, n_anchors, failed, outcome
+
+    # ── scheduling ──
+    async def _tab_worker(self, tab: _Tab, local: asyncio.Queue, results, failed, progress_queue):
+        while True:
+            batch = await local.get()
+            if batch is None:
+                return
+            for job in batch:
+                self.jobs_done += 1
+                tab.coords, tab.claims = None, []
+                if self._skip_keyword(*job[:3], state=tab.point_state):
+                    found, outcome = None, "skipped"
+                else:
+                    items, found, job_failed, outcome = await self._scrape_job_async(
+                        tab, f"w{self.worker_id}/{tab.name}#{self.jobs_done}", *job
+                    )
+                    if job_failed:
+                        failed.append(tuple(job[:3]))
+                        tab.claims = []   # its places stay open to the retry
+                    elif self.sink is None:
+                        results.extend(items)   # with a sink the rows already live there
+                if progress_queue is not None:
+                    progress_queue.put((self.worker_id, self.jobs_done, self.rows_total,
+                                        len(failed), tuple(job), found, outcome, tab.coords))
+                self._claim(tab.claims)
+
+    async def _run(self, feed, progress_queue=None):
+        from playwright.async_api import async_playwright
+
+        results: list[dict] = []
+        failed: list[tuple] = []
+        n_tabs = self.browsers * self.tabs
+        # bounded so a process only holds as many batches as it has tabs;
+        # the rest stay in the shared queue for other processes to steal
+        local: asyncio.Queue = asyncio.Queue(maxsize=n_tabs)
+        t0 = time.perf_counter()
+
+        async with async_playwright() as pw:
+            contexts, tabs = await self._open_tabs(pw)
+            try:
+                await asyncio.gather(
+                    feed(local, n_tabs),
+                    *(self._tab_worker(tab, local, results, failed, progress_queue) for tab in tabs),
+                )
+            finally:
+                for context in contexts:
+                    await context.close()
+                self._close_stores()
+
+        elapsed = time.perf_counter() - t0
+        logging.info("🗂️  Worker %s: %d jobs in %.0f s with %d tabs (%.1f jobs/min)",
+                     self.worker_id, self.jobs_done, elapsed, n_tabs,
+                     60 * self.jobs_done / elapsed if elapsed else 0)
+        return results, failed
+
+    def _finish(self, results, failed):
+        self._log_scroll_savings()
+        self._log_page_stats()
+        self._log_outcomes()
+        df = self._to_frame(results)
+        logging.info("✅ Worker %s finished %d jobs: %d rows, %d failed",
+                     self.worker_id, self.jobs_done, self.rows_total, len(failed))
+        return df, failed
+
+    def scrape(self):
+        """Runs ``self.jobs``; jobs at the same point stay on one tab for keyword pruning."""
+        def point(job):
+            return round(float(job[0]), 5), round(float(job[1]), 5)
+
+        batches = [list(group) for _, group in itertools.groupby(self.jobs, key=point)] \
+            if self.keyword_policy else [[job] for job in self.jobs]
+
+        async def feed(local, n_tabs):
+            for batch in batches:
+                await local.put(batch)
+            for _ in range(n_tabs):
+                await local.put(None)
+
+        return self._finish(*asyncio.run(self._run(feed)))
+
+    def scrape_queue(self, job_queue, progress_queue=None, worker_id: int = 0):
+        """
+        Same contract as ``GoogleMapsScraper.scrape_queue``: pulls batches from the
+        shared queue until its ``None`` sentinel and reports every job on
+        ``progress_queue``, but spreads the batches over all of this process's tabs.
+        """
+        self.worker_id = worker_id
+
+        async def feed(local, n_tabs):
+            loop = asyncio.get_running_loop()
+            while True:
+                await loop.run_in_executor(None, wait_for_turn, self.throttle, worker_id)
+                batch = await loop.run_in_executor(None, job_queue.get)
+                if batch is None:
+                    break
+                await local.put(batch)
+            for _ in range(n_tabs):
+                await local.put(None)
+
+        return self._finish(*asyncio.run(self._run(feed, progress_queue)))
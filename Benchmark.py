@@ -0,0 +1,136 @@
+"""
+Offline replay benchmark for the parsing pipeline.
+
+Replays a corpus recorded with `GoogleMapsScraper(record_dir=...)` through
+parse → radius filter → card lookup → build_item, without a browser, and
+reports cards/sec, per-stage latency percentiles and peak memory. With a
+golden file it doubles as a regression check on the extracted fields.
+
+Usage:
+    python Benchmark.py fixtures/ --parser lxml --golden fixtures/golden.json.gz
+    python Benchmark.py fixtures/ --golden fixtures/golden.json.gz --update-golden
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import resource
+import sys
+import time
+
+import numpy as np
+
+from GoogleMapsScraper import clean_text, extract_panel_items
+from ParserBackend import get_backend
+from Replay import load_corpus, panel_key
+
+STAGES = ["parse", "radius_filter", "card_lookup", "build_item"]
+
+
+def run_benchmark(corpus_path: str, parser: str = "lxml", repeat: int = 1):
+    backend = get_backend(parser, clean_text)
+    records = list(load_corpus(corpus_path))
+    stage_times = {stage: [] for stage in STAGES}
+    outputs = {}
+    n_cards = 0
+    total_s = 0.0
+
+    for rnd in range(repeat):
+        seen = {}
+        for rec in records:
+            timings = {}
+            t0 = time.perf_counter()
+            doc = backend.parse(rec["html"])
+            timings["parse"] = time.perf_counter() - t0
+            items, _, _, _ = extract_panel_items(
+                backend, doc, rec["latitude"], rec["longitude"],
+                rec["keyword"], rec["radius_m"], timings=timings
+            )
+            for stage in STAGES:
+                stage_times[stage].append(timings[stage])
+            total_s += sum(timings.values())
+            n_cards += len(items)
+            if rnd == 0:
+                # the same job can be recorded twice (e.g. a retry)
+                key = panel_key(rec)
+                seen[key] = seen.get(key, 0) + 1
+                outputs[f"{key}#{seen[key]}" if seen[key] > 1 else key] = items
+
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+    return {
+        "parser": backend.name,
+        "panels": len(records) * repeat,
+        "cards": n_cards,
+        "seconds": total_s,
+        "cards_per_s": n_cards / total_s if total_s else 0.0,
+        "stages_ms": {
+            stage: {
+                f"p{q}": float(np.percentile(vals, q)) * 1000 if vals else 0.0
+                for q in (50, 95, 99)
+            }
+            for stage, vals in stage_times.items()
+        },
+        "peak_rss_mb": peak_mb,
+    }, outputs
+
+
+def compare_golden(outputs: dict, golden_path: str) -> list[str]:
+    with gzip.open(golden_path, "rt", encoding="utf-8") as f:
+        golden = json.load(f)
+    problems = []
+    for key in sorted(set(golden) | set(outputs)):
+        if key not in outputs:
+            problems.append(f"{key}: missing from replay")
+        elif key not in golden:
+            problems.append(f"{key}: not in golden set")
+        elif outputs[key] != golden[key]:
+            problems.append(f"{key}: {len(outputs[key])} items differ from golden ({len(golden[key])})")
+    return problems
+
+
+def write_golden(outputs: dict, golden_path: str) -> None:
+    with gzip.open(golden_path, "wt", encoding="utf-8") as f:
+        json.dump(outputs, f, ensure_ascii=False, sort_keys=True)
+
+
+def print_report(report: dict) -> None:
+    print(f"Parser: {report['parser']}  panels: {report['panels']}  cards: {report['cards']}")
+    print(f"Throughput: {report['cards_per_s']:.0f} cards/s  ({report['seconds']:.3f}s in pipeline)")
+    print(f"Peak RSS: {report['peak_rss_mb']:.1f} MB")
+    print(f"{'stage':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, pct in report["stages_ms"].items():
+        print(f"{stage:<14}{pct['p50']:>10.3f}{pct['p95']:>10.3f}{pct['p99']:>10.3f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay recorded panels through the parsing pipeline.")
+    ap.add_argument("corpus", help="fixture file or directory of *.jsonl.gz panels")
+    ap.add_argument("--parser", default="lxml", choices=["lxml", "bs4"])
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--golden", help="golden outputs (.json.gz) to check against")
+    ap.add_argument("--update-golden", action="store_true", help="overwrite the golden file")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report, outputs = run_benchmark(args.corpus, args.parser, args.repeat)
+    print_report(report)
+
+    if args.golden and args.update_golden:
+        write_golden(outputs, args.golden)
+        print(f"✅ Golden set written to {args.golden} ({len(outputs)} panels)")
+    elif args.golden:
+        problems = compare_golden(outputs, args.golden)
+        if problems:
+            print(f"❌ {len(problems)} panels differ from the golden set:")
+            for p in problems:
+                print("  " + p)
+            sys.exit(1)
+        print(f"✅ Outputs match the golden set ({len(outputs)} panels)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+"""
+Job queue with time-limited leases, shared by workers on any number of hosts.
+
+`SqliteBroker` keeps the jobs, their leases and the uploaded items in one
+SQLite file (WAL mode), so every process on one box can share it directly.
+Other hosts reach it through `BrokerServer`, a small JSON-over-HTTP front
+end (standard library only), with `HttpBroker` as the client; both expose
+the same methods, and `open_broker` picks one from a path or URL. The server
+listens on 127.0.0.1 unless told otherwise and answers only requests that
+carry its shared token in the `X-Broker-Token` header (clients read it from
+$BROKER_TOKEN): anyone else who reached the port could complete jobs with
+made-up items or fail them into dead letters. `HttpBroker` retries calls
+through short outages; each logical call carries one `X-Request-Id` over
+all its attempts, and the server answers a repeated id with the first
+result, so a retried `claim` or `fail` whose response was lost is not
+applied twice.
+
+A worker `claim`s a few jobs at a time and holds each under a lease it
+renews with `heartbeat`. A job is finished by `complete` (with its items)
+or `fail`; a failed job goes back to pending after the same backoff as the
+in-process retries (Retry.py), and becomes a dead letter once it has used up
+``max_attempts``. A lease that runs out — its worker died or lost the
+network — counts as a failed attempt ("lease_expired") and the job is
+handed to the next worker that claims. A late `complete` from the old
+holder is still accepted while the job is not done, so no finished work is
+thrown away; a second completion of a done job is ignored.
+"""
+
+import hmac
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Retry import backoff_delay
+
+LEASE_S = 300   # seconds a claim is valid without a heartbeat
+TOKEN_HEADER = "X-Broker-Token"
+TOKEN_ENV = "BROKER_TOKEN"
+REQUEST_ID_HEADER = "X-Request-Id"
+REPLIES_KEPT = 4096   # results the server remembers for retried requests
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY,
+    latitude    REAL NOT NULL,
+    longitude   REAL NOT NULL,
+    keyword     TEXT NOT NULL,
+    radius_m    INTEGER NOT NULL DEFAULT 0,        -- 0: the scraper's own radius
+    state       TEXT NOT NULL DEFAULT 'pending',   -- pending, leased, done, dead
+    attempts    INTEGER NOT NULL DEFAULT 0,        -- failed attempts so far
+    not_before  REAL NOT NULL DEFAULT 0,
+    owner       TEXT,
+    lease_until REAL,
+    outcome     TEXT,
+    found       INTEGER,
+    updated_at  REAL NOT NULL,
+    UNIQUE (latitude, longitude, keyword, radius_m)
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, not_before);
+CREATE TABLE IF NOT EXISTS items (
+    job  INTEGER NOT NULL,
+    item TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_job ON items (job);
+CREATE TABLE IF NOT EXISTS workers (
+    name      TEXT PRIMARY KEY,
+    host      TEXT,
+    last_seen REAL NOT NULL,
+    done      INTEGER NOT NULL DEFAULT 0,
+    failed    INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+DEFAULT_POLICY = {"max_attempts": 3, "base_delay_s": 30.0, "max_delay_s": 600.0}
+
+
+class SqliteBroker:
+    """
+    The broker itself. The retry policy is stored with the jobs, so worker
+    processes opening the same file apply the coordinator's; pass it only
+    when creating or changing it.
+    """
+
+    def __init__(self, path: str, max_attempts: int | None = None, base_delay_s: float | None = None,
+                 max_delay_s: float | None = None):
+        self.path = path
+        # one connection, shared by the HTTP server's threads under a lock
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        policy = {**DEFAULT_POLICY, **self.meta().get("policy", {})}
+        given = {"max_attempts": max_attempts, "base_delay_s": base_delay_s, "max_delay_s": max_delay_s}
+        policy.update({k: v for k, v in given.items() if v is not None})
+        if any(v is not None for v in given.values()):
+            self._set_meta({"policy": policy})
+        self.max_attempts = policy["max_attempts"]
+        self.base_delay_s = policy["base_delay_s"]
+        self.max_delay_s = policy["max_delay_s"]
+
+    def _set_meta(self, meta: dict) -> None:
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                  [(k, json.dumps(v)) for k, v in meta.items()])
+
+    # ── coordinator side ──
+    def add_jobs(self, jobs, meta: dict | None = None) -> int:
+        """Queues (lat, lon, kw[, radius_m]) jobs not queued before; returns how many were new."""
+        rows = [(round(float(j[0]), 5), round(float(j[1]), 5), str(j[2]),
+                 int(j[3]) if len(j) > 3 and j[3] else 0, time.time()) for j in jobs]
+        with self.lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (latitude, longitude, keyword, radius_m, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+            added = self.conn.total_changes - before
+        if meta:
+            self._set_meta(meta)
+        return added
+
+    def meta(self) -> dict:
+        with self.lock:
+            rows = self.conn.execute("SELECT key, value FROM meta").fetchall()
+        return {k: json.loads(v) for k, v in rows}
+
+    def counts(self) -> dict:
+        with self.lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        out = {"pending": 0, "leased": 0, "done": 0, "dead": 0}
+        out.update(dict(rows))
+        return out
+
+    def finished(self) -> bool:
+        c = self.counts()
+        return c["pending"] == 0 and c["leased"] == 0
+
+    def workers(self, since_s: float = LEASE_S) -> list[dict]:
+        """Workers seen in the last ``since_s`` seconds, with their done/failed counts."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT name, host, last_seen, done, failed FROM workers WHERE last_seen >= ? ORDER BY name",
+                (time.time() - since_s,)).fetchall()
+        return [dict(zip(("name", "host", "last_seen", "done", "failed"), r)) for r in rows]
+
+    def load_items(self) -> list[dict]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT item FROM items JOIN jobs ON jobs.id = items.job "
+                "WHERE jobs.state = 'done' ORDER BY items.rowid").fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def found_counts(self) -> dict[tuple[float, float, str], int | None]:
+        """Result links found per done job, keyed like JobJournal.found_counts."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT latitude, longitude, keyword, found FROM jobs WHERE state = 'done'").fetchall()
+        return {(r[0], r[1], r[2]): r[3] for r in rows}
+
+    def failed_jobs(self) -> list[tuple[float, float, str]]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT latitude, longitude, keyword FROM jobs WHERE state = 'dead'").fetchall()
+        return [tuple(r) for r in rows]
+
+    def dead_letters(self) -> list[tuple]:
+        """(lat, lon, kw, radius_m, attempts, last_outcome) per dead job, as Retry.write_dead_letters expects."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT latitude, longitude, keyword, radius_m, attempts, outcome FROM jobs "
+                "WHERE state = 'dead' ORDER BY id").fetchall()
+        return [(lat, lon, kw, radius or None, attempts, outcome)
+                for lat, lon, kw, radius, attempts, outcome in rows]
+
+    # ── worker side ──
+    def _seen(self, worker: str, host: str | None = None, done: int = 0, failed: int = 0) -> None:
+        self.conn.execute(
+            """
+            INSERT INTO workers (name, host, last_seen, done, failed) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET
+                host = COALESCE(excluded.host, workers.host),
+                last_seen = excluded.last_seen,
+                done = workers.done + excluded.done,
+                failed = workers.failed + excluded.failed
+            """, (worker, host, time.time(), done, failed))
+
+    def _expire_leases(self, now: float) -> None:
+        expired = self.conn.execute(
+            "SELECT id, owner, attempts FROM jobs WHERE state = 'leased' AND lease_until < ?", (now,)
+        ).fetchall()
+        for job_id, owner, attempts in expired:
+            logging.warning("⏳ Lease on job %d held by %s expired; re-queued", job_id, owner)
+            self._failed(job_id, attempts, "lease_expired", now)
+
+    def _failed(self, job_id: int, attempts: int, outcome: str, now: float) -> None:
+        attempts += 1
+        if attempts >= self.max_attempts:
+            self.conn.execute(
+                "UPDATE jobs SET state = 'dead', attempts = ?, outcome = ?, owner = NULL, "
+                "lease_until = NULL, updated_at = ? WHERE id = ?", (attempts, outcome, now, job_id))
+        else:
+            not_before = now + backoff_delay(attempts, self.base_delay_s, self.max_delay_s)
+            self.conn.execute(
+                "UPDATE jobs SET state = 'pending', attempts = ?, outcome = ?, not_before = ?, "
+                "owner = NULL, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (attempts, outcome, not_before, now, job_id))
+
+    def reap(self) -> None:
+        """Re-queues jobs whose lease ran out, without waiting for the next claim."""
+        with self.lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._expire_leases(time.time())
+
+    def claim(self, worker: str, n: int = 1, lease_s: float = LEASE_S,
+              host: str | None = None) -> list[tuple]:
+        """
+        Leases up to ``n`` due jobs to ``worker``; returns [(job_id, (lat, lon,
+        kw, radius_m, attempt))], where ``attempt`` counts from 1 and drives
+        the scraper's escalation (Retry.escalate).
+        """
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._expire_leases(now)
+            rows = self.conn.execute(
+                "SELECT id, latitude, longitude, keyword, radius_m, attempts FROM jobs "
+                "WHERE state = 'pending' AND not_before <= ? ORDER BY id LIMIT ?", (now, n)
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET state = 'leased', owner = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                [(worker, now + lease_s, now, r[0]) for r in rows])
+            self._seen(worker, host)
+        return [(r[0], (r[1], r[2], r[3], r[4] or None, r[5] + 1)) for r in rows]
+
+    def heartbeat(self, worker: str, job_ids, lease_s: float = LEASE_S) -> list[int]:
+        """Renews the worker's leases; returns the ids it no longer holds."""
+        now = time.time()
+        job_ids = list(job_ids)
+        with self.lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._seen(worker)
+            lost = []
+            for job_id in job_ids:
+                cur = self.conn.execute(
+                    "UPDATE jobs SET lease_until = ? WHERE id = ? AND state = 'leased' AND owner = ?",
+                    (now + lease_s, job_id, worker))
+                if not cur.rowcount:
+                    lost.append(job_id)
+        return lost
+
+    def complete(self, worker: str, job_id: int, items=(), found: int | None = None) -> bool:
+        """Stores a finished job's items; False if the job was already done."""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            state = self.conn.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if state is None or state[0] == "done":
+                return False
+            self.conn.execute("DELETE FROM items WHERE job = ?", (job_id,))
+            self.conn.executemany("INSERT INTO items (job, item) VALUES (?, ?)",
+                                  [(job_id, json.dumps(it, ensure_ascii=False)) for it in items])
+            self.conn.execute(
+                "UPDATE jobs SET state = 'done', outcome = 'ok', found = ?, owner = NULL, "
+                "lease_until = NULL, updated_at = ? WHERE id = ?", (found, now, job_id))
+            self._seen(worker, done=1)
+        return True
+
+    def fail(self, worker: str, job_id: int, outcome: str = "error") -> bool:
+        """Re-queues a failed job after a backoff, or retires it; False if the worker no longer held it."""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute(
+                "SELECT attempts FROM jobs WHERE id = ? AND state = 'leased' AND owner = ?",
+                (job_id, worker)).fetchone()
+            # a worker that no longer holds the lease costs the job no attempt
+            self._seen(worker, failed=int(row is not None))
+            if row is None:
+                return False
+            self._failed(job_id, row[0], outcome, now)
+        return True
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+# ── HTTP front end, for workers on other hosts ──
+METHODS = ("claim", "heartbeat", "complete", "fail", "meta", "counts", "finished")
+
+
+class _Replies:
+    """The last REPLIES_KEPT results by request id; a repeated id waits for and gets the first one."""
+
+    def __init__(self, size: int = REPLIES_KEPT):
+        self.size = size
+        self.lock = threading.Lock()
+        self.done: OrderedDict = OrderedDict()
+        self.running: dict[str, threading.Event] = {}
+
+    def run(self, request_id: str | None, call):
+        if not request_id:
+            return call()
+        with self.lock:
+            if request_id in self.done:
+                return self.done[request_id]
+            event = self.running.get(request_id)
+            if event is None:
+                event = self.running[request_id] = threading.Event()
+                first = True
+            else:
+                first = False
+        if not first:
+            # the first attempt is still running; if it raises, this one runs the call
+            event.wait()
+            return self.run(request_id, call)
+        try:
+            result = call()
+            with self.lock:
+                self.done[request_id] = result
+                while len(self.done) > self.size:
+                    self.done.popitem(last=False)
+            return result
+        finally:
+            with self.lock:
+                self.running.pop(request_id, None)
+            event.set()
+
+
+class BrokerServer:
+    """Serves a SqliteBroker's worker methods as POST /<method> with JSON keyword arguments."""
+
+    def __init__(self, broker: SqliteBroker, token: str, host: str = "127.0.0.1", port: int = 8765):
+        if not token:
+            raise ValueError("BrokerServer needs a shared token")
+        expected = token.encode("utf-8")
+        replies = _Replies()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                given = self.headers.get(TOKEN_HEADER, "").encode("utf-8")
+                if not hmac.compare_digest(given, expected):
+                    self.send_error(401, "missing or wrong broker token")
+                    return
+                method = self.path.strip("/")
+                if method not in METHODS:
+                    self.send_error(404, f"unknown method {method}")
+                    return
+                try:
+                    kwargs = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                    result = replies.run(self.headers.get(REQUEST_ID_HEADER),
+                                         lambda: getattr(broker, method)(**kwargs))
+                    body = json.dumps({"result": result}).encode("utf-8")
+                except Exception as exc:
+                    logging.exception("Broker call %s failed", method)
+                    self.send_error(500, str(exc))
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):   # one line per call is too chatty
+                logging.debug("broker http: " + fmt, *args)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        name = socket.gethostname() if host in ("", "0.0.0.0", "::") else host
+        self.url = f"http://{name}:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self) -> "BrokerServer":
+        self.thread.start()
+        logging.info("📡 Broker listening on %s", self.url)
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class HttpBroker:
+    """
+    Client for BrokerServer with SqliteBroker's worker methods; retries through
+    short outages under one request id, so the server applies a call only once.
+    """
+
+    def __init__(self, url: str, token: str | None = None, retries: int = 5, timeout_s: float = 30.0):
+        self.url = url.rstrip("/")
+        self.headers = {"Content-Type": "application/json"}
+        if token:
+            self.headers[TOKEN_HEADER] = token
+        self.retries = retries
+        self.timeout_s = timeout_s
+
+    def _call(self, method: str, **kwargs):
+        data = json.dumps(kwargs).encode("utf-8")
+        headers = {**self.headers, REQUEST_ID_HEADER: uuid.uuid4().hex}
+        for attempt in range(1, self.retries + 1):
+            req = urllib.request.Request(f"{self.url}/{method}", data=data, headers=headers)
+            try:
+                with urllib.request.urlopen(req, timeout=self.timeout_s) as resp:
+                    return json.loads(resp.read())["result"]
+            except (urllib.error.URLError, ConnectionError, TimeoutError) as exc:
+                if isinstance(exc, urllib.error.HTTPError) and exc.code < 500:
+                    raise
+                if attempt == self.retries:
+                    raise
+                logging.warning("📡 Broker %s unreachable (%s); retrying", self.url, exc)
+                time.sleep(min(2 ** attempt, 30))
+
+    def claim(self, worker, n=1, lease_s=LEASE_S, host=None):
+        return [(job_id, tuple(job)) for job_id, job in
+                self._call("claim", worker=worker, n=n, lease_s=lease_s, host=host)]
+
+    def heartbeat(self, worker, job_ids, lease_s=LEASE_S):
+        return self._call("heartbeat", worker=worker, job_ids=list(job_ids), lease_s=lease_s)
+
+    def complete(self, worker, job_id, items=(), found=None):
+        return self._call("complete", worker=worker, job_id=job_id, items=list(items), found=found)
+
+    def fail(self, worker, job_id, outcome="error"):
+        return self._call("fail", worker=worker, job_id=job_id, outcome=outcome)
+
+    def meta(self):
+        return self._call("meta")
+
+    def counts(self):
+        return self._call("counts")
+
+    def finished(self):
+        return self._call("finished")
+
+    def close(self) -> None:
+        pass
+
+
+def open_broker(spec: str, token: str | None = None, **kwargs):
+    """HttpBroker for an http(s):// URL (token from $BROKER_TOKEN by default), else a SqliteBroker on that file."""
+    if spec.startswith(("http://", "https://")):
+        return HttpBroker(spec, token or os.environ.get(TOKEN_ENV))
+    return SqliteBroker(spec, **kwargs)
@@ -1,11 +1,13 @@
 import geopandas as gpd
-import shapely.geometry as geom
 import numpy as np
 import sys, unicodedata, re
 from typing import List, Tuple
 
 AREANAME = "ADM1_ES"
 CODENAME = "ADM1_PCODE"
+# points of a hex lattice per point of the square grid it replaces: a hex
+# cell covers step²·√3/2 = 1.5·(√3/2)·s² against s² for a square cell
+HEX_POINT_SHARE = 1 / (1.5 * np.sqrt(3) / 2)
 
 def normalize_string(text: str) -> str:
     return re.sub(
@@ -16,10 +18,8 @@ def normalize_string(text: str) -> str:
                    .lower().strip()
     )
 
-def build_grid_from_shapefile(
-    shapefile_path: str,
-    spacing: float = 1000
-) -> Tuple[List[Tuple[float, float]], str]:
+def select_department(shapefile_path: str):
+    """Prompts for a department and returns (its geometry in EPSG:5880, city_name)."""
     gdf = gpd.read_file(shapefile_path)
     clean_cols = [c for c in gdf.columns if c.lower().startswith("cleaned")]
     match_col = clean_cols[0] if clean_cols else AREANAME
@@ -41,16 +41,75 @@ def build_grid_from_shapefile(
         gpd.GeoSeries([geom_union], crs=gdf.crs)
         .to_crs(epsg=5880).iloc[0]
     )
+    return ecity, city_name
+
+
+def _hex_rows(minx, miny, maxx, maxy, spacing):
+    """Row (y, x-offset, step) tuples of a hex lattice with the square grid's coverage."""
+    # a square grid with spacing s leaves no point farther than s/√2 from a
+    # grid point; a hex lattice with the same covering radius needs a step
+    # of s·√1.5 and rows (√3/2)·step apart, i.e. ~23% fewer points
+    step = spacing * np.sqrt(1.5)
+    dy = step * np.sqrt(3) / 2
+    for i, y in enumerate(np.arange(miny, maxy + dy, dy)):
+        yield y, (step / 2 if i % 2 else 0.0), step
+
+
+def grid_from_geometry(ecity, spacing: float = 1000, layout: str = "square",
+                       tile_size: int = 1_000_000) -> List[Tuple[float, float]]:
+    """
+    Grid (EPSG:5880 meters) inside `ecity`, as rounded (lat, lon) pairs.
+
+    Point-in-polygon runs vectorized against the prepared geometry, over
+    tiles of at most `tile_size` candidate points so memory stays bounded for
+    large departments. `layout="hex"` lays a hexagonal lattice with the same
+    worst-case distance to the nearest point as the square grid.
+    """
+    import shapely
+    from pyproj import Transformer
+
+    if layout not in ("square", "hex"):
+        raise ValueError(f"Unknown grid layout '{layout}'")
+
+    shapely.prepare(ecity)
+    to_wgs = Transformer.from_crs("EPSG:5880", "EPSG:4326", always_xy=True)
     minx, miny, maxx, maxy = ecity.bounds
-    xs = np.arange(minx, maxx + spacing, spacing)
-    ys = np.arange(miny, maxy + spacing, spacing)
-    pts = [
-        geom.Point(x, y)
-        for x in xs for y in ys
-        if ecity.contains(geom.Point(x, y))
-    ]
-
-    grid = gpd.GeoSeries(pts, crs="EPSG:5880").to_crs(epsg=4326)
-    coords = [(round(pt.y, 5), round(pt.x, 5)) for pt in grid]
+
+    def tiles():
+        if layout == "square":
+            xs = np.arange(minx, maxx + spacing, spacing)
+            ys = np.arange(miny, maxy + spacing, spacing)
+            cols = max(1, tile_size // max(len(ys), 1))
+            # x-major order, same as the original point-by-point loop
+            for i in range(0, len(xs), cols):
+                gx, gy = np.meshgrid(xs[i:i + cols], ys, indexing="ij")
+                yield gx.ravel(), gy.ravel()
+        else:
+            bx, by = [], []
+            for y, offset, step in _hex_rows(minx, miny, maxx, maxy, spacing):
+                row = np.arange(minx + offset, maxx + step, step)
+                bx.append(row)
+                by.append(np.full(len(row), y))
+                if sum(map(len, bx)) >= tile_size:
+                    yield np.concatenate(bx), np.concatenate(by)
+                    bx, by = [], []
+            if bx:
+                yield np.concatenate(bx), np.concatenate(by)
+
+    coords = []
+    for tx, ty in tiles():
+        inside = shapely.contains_xy(ecity, tx, ty)
+        lon, lat = to_wgs.transform(tx[inside], ty[inside])
+        coords.extend(zip(np.round(lat, 5).tolist(), np.round(lon, 5).tolist()))
+    return coords
+
+
+def build_grid_from_shapefile(
+    shapefile_path: str,
+    spacing: float = 1000,
+    layout: str = "square"
+) -> Tuple[List[Tuple[float, float]], str]:
+    ecity, city_name = select_department(shapefile_path)
+    coords = grid_from_geometry(ecity, spacing, layout)
     print(f"Retained {len(coords)} grid points inside {city_name}.")
-    return coords, city_name
\ No newline at end of file
+    return coords, city_name
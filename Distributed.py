@@ -0,0 +1,290 @@
+"""
+Coordinator/worker mode: one department split across any number of hosts.
+
+The coordinator queues the department's jobs (GridLoader, as in Main) on a
+broker (Broker.py) and optionally serves it over HTTP; workers on any host
+claim jobs under a lease, scrape them with the scraper `Main` configures,
+and upload each job's items as soon as it finishes. When no job is pending
+or leased any more, the coordinator merges the uploaded items into
+results_<CITY>.csv, post-processes it and writes the dead letters, like a
+local run.
+
+Inside a worker process, a `BrokerLink` is all three things the scraper
+already talks to: its job queue (`get` claims a batch), its progress queue
+(`put` completes or fails each job's lease) and its journal (`record` hands
+over the items). A background thread renews the leases of the jobs it holds.
+
+Usage (one box, several worker processes, SQLite broker):
+    python Distributed.py coordinator ASUNCIÓN_grid.csv ASUNCIÓN --local-workers 3
+
+Several hosts (the coordinator serves its broker over HTTP; every request
+must carry the shared token, taken from $BROKER_TOKEN or generated and
+logged by the coordinator):
+    BROKER_TOKEN=<secret> python Distributed.py coordinator ASUNCIÓN_grid.csv ASUNCIÓN \
+        --serve 8765 --bind 0.0.0.0
+    BROKER_TOKEN=<secret> python Distributed.py worker http://<coordinator-host>:8765 --processes 3
+"""
+
+import argparse
+import logging
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from Broker import LEASE_S, TOKEN_ENV, BrokerServer, SqliteBroker, open_broker
+from JobOrder import order_jobs
+from Journal import job_key
+from Retry import RETRYABLE, write_dead_letters
+
+
+class BrokerLink:
+    """A worker process's job queue, progress queue and journal, backed by the broker."""
+
+    def __init__(self, broker, worker: str, batch: int = 2, lease_s: float = LEASE_S,
+                 poll_s: float = 5.0):
+        self.broker = broker
+        self.worker = worker
+        self.batch = batch
+        self.lease_s = lease_s
+        self.poll_s = poll_s
+        self.host = socket.gethostname()
+        self.held: dict[tuple, int] = {}        # job key → broker job id
+        self.records: dict[tuple, tuple] = {}   # job key → (status, items, found)
+        self.completed = self.failed = self.lost = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = threading.Thread(target=self._renew, daemon=True)
+        self._heartbeat.start()
+
+    def _renew(self) -> None:
+        while not self._stop.wait(self.lease_s / 3):
+            with self._lock:
+                ids = list(self.held.values())
+            if not ids:
+                continue
+            try:
+                lost = self.broker.heartbeat(self.worker, ids, self.lease_s)
+            except Exception as exc:   # the lease outlives a few missed beats
+                logging.warning("📡 Heartbeat failed: %s", exc)
+                continue
+            if lost:
+                logging.warning("⏳ %s lost the lease on %d jobs; results still upload if they finish first",
+                                self.worker, len(lost))
+
+    # ── job queue ──
+    def get(self):
+        """Next batch of claimed jobs; None once the broker has nothing pending or leased."""
+        while True:
+            claimed = self.broker.claim(self.worker, self.batch, self.lease_s, self.host)
+            if claimed:
+                with self._lock:
+                    for job_id, job in claimed:
+                        self.held[job_key(*job[:3])] = job_id
+                return [job for _, job in claimed]
+            if self.broker.finished():
+                return None
+            time.sleep(self.poll_s)   # jobs are backing off or leased to others
+
+    # ── journal ──
+    def record(self, lat, lon, kw, status: str, items=(), found: int | None = None, places=None) -> None:
+        self.records[job_key(lat, lon, kw)] = (status, list(items), found)
+
+    def record_many(self, jobs) -> None:
+        for lat, lon, kw, status, found, *_ in jobs:
+            self.record(lat, lon, kw, status, (), found)
+
+    # ── progress queue ──
+    def put(self, msg) -> None:
+        """Settles a job's lease from the scraper's per-job progress tuple."""
+        job, found, outcome = msg[4:7]
+        key = job_key(*job[:3])
+        with self._lock:
+            job_id = self.held.pop(key, None)
+        _, items, found = self.records.pop(key, ("done", [], found))
+        if job_id is None:
+            return
+        if outcome in RETRYABLE:
+            self.failed += 1
+            self.broker.fail(self.worker, job_id, outcome)
+        elif self.broker.complete(self.worker, job_id, items, found):
+            self.completed += 1
+        else:
+            self.lost += 1   # another worker finished it after our lease ran out
+
+    def close(self) -> None:
+        self._stop.set()
+        self._heartbeat.join(timeout=5)
+
+
+def broker_worker(spec: str, worker_id: str, seen=None) -> None:
+    """Process target: scrapes claimed jobs until the broker runs dry."""
+    import Main
+
+    Main._init_worker()
+    broker = open_broker(spec)
+    meta = broker.meta()
+    link = BrokerLink(broker, worker_id, batch=Main.JOB_BATCH_SIZE)
+    scraper = Main.make_scraper(worker_id, meta["city"], meta["radius_m"], journal=link, seen=seen)
+    try:
+        scraper.scrape_queue(link, link, worker_id)
+    finally:
+        link.close()
+        broker.close()
+    logging.info("🛰️  %s: %d jobs completed, %d failed, %d lost to expired leases",
+                 worker_id, link.completed, link.failed, link.lost)
+
+
+def run_worker(spec: str, processes: int, name: str | None = None, max_restarts: int = 10) -> None:
+    """
+    Runs ``processes`` scraper processes on this host against the broker at
+    ``spec``. They are plain processes rather than a pool, so one crashed
+    browser process does not take the others down; it is restarted (its
+    jobs come back to the queue when their lease runs out).
+    """
+    from multiprocessing import get_context
+
+    import Main
+    from SeenSet import SeenSet
+
+    name = name or socket.gethostname()
+    ctx = get_context("spawn")
+    broker = open_broker(spec)
+    # places are de-duplicated per host; the coordinator's merge drops the rest
+    seen = SeenSet(Main.SEEN_CAPACITY) if Main.DEDUP_PLACES else None
+    restarts = 0
+    try:
+        with ctx.Manager() as manager:
+            handle = seen.handle(manager.Lock()) if seen is not None else None
+
+            def start(i):
+                p = ctx.Process(target=broker_worker, args=(spec, f"{name}-{i}", handle), name=f"{name}-{i}")
+                p.start()
+                return p
+
+            procs = {i: start(i) for i in range(processes)}
+            while procs:
+                for i, p in list(procs.items()):
+                    p.join(timeout=1)
+                    if p.exitcode is None:
+                        continue
+                    del procs[i]
+                    if p.exitcode and restarts < max_restarts and not broker.finished():
+                        restarts += 1
+                        logging.warning("🛰️  %s exited with code %s; restarting it", p.name, p.exitcode)
+                        procs[i] = start(i)
+    finally:
+        if seen is not None:
+            seen.close()
+        broker.close()
+    logging.info("🛰️  Worker %s done (%d process restarts)", name, restarts)
+
+
+def _finish(broker: SqliteBroker, city_name: str, radius_m: int, grid_csv: str) -> None:
+    import pandas as pd
+
+    import Main
+    from GoogleMapsScraper import RESULT_COLUMNS
+    from Processor import process_scraped_csv
+    from ResultsIndex import ResultsIndex, coverage_report
+
+    results_csv = f"results_{city_name}.csv"
+    merged = pd.DataFrame.from_records(broker.load_items())
+    if merged.empty:
+        merged = pd.DataFrame(columns=RESULT_COLUMNS)
+    deduped = (
+        merged
+        .drop_duplicates(subset=["link"])
+        .sort_values(["longitude", "latitude"])
+        .reset_index(drop=True)
+    )
+    logging.info("🔀 Dropped %d duplicate rows (from %d → %d)", len(merged) - len(deduped),
+                 len(merged), len(deduped))
+    logging.info("✅ Final results: %d rows → %s", len(deduped), results_csv)
+    deduped.to_csv(results_csv, index=False)
+    process_scraped_csv(results_csv)
+    if Main.RESULTS_INDEX:
+        index = ResultsIndex.build(results_csv, Main.INDEX_CELL_M)
+        coverage_report(index, broker, radius_m, Main.RESULT_CEILING, grid_csv, f"coverage_{city_name}.csv")
+    write_dead_letters(broker.dead_letters(), f"jobs_dead_{city_name}.csv")
+
+
+def coordinate(grid_csv: str, city_name: str, radius_m: int = 1000, broker_path: str | None = None,
+               serve: int | None = None, local_workers: int = 0, poll_s: float = 15.0,
+               bind: str = "127.0.0.1") -> None:
+    """Queues the department's jobs, waits until every one is done or dead, then writes the results."""
+    import Main
+    from GoogleMapsScraper import GridLoader
+
+    broker_path = broker_path or f"broker_{city_name}.sqlite"
+    broker = SqliteBroker(broker_path, Main.RETRY_ATTEMPTS, Main.RETRY_BACKOFF_S, Main.RETRY_BACKOFF_MAX_S)
+    jobs = GridLoader(grid_csv, Main.KEYWORDS).generate_jobs()
+    if Main.JOB_ORDER:
+        jobs = order_jobs(jobs, Main.JOB_ORDER)   # workers claim in id order
+    added = broker.add_jobs(jobs, meta={"city": city_name, "radius_m": radius_m})
+    logging.info("📥 Queued %d new jobs on %s (%d were already there)", added, broker_path, len(jobs) - added)
+
+    server = None
+    if serve:
+        token = os.environ.get(TOKEN_ENV)
+        if not token:
+            token = secrets.token_urlsafe(24)
+            logging.info("🔑 No $%s set; workers must run with %s=%s", TOKEN_ENV, TOKEN_ENV, token)
+        server = BrokerServer(broker, token, host=bind, port=serve).start()
+    procs = []
+    if local_workers:
+        procs.append(subprocess.Popen([sys.executable, os.path.abspath(__file__), "worker", broker_path,
+                                       "--processes", str(local_workers)]))
+    try:
+        while True:
+            broker.reap()   # jobs of workers that died while every other worker is busy
+            if broker.finished():
+                break
+            c = broker.counts()
+            active = broker.workers()
+            logging.info("📊 %d done, %d leased, %d pending, %d dead — %d active workers%s",
+                         c["done"], c["leased"], c["pending"], c["dead"], len(active),
+                         "".join(f"\n    {w['name']} ({w['host']}): {w['done']} done, {w['failed']} failed"
+                                 for w in active))
+            time.sleep(poll_s)
+    finally:
+        if server is not None:
+            server.stop()
+        for p in procs:
+            p.wait()
+    _finish(broker, city_name, radius_m, grid_csv)
+    broker.close()
+    logging.info("🎉 Distributed run complete.")
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = ap.add_subparsers(dest="role", required=True)
+    c = sub.add_parser("coordinator", help="queue a department's jobs and merge the results")
+    c.add_argument("grid_csv")
+    c.add_argument("city")
+    c.add_argument("--radius", type=int, default=1000)
+    c.add_argument("--broker", help="SQLite broker file (default broker_<CITY>.sqlite)")
+    c.add_argument("--serve", type=int, metavar="PORT", help="serve the broker over HTTP for other hosts")
+    c.add_argument("--bind", default="127.0.0.1",
+                   help="address to serve on (default 127.0.0.1; 0.0.0.0 for every interface)")
+    c.add_argument("--local-workers", type=int, default=0, help="also run this many scraper processes here")
+    w = sub.add_parser("worker", help="scrape jobs from a broker")
+    w.add_argument("broker", help="SQLite broker file or http://host:port")
+    w.add_argument("--processes", type=int, default=3)
+    w.add_argument("--name", help="worker name prefix (default: hostname); keeps Chrome profiles apart")
+    args = ap.parse_args(argv)
+
+    if args.role == "coordinator":
+        coordinate(args.grid_csv, args.city, args.radius, args.broker, args.serve, args.local_workers,
+                   bind=args.bind)
+    else:
+        run_worker(args.broker, args.processes, args.name)
+
+
+if __name__ == "__main__":
+    main()
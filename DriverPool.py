@@ -0,0 +1,280 @@
+"""
+Warm, self-healing Selenium browsers for one worker process.
+
+A worker used to keep a single Chrome for its whole life: a browser that
+crashed, hung or bloated failed every job after it. `DriverPool` stands in
+for `DriverManager` (same `start_driver` / `network_stats` / `stop_driver`
+interface, plus `after_job`) and, between jobs, checks the browser in use:
+
+- it answers a trivial script within ``probe_timeout_s`` (after any failed
+  job, and every ``check_every`` jobs);
+- its page's JS heap is under ``max_heap_mb`` (every ``check_every`` jobs);
+- the last job did not end on a CAPTCHA or consent page (Throttle.py);
+- it has run fewer than ``recycle_after`` jobs.
+
+A browser failing a check is recycled: the pool swaps in a spare that was
+launched ahead of time in a background thread, quits the old one in the
+background, and starts launching the next spare. Each browser slot has its
+own Chrome profile (`worker-<id>`, `worker-<id>-<slot>`), since Chrome locks
+a profile to one process. Launch times and recycle counts are kept in
+`stats` so a run can report what browser startup cost per job.
+
+A Chrome that fails to start never takes the worker down: a recycle retries
+the launch ``launch_retries`` times with exponential backoff, then keeps the
+old browser if it still has it (with spares) or runs without one, so the next
+job fails fast and its own health check tries again.
+"""
+
+import copy
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+
+RECYCLE_OUTCOMES = ("captcha", "consent")
+
+
+def _responsive(driver, timeout_s: float) -> bool:
+    """True if the browser runs a trivial script within ``timeout_s``; a hung call is abandoned."""
+    answered = []
+
+    def probe():
+        try:
+            answered.append(driver.execute_script("return 1") == 1)
+        except Exception:
+            pass
+
+    t = threading.Thread(target=probe, daemon=True)
+    t.start()
+    t.join(timeout_s)
+    return bool(answered and answered[0])
+
+
+def _heap_mb(driver) -> float | None:
+    """Used JS heap of the current page in MB (Chrome DevTools Performance metrics)."""
+    try:
+        metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+    except Exception:
+        return None
+    for m in metrics:
+        if m["name"] == "JSHeapUsedSize":
+            return m["value"] / (1 << 20)
+    return None
+
+
+class DriverPool:
+    """The browser in use plus ``spares`` warm ones, recycled on age, failure or memory."""
+
+    def __init__(self, driver_manager, spares: int = 1, recycle_after: int = 250,
+                 max_heap_mb: float = 512, check_every: int = 10, probe_timeout_s: float = 10,
+                 launch_retries: int = 3, launch_backoff_s: float = 2.0):
+        self.template = driver_manager
+        self.spares = spares
+        self.recycle_after = recycle_after
+        self.max_heap_mb = max_heap_mb
+        self.check_every = check_every
+        self.probe_timeout_s = probe_timeout_s
+        self.launch_retries = max(launch_retries, 1)
+        self.launch_backoff_s = launch_backoff_s
+        self.current = None              # (DriverManager, slot) in use
+        self.jobs_on_driver = 0
+        self._free_slots = list(range(spares + 1))
+        # _retire frees slots and starts spares from background threads
+        self._lock = threading.Lock()
+        self._warm: queue.Queue = queue.Queue()
+        self._threads: list[threading.Thread] = []
+        self.launch_s: list[float] = []
+        self.recycles: Counter = Counter()
+        self.wait_s = 0.0
+        self.jobs = 0
+        self._closing = False
+
+    @property
+    def mode(self) -> str:
+        return self.template.mode
+
+    @property
+    def driver(self):
+        return self.current[0].driver if self.current else None
+
+    def _manager(self, slot: int):
+        mgr = copy.copy(self.template)
+        mgr.driver = None
+        if slot:
+            mgr.worker_id = f"{self.template.worker_id}-{slot}"
+        return mgr
+
+    def _launch(self, slot: int):
+        mgr = self._manager(slot)
+        t0 = time.perf_counter()
+        mgr.start_driver()
+        self.launch_s.append(time.perf_counter() - t0)
+        try:
+            mgr.driver.execute_cdp_cmd("Performance.enable", {})
+        except Exception as exc:
+            logging.debug("Performance metrics unavailable: %s", exc)
+        return mgr, slot
+
+    def _take_slot(self) -> int | None:
+        with self._lock:
+            return self._free_slots.pop(0) if self._free_slots else None
+
+    def _free_slot(self, slot: int) -> None:
+        with self._lock:
+            self._free_slots.append(slot)
+
+    def _launch_retrying(self, slot: int):
+        """``_launch`` with exponential backoff; None, with the slot freed, if Chrome never starts."""
+        for attempt in range(1, self.launch_retries + 1):
+            try:
+                return self._launch(slot)
+            except Exception as exc:
+                logging.warning("🧰 Browser failed to start (attempt %d/%d): %s",
+                                attempt, self.launch_retries, exc)
+                if attempt < self.launch_retries:
+                    time.sleep(self.launch_backoff_s * 2 ** (attempt - 1))
+        self._free_slot(slot)
+        return None
+
+    def _background(self, target, *args) -> None:
+        t = threading.Thread(target=target, args=args, daemon=True)
+        with self._lock:
+            self._threads = [th for th in self._threads if th.is_alive()]
+            self._threads.append(t)
+        t.start()
+
+    def _launch_spare(self) -> None:
+        slot = self._take_slot()
+        if slot is None:
+            return
+
+        def run():
+            try:
+                self._warm.put(self._launch(slot))
+            except Exception as exc:
+                self._warm.put((exc, slot))
+
+        self._background(run)
+
+    def _take_spare(self):
+        """The next warm spare, relaunched here if it failed; None if Chrome will not start."""
+        t0 = time.perf_counter()
+        spare = self._warm.get()
+        if isinstance(spare[0], Exception):
+            logging.warning("🧰 Spare browser failed to start (%s); launching another", spare[0])
+            spare = self._launch_retrying(spare[1])
+            if spare is None:
+                self._launch_spare()   # keep one coming for the next recycle
+        self.wait_s += time.perf_counter() - t0
+        return spare
+
+    def start_driver(self):
+        self.current = self._launch_retrying(self._take_slot())
+        if self.current is None:
+            raise RuntimeError(f"Chrome failed to start {self.launch_retries} times")
+        for _ in range(self.spares):
+            self._launch_spare()
+        return self.driver
+
+    def network_stats(self) -> dict | None:
+        return self.current[0].network_stats() if self.current else None
+
+    def health(self, outcome: str | None = None) -> str | None:
+        """Why the browser in use should be recycled after a job with this outcome; None if healthy."""
+        if self.current is None:
+            return "no_browser"
+        if outcome in RECYCLE_OUTCOMES:
+            return outcome
+        if self.jobs_on_driver >= self.recycle_after:
+            return "age"
+        checkpoint = self.check_every and self.jobs_on_driver % self.check_every == 0
+        if outcome in ("error", "timeout") or checkpoint:
+            if not _responsive(self.driver, self.probe_timeout_s):
+                return "unresponsive"
+        if checkpoint and self.max_heap_mb:
+            heap = _heap_mb(self.driver)
+            if heap is not None and heap > self.max_heap_mb:
+                return "memory"
+        return None
+
+    def after_job(self, outcome: str | None = None):
+        """Health-checks the browser after a job; returns the driver for the next one."""
+        self.jobs += 1
+        self.jobs_on_driver += 1
+        reason = self.health(outcome)
+        if reason:
+            self.recycle(reason)
+        return self.driver
+
+    def _retire(self, mgr, slot: int) -> None:
+        try:
+            mgr.stop_driver()
+        except Exception as exc:   # an already-dead browser
+            logging.debug("Quitting recycled browser failed: %s", exc)
+        self._free_slot(slot)
+        if self.spares and not self._closing:
+            self._launch_spare()
+
+    def recycle(self, reason: str) -> None:
+        old, old_slot = self.current or (None, None)
+        logging.info("🧰 Recycling browser %s after %d jobs (%s)",
+                     old.worker_id if old else "-", self.jobs_on_driver, reason)
+        self.recycles[reason] += 1
+        self.jobs_on_driver = 0
+        if not self.spares:
+            # the old browser must let go of its profile before one is launched on it
+            t0 = time.perf_counter()
+            if old is not None:
+                self._retire(old, old_slot)
+            self.current = self._launch_retrying(self._take_slot())
+            self.wait_s += time.perf_counter() - t0
+            if self.current is None:
+                logging.error("🧰 No browser could be started; the next job will try again")
+            return
+        spare = self._take_spare()
+        if spare is None:
+            logging.error("🧰 No replacement browser could be started; keeping %s for now", old.worker_id)
+            return
+        self.current = spare
+        self._background(self._retire, old, old_slot)
+
+    def stop_driver(self) -> None:
+        self._closing = True
+        for _ in range(2):   # a retiring browser may have started one more spare
+            for t in list(self._threads):
+                t.join(timeout=30)
+        while not self._warm.empty():
+            mgr, _ = self._warm.get()
+            if not isinstance(mgr, Exception):
+                mgr.stop_driver()
+        if self.current:
+            self.current[0].stop_driver()
+            self.current = None
+
+    @property
+    def stats(self) -> dict:
+        return {"launches": len(self.launch_s), "launch_s": sum(self.launch_s),
+                "launch_max_s": max(self.launch_s, default=0.0), "wait_s": self.wait_s,
+                "jobs": self.jobs, "recycles": dict(self.recycles)}
+
+
+def merge_pool_stats(stats_list) -> dict:
+    out = {"launches": 0, "launch_s": 0.0, "launch_max_s": 0.0, "wait_s": 0.0, "jobs": 0,
+           "recycles": Counter()}
+    for s in stats_list:
+        if not s:
+            continue
+        for key in ("launches", "launch_s", "wait_s", "jobs"):
+            out[key] += s[key]
+        out["launch_max_s"] = max(out["launch_max_s"], s["launch_max_s"])
+        out["recycles"].update(s["recycles"])
+    return out
+
+
+def format_pool_stats(s: dict) -> str:
+    launches = s["launches"]
+    recycles = ", ".join(f"{k} {v}" for k, v in sorted(s["recycles"].items())) or "none"
+    return (f"{launches} browser launches ({s['launch_s'] / max(launches, 1):.1f} s avg, "
+            f"{s['launch_max_s']:.1f} s max), {s['wait_s']:.1f} s jobs waited on a recycle, "
+            f"{s['jobs']} jobs → {s['jobs'] / max(launches, 1):.0f} per launch; recycled: {recycles}")
@@ -0,0 +1,130 @@
+"""
+Vectorized geo helpers shared by the scraper and the post-scrape pipeline.
+
+- coords_from_links: decode every "!3d<lat>!4d<lon>" pair of a panel at once.
+- haversine_np:      great-circle distances for whole arrays (broadcasting).
+- near_any:          rows within radius of at least one grid point, via a
+                     cell hash so it scales to millions of rows.
+- refilter_results:  re-apply a different radius to a merged results file
+                     without re-scraping.
+
+Usage:
+    python Geo.py results_ASUNCIÓN.csv ASUNCIÓN_grid.csv 800 results_ASUNCIÓN_800m.csv
+"""
+
+import logging
+import re
+import sys
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000
+LINK_COORDS_RE = re.compile(r"!3d([-\d.]+)!4d([-\d.]+)")
+
+
+def coords_from_links(links) -> tuple[np.ndarray, np.ndarray]:
+    """Returns (lats, lons) arrays; NaN where a link carries no coordinates."""
+    lats = np.full(len(links), np.nan)
+    lons = np.full(len(links), np.nan)
+    search = LINK_COORDS_RE.search
+    for i, link in enumerate(links):
+        m = search(link or "")
+        if m:
+            try:
+                lats[i], lons[i] = float(m.group(1)), float(m.group(2))
+            except ValueError:
+                pass
+    return lats, lons
+
+
+def haversine_np(lat, lon, lats, lons) -> np.ndarray:
+    """Distance in meters between (lat, lon) and each of (lats, lons); broadcasts."""
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = (np.sin((lats - lat) / 2) ** 2
+         + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def within_radius(lat, lon, lats, lons, radius_m) -> np.ndarray:
+    """Mask of points with coordinates that lie within radius_m of (lat, lon)."""
+    with np.errstate(invalid="ignore"):
+        return haversine_np(lat, lon, lats, lons) <= radius_m
+
+
+def near_any(lats, lons, grid_lats, grid_lons, radius_m, chunk: int = 200_000) -> np.ndarray:
+    """
+    Mask of rows lying within radius_m of at least one grid point. Grid points
+    are hashed into cells at least radius_m wide, so each row is only compared
+    with the points of its own and its 8 neighbouring cells.
+    """
+    import pandas as pd
+
+    lats, lons = np.asarray(lats, float), np.asarray(lons, float)
+    grid_lats, grid_lons = np.asarray(grid_lats, float), np.asarray(grid_lons, float)
+    out = np.zeros(len(lats), dtype=bool)
+    if not len(lats) or not len(grid_lats):
+        return out
+
+    max_lat = np.nanmax(np.abs(np.concatenate([lats, grid_lats])))
+    dlat = radius_m / 111_320
+    dlon = radius_m / (111_320 * max(np.cos(np.radians(min(max_lat, 89.0))), 1e-6))
+
+    def cell_keys(la, lo, dy=0, dx=0):
+        cy = np.floor(la / dlat).astype(np.int64) + dy
+        cx = np.floor(lo / dlon).astype(np.int64) + dx
+        return cy * (1 << 32) + (cx + (1 << 31))
+
+    grid = pd.DataFrame({
+        "key": cell_keys(grid_lats, grid_lons), "glat": grid_lats, "glon": grid_lons,
+    })
+    valid = np.flatnonzero(~(np.isnan(lats) | np.isnan(lons)))
+    for start in range(0, len(valid), chunk):
+        idx = valid[start:start + chunk]
+        la, lo = lats[idx], lons[idx]
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                pairs = pd.DataFrame({"row": idx, "key": cell_keys(la, lo, dy, dx)}) \
+                    .merge(grid, on="key")
+                if pairs.empty:
+                    continue
+                rows = pairs["row"].to_numpy()
+                dist = haversine_np(lats[rows], lons[rows],
+                                    pairs["glat"].to_numpy(), pairs["glon"].to_numpy())
+                out[rows[dist <= radius_m]] = True
+    return out
+
+
+def _read_table(path: str) -> "pd.DataFrame":
+    import pandas as pd
+
+    return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+
+
+def refilter_results(results_path: str, grid_csv: str, radius_m: float,
+                     out_path: str | None = None) -> "pd.DataFrame":
+    """
+    Keeps the rows of a merged results file that lie within radius_m of some
+    grid point — the merged output of a scrape at that radius, as long as
+    radius_m is not larger than the one used to scrape.
+    """
+    import pandas as pd
+
+    df = _read_table(results_path)
+    grid = pd.read_csv(grid_csv)
+    mask = near_any(df["latitude"], df["longitude"], grid["latitude"], grid["longitude"], radius_m)
+    kept = df[mask].reset_index(drop=True)
+    logging.info("📐 Re-filtered at %sm: kept %d of %d rows", radius_m, len(kept), len(df))
+    if out_path:
+        if out_path.endswith(".parquet"):
+            kept.to_parquet(out_path, index=False)
+        else:
+            kept.to_csv(out_path, index=False)
+    return kept
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 4:
+        sys.exit("Usage: python Geo.py <results.csv|.parquet> <grid.csv> <radius_m> [out]")
+    refilter_results(sys.argv[1], sys.argv[2], float(sys.argv[3]),
+                     sys.argv[4] if len(sys.argv) > 4 else None)
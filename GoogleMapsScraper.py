@@ -1,25 +1,30 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from math import radians, sin, cos, sqrt, atan2
+"""
+Selenium scraper for Google Maps search panels.
+
+Importing this module is cheap and has no side effects: Selenium, BeautifulSoup,
+pandas and pyarrow are imported by the code paths that use them, so a spawned
+worker (or the Playwright scraper, which never touches Selenium) does not pay
+for them before its first job. Logging is configured by the entry point.
+"""
+
 import unicodedata
 from urllib.parse import quote_plus
-from math import radians, sin, cos, atan2, sqrt
-from bs4 import BeautifulSoup
-import pandas as pd
+import numpy as np
+import json
 import logging
 import os
 import time
-import sys
-import re
-
-from ItemTemplate import build_item
+from collections import Counter
 
-logging.basicConfig(level=logging.INFO)
+from ParserBackend import get_backend
+from Geo import coords_from_links, within_radius
+from Replay import PanelRecorder
+from Journal import JobJournal
+from ResultCache import ResultCache
+from Metrics import JobTiming, MetricsWriter
+from Throttle import PAGE_PROBE_JS, PANEL_STATE_JS, classify_failure, pacing_delay, wait_for_turn
+from Retry import escalate
+from SeenSet import SeenSet, place_fingerprints
 
 def _setup_error_logger(city: str) -> logging.Logger:
     logger = logging.getLogger(f"errors.{city}")
@@ -31,20 +36,6 @@ def _setup_error_logger(city: str) -> logging.Logger:
     return logger
 
 
-def _coords_from_link(url: str) -> tuple[float, float] | None:
-    m = re.search(r"!3d([-\d.]+)!4d([-\d.]+)", url)
-    if m:
-        return float(m.group(1)), float(m.group(2))
-    return None
-
-def haversine(lat, lon, lat2, lon2):
-    """Returns distance in meters between two lat/lon points."""
-    R = 6371000  # Earth radius in meters
-    dlat = radians(lat2 - lat)
-    dlon = radians(lon2 - lon)
-    a = sin(dlat / 2)**2 + cos(radians(lat)) * cos(radians(lat2)) * sin(dlon / 2)**2
-    return 2 * R * atan2(sqrt(a), sqrt(1 - a))
-
 def clean_text(text: str) -> str:
     if not text:
         return ''
@@ -60,16 +51,279 @@ def clean_text(text: str) -> str:
     return cleaned.strip()
 
 
+CARD_SELECTOR        = "div.Nv2PK.THOPZb.CpccDe"
+END_OF_LIST_SELECTOR = "span.HlvSq"     # "Llegaste al final de la lista."
+
+# Returns [card count, innerHTML length, end-of-list reached] without
+# shipping the panel HTML back to Python.
+_PANEL_PROBE_JS = """
+const panel = arguments[0];
+return [
+    panel.querySelectorAll(arguments[1]).length,
+    panel.innerHTML.length,
+    panel.querySelector(arguments[2]) !== null
+];
+"""
+
+# Scrolls the panel to the bottom, then resolves as soon as a MutationObserver
+# sees new cards or the end-of-list marker, or after timeoutMs. Resolves to
+# [card count, innerHTML length, end-of-list reached, ms waited].
+_SCROLL_WAIT_FN = """
+(panel, [cardSel, endSel, timeoutMs]) => new Promise(resolve => {
+    const count = () => panel.querySelectorAll(cardSel).length;
+    const before = count();
+    const t0 = performance.now();
+    let timer = null;
+    const finish = () => {
+        observer.disconnect();
+        clearTimeout(timer);
+        resolve([count(), panel.innerHTML.length,
+                 panel.querySelector(endSel) !== null, performance.now() - t0]);
+    };
+    const check = () => {
+        if (panel.querySelector(endSel) !== null || count() > before) finish();
+    };
+    const observer = new MutationObserver(check);
+    observer.observe(panel, {childList: true, subtree: true});
+    timer = setTimeout(finish, timeoutMs);
+    panel.scrollTop = panel.scrollHeight;
+    check();
+})
+"""
+# Selenium form: execute_async_script passes a callback as the last argument
+_SCROLL_WAIT_JS = (
+    "const fn = " + _SCROLL_WAIT_FN + ";\n"
+    "fn(arguments[0], [arguments[1], arguments[2], arguments[3]])"
+    ".then(arguments[arguments.length - 1]);"
+)
+
+STALL_WAITS = 2   # event mode: empty waits in a row before the list counts as stalled
+
+# In-page navigation: Maps is a single-page app that re-renders from the URL
+# on history navigation (as on the back button), so pushing the next search
+# URL and firing popstate moves the loaded app there without a reload.
+# Returns false if the tab is on another origin (e.g. a consent page).
+_SOFT_NAV_FN = """
+(url) => {
+    const next = new URL(url, location.href);
+    if (next.origin !== location.origin) return false;
+    history.pushState(history.state, "", next.pathname + next.search + next.hash);
+    window.dispatchEvent(new PopStateEvent("popstate", {state: history.state}));
+    return true;
+}
+"""
+_SOFT_NAV_JS = "return (" + _SOFT_NAV_FN + ")(arguments[0]);"
+# hrefs of every result card in the tab
+_ANCHOR_HREFS_JS = 'return Array.from(document.querySelectorAll("a.hfpxzc"), a => a.href);'
+
+SOFT_NAV_MAX_MISSES = 3   # soft mode: fallbacks in a row, before any success, that turn it off
+NAV_KINDS = ("soft", "full", "fallback")
+
+
+class ScrollPacer:
+    """
+    Sizes the event-mode wait from an EWMA of how long recent scrolls took to
+    bring new cards: ``factor`` times the average plus a small margin, clamped
+    to [floor_s, ceiling_s].
+    """
+
+    def __init__(self, initial_s: float, ceiling_s: float, floor_s: float = 0.3,
+                 alpha: float = 0.2, factor: float = 3.0, margin_s: float = 0.2):
+        self.latency_s = initial_s
+        self.ceiling_s = max(ceiling_s, floor_s)
+        self.floor_s = floor_s
+        self.alpha = alpha
+        self.factor = factor
+        self.margin_s = margin_s
+
+    def wait_s(self) -> float:
+        return min(max(self.factor * self.latency_s + self.margin_s, self.floor_s), self.ceiling_s)
+
+    def observe(self, latency_s: float) -> None:
+        self.latency_s += self.alpha * (latency_s - self.latency_s)
+
+
+RESULT_COLUMNS = [
+    "latitude","longitude","keyword","name","link","rating",
+    "category","address","phone","hours","services","price","amenities"
+]
+
+
+def _wait_ms(pacer: ScrollPacer, min_wait_s: float, timeout: float) -> int:
+    """One event-mode wait: the pacer's, raised to ``min_wait_s`` on retries."""
+    return int(max(pacer.wait_s(), min(min_wait_s, timeout / STALL_WAITS)) * 1000)
+
+
+def _attempt_note(attempt: int, s: dict) -> str:
+    if attempt <= 1:
+        return ""
+    return (f" [attempt {attempt}: wait {s['wait_timeout']:.0f} s, "
+            f"{s['scroll_max']} scrolls, stall {s['scroll_timeout']:.0f} s]")
+
+
+def search_url(kw, lat, lon, radius_m) -> str:
+    # locale params keep the panels in stable Spanish
+    return (
+        f"https://www.google.com/maps/search/{quote_plus(kw)}/"
+        f"@{lat},{lon},{radius_m}m/data=!3m1!4b1?hl=es-419&gl=PY"
+    )
+
+
+def extract_panel_items(parser, doc, lat, lon, kw, radius_m, timings=None, seen=None, places=None,
+                        coords=None, claims=None):
+    """
+    Turns one parsed results panel into items: a vectorized radius filter over
+    every anchor, card lookup for the anchors the mask keeps, then build_item.
+    Shared by the live scraper and the offline replay benchmark; if ``timings``
+    is a dict it receives the seconds spent in each stage.
+
+    With a ``seen`` set (SeenSet.py) only places no other job has claimed yet
+    are built, and a place is claimed once its item is built, so one whose
+    build raises is left for the next job that finds it. ``places``, if a
+    list, receives the fingerprint of every place inside the radius, built or
+    not, and ``coords`` its (lat, lon). If ``claims`` is a list, the built
+    places are not claimed here: their fingerprints go to ``claims`` for the
+    caller to claim once the job's rows are handed off.
+
+    Returns (items, n_anchors, skipped_outside_radius, skipped_seen).
+    """
+    clock = time.perf_counter
+    t0 = clock()
+
+    anchors = parser.anchors(doc)
+    links = [parser.href(anchor) for anchor in anchors]
+    # decode every link and measure the whole panel at once
+    lats, lons = coords_from_links(links)
+    has_coords = ~np.isnan(lats)
+    keep = has_coords & within_radius(lat, lon, lats, lons, radius_m)
+    skipped_outside_radius = int((has_coords & ~keep).sum())
+    kept = [
+        (anchors[i], links[i], (float(lats[i]), float(lons[i])))
+        for i in np.flatnonzero(keep)
+    ]
+    t1 = clock()
+
+    fps = place_fingerprints([link for _, link, _ in kept])
+    if places is not None:
+        places.extend(fps.tolist())
+    if coords is not None:
+        coords.extend(c for _, _, c in kept)
+
+    cards, card_fps = [], []
+    for (anchor, link, coords), fp in zip(kept, fps):
+        card = parser.find_card(anchor)
+        if card is None:
+            logging.warning("⚠️  Couldn't find card container for %s → skipping", link)
+            continue
+        cards.append((card, anchor, coords))
+        card_fps.append(fp)
+    skipped_seen = 0
+    if seen is not None and cards:
+        known = seen.contains(card_fps)
+        skipped_seen = int(known.sum())
+        cards = [c for c, is_known in zip(cards, known) if not is_known]
+        card_fps = [fp for fp, is_known in zip(card_fps, known) if not is_known]
+    t2 = clock()
+
+    items, item_fps = [], []
+    for (card, anchor, coords), fp in zip(cards, card_fps):
+        try:
+            items.append(parser.build(card, anchor, coords, kw))
+            item_fps.append(fp)
+        except Exception as ex:
+            logging.warning("Error building item for %s: %s", kw, ex)
+    # claimed only once built, so a failed lookup or build can't lose the place;
+    # of two jobs that built it at once, the first claim keeps its row
+    if claims is not None:
+        claims.extend(item_fps)
+    elif seen is not None and items:
+        new = seen.claim(item_fps)
+        skipped_seen += int((~new).sum())
+        items = [item for item, is_new in zip(items, new) if is_new]
+    t3 = clock()
+
+    if timings is not None:
+        timings["radius_filter"] = t1 - t0
+        timings["card_lookup"] = t2 - t1
+        timings["build_item"] = t3 - t2
+    return items, len(anchors), skipped_outside_radius, skipped_seen
+
+
+# Lean mode: what the results panel never needs. Map tiles, photos, fonts and
+# telemetry beacons are blocked at the network layer through CDP.
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*/maps/vt*", "*/maps/vt/*", "*/kh/v*", "*/maps/preview/pegman*",
+    "*googleusercontent.com/*", "*ggpht.com/*", "*gstatic.com/mapfiles/*",
+    "*/gen_204*", "*/log?*", "*/csi?*", "*play.google.com/log*",
+    "*doubleclick.net/*", "*google-analytics.com/*", "*googletagmanager.com/*",
+]
+
+LEAN_ARGS = [
+    "--window-size=1024,768",
+    "--blink-settings=imagesEnabled=false",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-translate",
+    "--disable-notifications",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--metrics-recording-only",
+    "--no-first-run",
+    "--mute-audio",
+]
+
+
 class DriverManager:
-    def __init__(self, headless: bool = False):
+    """
+    Starts the local Chrome. ``lean=True`` blocks the resource types listed in
+    BLOCKED_URL_PATTERNS, turns off background features, shrinks the viewport
+    and gives each worker its own on-disk profile under ``profile_dir``, so the
+    HTTP cache of the Maps app shell survives from one run to the next.
+    """
+
+    def __init__(self, headless: bool = False, lean: bool = False,
+                 profile_dir: str | None = None, worker_id: int | str = 0,
+                 track_network: bool = True):
         self.headless = headless
+        self.lean = lean
+        self.profile_dir = profile_dir
+        self.worker_id = worker_id
+        self.track_network = track_network
         self.driver = None
 
+    @property
+    def mode(self) -> str:
+        return "lean" if self.lean else "full"
+
     def start_driver(self):
-        logging.info("Initializing Chrome driver (local)…")
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+
+        logging.info("Initializing Chrome driver (local, %s mode)…", self.mode)
         options = Options()
-        options.add_argument("--window-size=1920,1080")
         options.add_argument("--lang=es-419")
+        if self.lean:
+            for arg in LEAN_ARGS:
+                options.add_argument(arg)
+            options.add_experimental_option("prefs", {
+                "profile.managed_default_content_settings.images": 2,
+                "profile.default_content_setting_values.notifications": 2,
+                "profile.default_content_setting_values.geolocation": 2,
+            })
+        else:
+            options.add_argument("--window-size=1920,1080")
+        if self.profile_dir:
+            # one profile per worker: Chrome locks a profile to a single process
+            path = os.path.abspath(os.path.join(self.profile_dir, f"worker-{self.worker_id}"))
+            os.makedirs(path, exist_ok=True)
+            options.add_argument(f"--user-data-dir={path}")
+        if self.track_network:
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
         if self.headless:
             options.add_argument("--headless")
             options.add_argument("--disable-gpu")
@@ -78,6 +332,32 @@ class DriverManager:
         chrome_path = os.path.join(os.getcwd(), 'chromedriver-mac-arm64', 'chromedriver')
         service = Service(executable_path=chrome_path)
         self.driver = webdriver.Chrome(service=service, options=options)
+        if self.lean:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        return self.driver
+
+    def network_stats(self) -> dict | None:
+        """
+        Drains Chrome's performance log and returns what was transferred since
+        the last call: {"bytes", "requests", "blocked"}. None when not tracked.
+        """
+        if not (self.track_network and self.driver):
+            return None
+        n_bytes = requests = blocked = 0
+        for entry in self.driver.get_log("performance"):
+            msg = entry["message"]
+            # most events are not about finished or failed loads; skip the JSON parse for them
+            if "Network.loadingFinished" in msg:
+                params = json.loads(msg)["message"]["params"]
+                n_bytes += int(params.get("encodedDataLength", 0))
+                requests += 1
+            elif "Network.loadingFailed" in msg and "blockedReason" in msg:
+                blocked += 1
+        return {"bytes": n_bytes, "requests": requests, "blocked": blocked}
+
+    def after_job(self, outcome: str | None = None):
+        """The driver for the next job: always this one browser (see DriverPool for recycling)."""
         return self.driver
 
     def stop_driver(self):
@@ -91,6 +371,8 @@ class GridLoader:
         self.keywords = keywords
 
     def load_grid(self):
+        import pandas as pd
+
         logging.info(f"Loading grid from {self.grid_path}...")
         df = pd.read_csv(self.grid_path)
         if df.empty:
@@ -117,8 +399,20 @@ class GridLoader:
 class GoogleMapsScraper:
     def __init__(self, driver_manager: DriverManager, jobs: list, city_name: str,
                  radius_m: int = 1000, scroll_max: int = 60, wait_timeout: int = 20,
-                 scroll_interval: float = 1.0, scroll_timeout: int = 4):
+                 scroll_interval: float = 1.0, scroll_timeout: int = 4,
+                 scroll_mode: str = "incremental", parser: str = "bs4",
+                 record_dir: str | None = None, journal_path: str | None = None,
+                 sink_dir: str | None = None, worker_id: int = 0,
+                 keyword_policy=None, cache_path: str | None = None,
+                 cache_ttl_s: float = 7 * 86400, cache_max_mb: int = 2048,
+                 force_refresh: bool = False, throttle=None, metrics_dir: str | None = None,
+                 seen=None, journal=None, nav_mode: str = "full", soft_nav_timeout: float = 5):
+        if scroll_mode not in ("event", "incremental", "legacy"):
+            raise ValueError(f"Unknown scroll_mode '{scroll_mode}'")
+        if nav_mode not in ("full", "soft"):
+            raise ValueError(f"Unknown nav_mode '{nav_mode}'")
         self.driver_manager = driver_manager
+        self.browser_mode = driver_manager.mode if driver_manager is not None else None
         self.jobs = jobs
         self.city_name = city_name
         self.radius_m = radius_m
@@ -126,14 +420,59 @@ class GoogleMapsScraper:
         self.wait_timeout = wait_timeout
         self.scroll_interval = scroll_interval
         self.scroll_timeout = scroll_timeout
+        self.scroll_mode = scroll_mode
+        self.nav_mode = nav_mode
+        self.soft_nav_timeout = soft_nav_timeout
+        self._live_driver = None            # driver whose tab shows a loaded results panel
+        self._soft_misses = 0
+        self.scroll_stats: list[dict] = []
+        # the stall budget is split over STALL_WAITS waits, so event mode never
+        # idles longer at the end of a list than the polling modes do
+        self.pacer = ScrollPacer(scroll_interval, scroll_timeout / STALL_WAITS)
+        self.page_stats: list[dict] = []
+        self.parser = get_backend(parser, clean_text)
+        self.recorder = PanelRecorder(record_dir, city_name) if record_dir else None
+        # an open journal-like store (record/record_many/close) stands in for
+        # journal_path, e.g. Distributed.BrokerLink uploading to a broker
+        self.journal = journal if journal is not None else \
+            JobJournal(journal_path) if journal_path else None
+        self.sink = None
+        if sink_dir:
+            from ResultSink import ParquetSink   # pyarrow, only when streaming to Parquet
+            self.sink = ParquetSink(sink_dir, worker_id)
+        self._pending: list[tuple] = []
+        self.cache = ResultCache(cache_path, cache_ttl_s, cache_max_mb << 20, force_refresh) \
+            if cache_path else None
+        self.cache_stats: dict = {}
+        self.throttle = throttle            # shared AIMD state (Throttle.py), or None
+        self.last_outcome = None
+        self.last_coords = None
+        self.last_claims: list[int] = []    # built places of the last job, claimed after hand-off
+        self.last_parse_s = 0.0
+        self.metrics = MetricsWriter(metrics_dir, worker_id, city=city_name, radius_m=radius_m) \
+            if metrics_dir else None
+        self.seen = SeenSet.attach(seen) if seen else None   # handle from SeenSet.handle
+        self.outcome_counts: Counter = Counter()
+        self.keyword_policy = keyword_policy
+        self._point_state: dict = {}
+        self.rows_total = 0
+        self.first_job_at = None            # wall-clock start of the first job (startup benchmark)
         self.error_logger = _setup_error_logger(city_name)
 
-    def _scroll_and_check(self, panel, check_interval=0.8, timeout=4, max_total_scrolls=100):
+    def _scroll_and_check(self, panel, check_interval=0.8, timeout=4, max_total_scrolls=100,
+                          min_wait_s=0.0):
+        if self.scroll_mode == "event":
+            return self._scroll_event(panel, max_total_scrolls, timeout, min_wait_s)
+        if self.scroll_mode == "incremental":
+            return self._scroll_incremental(panel, check_interval, timeout, max_total_scrolls)
+
+        from bs4 import BeautifulSoup
+        from selenium.webdriver.common.keys import Keys
 
         scrolls = 0
         prev_n = 0
         stall_time = 0
-        soup = None
+        html = soup = None
 
         while scrolls < max_total_scrolls:
             panel.send_keys(Keys.PAGE_DOWN)
@@ -142,7 +481,7 @@ class GoogleMapsScraper:
 
             html = panel.get_attribute("innerHTML")
             soup = BeautifulSoup(html, "html.parser")
-            cards = soup.select("div.Nv2PK.THOPZb.CpccDe")
+            cards = soup.select(CARD_SELECTOR)
             n = len(cards)
 
             if n > prev_n:
@@ -154,9 +493,504 @@ class GoogleMapsScraper:
             if stall_time >= timeout:
                 logging.info(f"🛑 Scroll halted after {scrolls} scrolls and {n} cards.")
                 break
-        
-        return soup
 
+        if soup is not None and self.parser.name != "bs4":
+            return html, self.parser.parse(html)
+        return html, soup
+
+    def _scroll_incremental(self, panel, check_interval=0.8, timeout=4, max_total_scrolls=100):
+        """
+        Same stop rules as the legacy loop, but cards are counted inside the
+        browser on every step and the panel HTML is pulled and parsed only once,
+        after scrolling stops (or as soon as the end-of-list marker shows up).
+        """
+        from selenium.webdriver.common.keys import Keys
+
+        driver = panel.parent
+        t_start = time.perf_counter()
+        scrolls = 0
+        prev_n = n = 0
+        stall_time = 0
+        polled_chars = 0
+        reason = "max_scrolls"
+
+        while scrolls < max_total_scrolls:
+            panel.send_keys(Keys.PAGE_DOWN)
+            time.sleep(check_interval)
+            scrolls += 1
+
+            n, size, at_end = driver.execute_script(
+                _PANEL_PROBE_JS, panel, CARD_SELECTOR, END_OF_LIST_SELECTOR
+            )
+            # what the legacy mode would have pulled over the wire on this step
+            polled_chars += size
+
+            if at_end:
+                reason = "end_of_list"
+                break
+
+            if n > prev_n:
+                prev_n = n
+                stall_time = 0  # reset stall counter if new cards load
+            else:
+                stall_time += check_interval
+
+            if stall_time >= timeout:
+                reason = "stall"
+                break
+
+        return self._scroll_done(panel.get_attribute("innerHTML"), scrolls, n, reason,
+                                 polled_chars, time.perf_counter() - t_start)
+
+    def _scroll_event(self, panel, max_total_scrolls=100, timeout=4, min_wait_s=0.0):
+        """
+        Event-driven scroll: each step jumps to the bottom of the panel and
+        waits in the browser until new cards arrive, the end-of-list marker
+        shows up, or the pacer's wait runs out. Stops at the marker right away
+        and after STALL_WAITS empty waits in a row. Retries raise the wait to
+        at least ``min_wait_s`` (capped by their own ``timeout``).
+        """
+        driver = panel.parent
+        driver.set_script_timeout(timeout + 10)
+        t_start = time.perf_counter()
+        scrolls = n = stalls = 0
+        polled_chars = 0
+        reason = "max_scrolls"
+
+        while scrolls < max_total_scrolls:
+            count, size, at_end, waited_ms = driver.execute_async_script(
+                _SCROLL_WAIT_JS, panel, CARD_SELECTOR, END_OF_LIST_SELECTOR,
+                _wait_ms(self.pacer, min_wait_s, timeout)
+            )
+            scrolls += 1
+            polled_chars += size
+            if at_end:
+                n, reason = count, "end_of_list"
+                break
+            if count > n:
+                n, stalls = count, 0
+                self.pacer.observe(waited_ms / 1000)
+            else:
+                stalls += 1
+                if stalls >= STALL_WAITS:
+                    reason = "stall"
+                    break
+
+        return self._scroll_done(panel.get_attribute("innerHTML"), scrolls, n, reason,
+                                 polled_chars, time.perf_counter() - t_start)
+
+    def _scroll_done(self, html, scrolls, n, reason, polled_chars, scroll_s):
+        """Parses the final panel once and records what polling in-browser saved."""
+        t0 = time.perf_counter()
+        doc = self.parser.parse(html)
+        parse_s = self.last_parse_s = time.perf_counter() - t0
+
+        # parse cost is roughly linear in document size, so the legacy
+        # per-scroll parses are estimated from the single one we did
+        saved_chars = max(polled_chars - len(html), 0)
+        saved_parse_s = parse_s * saved_chars / len(html) if html else 0.0
+        self.scroll_stats.append({
+            "scrolls": scrolls, "cards": n, "stop": reason, "scroll_s": scroll_s,
+            "html_chars": len(html), "saved_chars": saved_chars,
+            "parse_s": parse_s, "saved_parse_s": saved_parse_s,
+        })
+        logging.info(
+            "🛑 Scroll halted (%s) after %d scrolls, %.1f s and %d cards; saved ~%.0f KB transfer, ~%.0f ms parse",
+            reason, scrolls, scroll_s, n, saved_chars / 1024, saved_parse_s * 1000
+        )
+        return html, doc
+
+    def _scrape_job(self, driver, idx, lat, lon, kw, results, failed, radius_m=None, attempt=1):
+        """
+        Runs a single (lat, lon, keyword) search, appending to ``results``/``failed``.
+        ``radius_m`` overrides the scraper-wide radius for this job; ``attempt``
+        > 1 runs it with the escalated waits and scrolls of a retry. Returns the
+        number of result links found, or None if the job failed before that.
+        """
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        if self.first_job_at is None:
+            self.first_job_at = time.time()
+        radius_m = radius_m or self.radius_m
+        s = self._job_settings(attempt)
+        before = len(results)
+        failed_before = len(failed)
+        n_anchors = None
+        page_ready_s = None
+        nav = None
+        outcome = "error"
+        places: list[int] = []
+        claims: list[int] = []
+        self.last_coords = None
+        self.last_claims = []
+        timing = JobTiming()
+        try:
+            lat, lon = float(lat), float(lon)
+            logging.info("Job %s: %s at (%.5f, %.5f)%s", idx, kw, lat, lon, _attempt_note(attempt, s))
+
+            with timing.phase("cache"):
+                cached = self._from_cache(lat, lon, kw, radius_m, places, claims)
+            if cached is not None:
+                items, n_anchors = cached
+                results.extend(items)
+                outcome = "cached"
+                return n_anchors
+
+            with timing.phase("pace"):
+                delay = pacing_delay(self.throttle)
+                if delay:
+                    time.sleep(delay)
+            nav = self._navigate(driver, search_url(kw, lat, lon, radius_m), timing)
+
+            with timing.phase("wait_panel"):
+                state = WebDriverWait(driver, s["wait_timeout"]).until(
+                    lambda d: d.execute_script(PANEL_STATE_JS)
+                )
+            if state == "empty":
+                # Google answered: no results here (or one, opened as a place page)
+                logging.info("🔎 No result list for %s", kw)
+                outcome = "empty"
+                n_anchors = 0
+                return n_anchors
+            self._live_driver = driver
+            page_ready_s = sum(timing.phases.get(p, 0.0) for p in ("soft_nav", "navigate", "wait_panel"))
+            with timing.phase("settle"):
+                time.sleep(1)
+
+            with timing.phase("scroll"):
+                panel = driver.find_element(
+                    By.XPATH, f"//div[@aria-label='Resultados de {kw}']"
+                )
+                self.last_parse_s = 0.0
+                html, doc = self._scroll_and_check(
+                    panel,
+                    check_interval=s["scroll_interval"],
+                    timeout=s["scroll_timeout"],
+                    max_total_scrolls=s["scroll_max"],
+                    min_wait_s=s["min_wait_s"]
+                )
+            # the final parse runs inside the scroll call; book it separately
+            timing.move("scroll", "parse", self.last_parse_s)
+            if doc is None:
+                self.error_logger.warning("No soup for '%s' @(%f,%f)", kw, lat, lon)
+                failed.append((lat, lon, kw))
+                return n_anchors
+
+            if self.recorder is not None:
+                with timing.phase("record"):
+                    self.recorder.record(lat, lon, kw, radius_m, html)
+
+            # ── radius filter → card lookup → build_item over the whole panel ──
+            stages, self.last_coords = {}, []
+            items, n_anchors, skipped_outside_radius, skipped_seen = extract_panel_items(
+                self.parser, doc, lat, lon, kw, radius_m, stages, self.seen, places, self.last_coords,
+                claims
+            )
+            for stage, seconds in stages.items():
+                timing.add(stage, seconds)
+            logging.info("🔎 Found %d result links for %s", n_anchors, kw)
+
+            if not n_anchors:
+                # a list with no result links is an answer too, as in the "empty" panel state
+                outcome = "empty"
+                return n_anchors
+
+            outcome = "ok"
+            results.extend(items)
+            with timing.phase("cache"):
+                self._store_in_cache(lat, lon, kw, radius_m, html, items, n_anchors, skipped_seen)
+
+            # per-job summary
+            if skipped_outside_radius:
+                logging.info("⛔ Filtered %d outside %dm radius", skipped_outside_radius, radius_m)
+            if skipped_seen:
+                logging.info("🧬 Skipped %d places already scraped by other jobs", skipped_seen)
+
+        except Exception as exc:
+            outcome = self._classify(driver, exc)
+            logging.error("Job %s failed (%s): %s", idx, outcome, exc)
+            self.error_logger.error(
+                "Job %s failed (%s) for %s at (%s,%s) %s",
+                idx, outcome, kw, lat, lon, repr(exc), exc_info=True
+            )
+            failed.append((lat, lon, kw))
+        finally:
+            status = "failed" if len(failed) > failed_before else "done"
+            if status == "failed":
+                # its rows and places come from the retry, as in AsyncScraper
+                del results[before:]
+                claims = []
+            self._finish_job(idx, lat, lon, kw, results[before:], status, n_anchors,
+                             page_ready_s, self._network_stats(), outcome, timing, places, nav)
+            self.last_claims = claims
+            if self.sink is not None:
+                del results[before:]   # rows now live in the sink, not in memory
+
+        return n_anchors
+
+    def _navigate(self, driver, url: str, timing: JobTiming) -> str:
+        """
+        Brings the tab to ``url``. In soft mode, while the tab still shows the
+        results of the previous job, the loaded app is moved there in-page and
+        only falls back to a full load if the result list has not changed
+        within ``soft_nav_timeout``. Returns "soft", "full" or "fallback".
+
+        Neighbouring points under the same keyword often share their top
+        results, so the move counts only once the whole set of result links
+        differs from the previous job's and has held still for one poll; a
+        list still being swapped in is not credited to the new job.
+        """
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        nav = "full"
+        live, self._live_driver = self._live_driver, None   # set again once the panel is up
+        if self.nav_mode == "soft" and driver is live:
+            with timing.phase("soft_nav"):
+                before = frozenset(driver.execute_script(_ANCHOR_HREFS_JS) or ())
+                if before:
+                    last = None
+
+                    def moved(d):
+                        nonlocal last
+                        now = frozenset(d.execute_script(_ANCHOR_HREFS_JS) or ())
+                        settled = bool(now) and now != before and now == last
+                        last = now
+                        return settled
+
+                    nav = "fallback"
+                    try:
+                        if driver.execute_script(_SOFT_NAV_JS, url):
+                            WebDriverWait(driver, self.soft_nav_timeout).until(moved)
+                            nav = "soft"
+                    except TimeoutException:
+                        pass
+            if nav == "soft":
+                self._soft_misses = 0
+                return nav
+            if nav == "fallback":
+                self._soft_misses += 1
+                if self._soft_misses >= SOFT_NAV_MAX_MISSES and not any(
+                        s.get("nav") == "soft" for s in self.page_stats):
+                    logging.warning("🧭 In-page navigation never took in %d tries; using full loads",
+                                    self._soft_misses)
+                    self.nav_mode = "full"
+        with timing.phase("navigate"):
+            driver.get(url)
+        return nav
+
+    def _job_settings(self, attempt: int = 1) -> dict:
+        """Wait and scroll settings for ``attempt``; retries get the escalated ones."""
+        s = escalate({"wait_timeout": self.wait_timeout, "scroll_max": self.scroll_max,
+                      "scroll_interval": self.scroll_interval,
+                      "scroll_timeout": self.scroll_timeout}, attempt)
+        # event mode has no fixed interval, so a retry floors its waits instead
+        s["min_wait_s"] = s["scroll_interval"] if attempt > 1 else 0.0
+        return s
+
+    def _classify(self, driver, exc) -> str:
+        """Failure class of a job that raised, from the page the tab is left on."""
+        try:
+            page = driver.execute_script(PAGE_PROBE_JS)
+        except Exception:
+            page = None
+        return classify_failure(exc, page)
+
+    def _finish_job(self, idx, lat, lon, kw, items, status, found, page_ready_s, net, outcome,
+                    timing: JobTiming | None = None, places=None, nav: str | None = None):
+        """Per-job summary, page stats, checkpoint and metrics, shared by every scraper mode."""
+        self.last_outcome = outcome
+        self.outcome_counts[outcome] += 1
+        # ── snapshot after each job ──
+        if items:
+            logging.info("✅ Job %s appended %d records", idx, len(items))
+        else:
+            logging.info("🚨 Job %s yielded NO results", idx)
+        self.rows_total += len(items)
+        self._record_page(page_ready_s, net, nav)
+
+        # ── checkpoint the job before moving on ──
+        timing = timing or JobTiming()
+        with timing.phase("checkpoint"):
+            self._checkpoint(lat, lon, kw, status, items, found, places)
+        if self.metrics is not None:
+            self.metrics.record(timing, lat, lon, kw, outcome, found, len(items))
+
+    def _from_cache(self, lat, lon, kw, radius_m, places=None, claims=None):
+        """
+        (items, found) for a cached search, re-extracted from the cached HTML if
+        the parser changed since it was stored (or its items were cut down by
+        the seen-set); None on a miss. Places other jobs already scraped are
+        dropped, and the kept ones go to ``claims``, as for a live search.
+        """
+        if self.cache is None:
+            return None
+        entry = self.cache.get(lat, lon, kw, radius_m)
+        if entry is None:
+            return None
+        if entry["items"] is None:
+            items, found, _, skipped_seen = extract_panel_items(
+                self.parser, self.parser.parse(entry["html"]), lat, lon, kw, radius_m,
+                seen=self.seen, places=places, claims=claims
+            )
+            if not skipped_seen:
+                self.cache.put(lat, lon, kw, radius_m, entry["html"], items, found, refresh=True)
+        else:
+            items, found = entry["items"], entry["found"]
+            fps = place_fingerprints([item.get("link") for item in items])
+            if places is not None:
+                places.extend(fps.tolist())
+            if self.seen is not None and items:
+                known = self.seen.contains(fps)
+                items = [item for item, is_known in zip(items, known) if not is_known]
+                fps = fps[~known]
+            if claims is not None:
+                claims.extend(fps.tolist())
+        logging.info("🗄️  Cache hit for %s at (%.5f, %.5f): %d items", kw, lat, lon, len(items))
+        return items, found
+
+    def _store_in_cache(self, lat, lon, kw, radius_m, html, items, found, skipped_seen=0):
+        # items cut down by the seen-set depend on this run; keep only the HTML
+        if self.cache is not None:
+            self.cache.put(lat, lon, kw, radius_m, html, None if skipped_seen else items, found)
+
+    def _claim(self, fps) -> None:
+        """
+        Claims a finished job's built places in the seen-set. Called once the
+        job's rows are handed off (its progress message sent, i.e. its broker
+        lease completed), so a job that fails, or a process that dies before
+        that, leaves them to the retry.
+        """
+        if self.seen is not None and fps:
+            self.seen.claim(fps)
+
+    def _skip_keyword(self, lat, lon, kw, state: dict | None = None) -> bool:
+        """
+        Asks the keyword policy whether `kw` is still worth searching at this
+        point. ``state`` tracks the keywords already run at the current point;
+        concurrent callers (one per tab) pass their own.
+        """
+        if self.keyword_policy is None:
+            return False
+        state = self._point_state if state is None else state
+        point = (round(float(lat), 5), round(float(lon), 5))
+        if point != state.get("point"):
+            state["point"], state["keywords"] = point, set()
+        if self.keyword_policy.should_run(kw, state["keywords"], *point):
+            state["keywords"].add(kw)
+            return False
+        logging.info("⏭️  Skipping %s at (%.5f, %.5f): low expected yield after %s",
+                     kw, point[0], point[1], ", ".join(sorted(state["keywords"])))
+        if self.journal is not None:
+            self.journal.record(lat, lon, kw, "skipped")
+        return True
+
+    def _checkpoint(self, lat, lon, kw, status, items, found, places=None):
+        if self.sink is None:
+            if self.journal is not None:
+                self.journal.record(lat, lon, kw, status, items, found=found, places=places)
+            return
+        # with a sink, a job only counts as done once its rows are on disk
+        flushed = self.sink.write(items)
+        self._pending.append((lat, lon, kw, status, found, places))
+        if flushed:
+            self._commit_pending()
+
+    def _commit_pending(self):
+        if self.journal is not None and self._pending:
+            self.journal.record_many(self._pending)
+        self._pending = []
+
+    def _close_stores(self):
+        if self.sink is not None:
+            self.sink.close()
+            self._commit_pending()
+        if self.metrics is not None:
+            self.metrics.close()
+        if self.cache is not None:
+            self.cache_stats = dict(self.cache.stats)
+            logging.info("🗄️  Cache: %s", self.cache.summary())
+            self.cache.close()
+        if self.seen is not None:
+            logging.info("🧬 Skipped building %d places other jobs had already scraped "
+                         "(%d known across workers)", self.seen.skipped, len(self.seen))
+            self.seen.close()
+
+    def _network_stats(self):
+        try:
+            return self.driver_manager.network_stats()
+        except Exception as exc:   # a dead browser must not hide the job's own error
+            logging.debug("Network stats unavailable: %s", exc)
+            return None
+
+    def _record_page(self, page_ready_s, net, nav=None):
+        stats = {"mode": self.browser_mode, "page_ready_s": page_ready_s, "nav": nav}
+        if net:
+            stats.update(net)
+            logging.info("🌐 Page ready in %s (%s load), %.0f KB over %d requests (%d blocked)",
+                         f"{page_ready_s * 1000:.0f} ms" if page_ready_s is not None else "n/a",
+                         nav or "no", net["bytes"] / 1024, net["requests"], net["blocked"])
+        self.page_stats.append(stats)
+
+    def _log_page_stats(self):
+        ready = [s["page_ready_s"] for s in self.page_stats if s["page_ready_s"] is not None]
+        if not ready:
+            return
+        sizes = [s["bytes"] for s in self.page_stats if "bytes" in s]
+        blocked = sum(s.get("blocked", 0) for s in self.page_stats)
+        logging.info(
+            "🌐 %s browser: page ready p50 %.0f ms / p95 %.0f ms; %s per job; %d requests blocked over %d jobs",
+            self.browser_mode,
+            np.percentile(ready, 50) * 1000, np.percentile(ready, 95) * 1000,
+            f"{np.mean(sizes) / 1024:.0f} KB" if sizes else "n/a",
+            blocked, len(self.page_stats)
+        )
+        by_nav = {}
+        for st in self.page_stats:
+            if st["page_ready_s"] is not None and st.get("nav"):
+                by_nav.setdefault(st["nav"], []).append(st["page_ready_s"])
+        if self.nav_mode == "soft" or len(by_nav) > 1:
+            logging.info("🧭 Page ready by navigation: %s", "; ".join(
+                f"{nav} {len(by_nav[nav])} jobs, p50 {np.percentile(by_nav[nav], 50) * 1000:.0f} ms"
+                f" / p95 {np.percentile(by_nav[nav], 95) * 1000:.0f} ms"
+                for nav in NAV_KINDS if nav in by_nav
+            ))
+
+    def _log_outcomes(self):
+        if self.outcome_counts:
+            logging.info("🚦 Job outcomes: %s", ", ".join(
+                f"{k} {v}" for k, v in self.outcome_counts.most_common()))
+
+    def _log_scroll_savings(self):
+        if not self.scroll_stats:
+            return
+        saved_kb = sum(s["saved_chars"] for s in self.scroll_stats) / 1024
+        saved_ms = sum(s["saved_parse_s"] for s in self.scroll_stats) * 1000
+        logging.info(
+            "📉 In-browser polling saved ~%.0f KB transfer and ~%.0f ms parse over %d jobs",
+            saved_kb, saved_ms, len(self.scroll_stats)
+        )
+        # scroll time per stop reason, to tune the stop rules
+        by_reason: dict[str, list[float]] = {}
+        for s in self.scroll_stats:
+            by_reason.setdefault(s["stop"], []).append(s["scroll_s"])
+        logging.info("⏱️  Scroll (%s mode) by stop reason: %s", self.scroll_mode, "; ".join(
+            f"{reason} {len(t)} jobs, p50 {np.percentile(t, 50):.1f} s / p95 {np.percentile(t, 95):.1f} s"
+            for reason, t in sorted(by_reason.items())
+        ))
+        if self.scroll_mode == "event":
+            logging.info("⏱️  Load latency EWMA %.2f s → next wait %.2f s",
+                         self.pacer.latency_s, self.pacer.wait_s())
+
+    def _to_frame(self, results: list[dict]) -> "pd.DataFrame":
+        import pandas as pd
+
+        # ── unified DataFrame creation ──
+        return (
+            pd.DataFrame.from_records(results)
+              .reset_index(drop=True)
+        ) if results else pd.DataFrame(columns=RESULT_COLUMNS)
 
     def scrape(self):
         # ── 1) Start the browser ──
@@ -168,123 +1002,67 @@ class GoogleMapsScraper:
 
         try:
             # ── 2) Main loop ──
-            for idx, (lat, lon, kw) in enumerate(self.jobs, start=1):
-                before = len(results)
-                try:
-                    lat, lon = float(lat), float(lon)
-                    logging.info("Job %s/%s: %s at (%.5f, %.5f)", idx, total, kw, lat, lon)
-
-                    # ── (4) Include locale param for stable Spanish panels ──
-                    url = (
-                        f"https://www.google.com/maps/search/{quote_plus(kw)}/"
-                        f"@{lat},{lon},{self.radius_m}m/data=!3m1!4b1?hl=es-419&gl=PY"
-                    )
-                    driver.get(url)
-
-                    WebDriverWait(driver, self.wait_timeout).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "a.hfpxzc"))
-                    )
-                    time.sleep(1)
-
-                    panel = driver.find_element(
-                        By.XPATH, f"//div[@aria-label='Resultados de {kw}']"
-                    )
-                    soup = self._scroll_and_check(
-                        panel,
-                        check_interval=self.scroll_interval,
-                        timeout=self.scroll_timeout,
-                        max_total_scrolls=self.scroll_max
-                    )
-                    if not soup:
-                        self.error_logger.warning("No soup for '%s' @(%f,%f)", kw, lat, lon)
-                        failed.append((lat, lon, kw))
-                        continue
-
-                    # pull out every result link
-                    # ── grab every result link anchor ──
-                    anchors = soup.select("a.hfpxzc[aria-label]")
-                    logging.info("🔎 Found %d result links for %s", len(anchors), kw)
-
-                    # if absolutely nothing showed up, mark as failure
-                    if not anchors:
-                        failed.append((lat, lon, kw))
-                        continue
-
-                    accepted = 0
-                    skipped_outside_radius = 0
-
-                    for anchor in anchors:
-                        link = anchor.get("href", "")
-                        coords = _coords_from_link(link)
-                        if not coords:
-                            continue
-
-                        # radius filter
-                        dist_m = haversine(lat, lon, coords[0], coords[1])
-                        if dist_m > self.radius_m:
-                            skipped_outside_radius += 1
-                            continue
-
-                        # try several ways to find the "card" wrapper
-                        card = (
-                            anchor.find_parent("div", class_="CpccDe") or
-                            anchor.find_parent("div", class_="Nv2PK") or
-                            anchor.find_parent("div", class_="section-result")
-                        )
-                        if not card:
-                            logging.warning("⚠️  Couldn't find card container for %s → skipping", link)
-                            continue
-
-                        def safe_get_text(elem, default=""):
-                            return clean_text(elem.get_text(strip=True)) if elem else default
-
-                        try:
-                            item = build_item(
-                                version="loc1",
-                                card=card,
-                                coords=coords,
-                                kw=kw,
-                                anchor=anchor,
-                                safe_get_text=safe_get_text,
-                                clean_text=clean_text
-                            )
-                            results.append(item)
-                            accepted += 1
-                        except Exception as ex:
-                            logging.warning("Error building item for %s: %s", kw, ex)
-
-                    # per-job summary
-                    if skipped_outside_radius:
-                        logging.info("⛔ Filtered %d outside %dm radius", skipped_outside_radius, self.radius_m)
-
-                except Exception as exc:
-                    logging.error("Job %s failed: %s", idx, exc)
-                    self.error_logger.error(
-                        "Job %s failed for %s at (%s,%s) %s",
-                        idx, kw, lat, lon, repr(exc), exc_info=True
-                    )
-                    failed.append((lat, lon, kw))
-                finally:
-                    # ── snapshot after each job ──
-                    after = len(results)
-                    new = after - before
-                    if new:
-                        logging.info("✅ Job %s appended %d records", idx, new)
-                    else:
-                        logging.info("🚨 Job %s yielded NO results", idx)
-
+            for idx, (lat, lon, kw, *radius) in enumerate(self.jobs, start=1):
+                if self._skip_keyword(lat, lon, kw):
+                    continue
+                self._scrape_job(driver, f"{idx}/{total}", lat, lon, kw, results, failed, *radius)
+                self._claim(self.last_claims)
+                driver = self.driver_manager.after_job(self.last_outcome)
         finally:
             # ── (3) Always quit the browser, even if something blows up ──
-            driver.quit()
-
-        # ── unified DataFrame creation + dedupe ──
-        df = (
-            pd.DataFrame.from_records(results)
-              .reset_index(drop=True)
-        ) if results else pd.DataFrame(columns=[
-            "latitude","longitude","keyword","name","link","rating",
-            "category","address","phone","hours","services","price","amenities"
-        ])
+            self.driver_manager.stop_driver()
+            self._close_stores()
 
+        self._log_scroll_savings()
+        self._log_page_stats()
+        self._log_outcomes()
+        df = self._to_frame(results)
         logging.info("✅ scrape() returning %d rows and %d failed jobs", len(df), len(failed))
         return df, failed
+
+    def scrape_queue(self, job_queue, progress_queue=None, worker_id: int = 0):
+        """
+        Work-stealing variant of ``scrape``: keeps a browser open (swapped by a
+        DriverPool when it turns unhealthy) and pulls batches of jobs from a
+        shared queue until it receives a ``None`` sentinel. After every job a
+        ``(worker_id, jobs_done, rows, failed, job, found, outcome, coords)``
+        tuple is put on ``progress_queue`` so the parent can report per-worker
+        progress and react to each job's outcome (``found`` is None for failed
+        jobs; ``outcome`` is one of Throttle.OUTCOMES; ``coords`` lists the
+        (lat, lon) of the places a live search found, else None). While the shared ``throttle``
+        state parks this worker it takes no new batches.
+        """
+        driver = self.driver_manager.start_driver()
+
+        results: list[dict] = []
+        failed: list[tuple] = []
+        done = 0
+
+        try:
+            while True:
+                wait_for_turn(self.throttle, worker_id)
+                batch = job_queue.get()
+                if batch is None:
+                    break
+                for job in batch:
+                    done += 1
+                    if self._skip_keyword(*job[:3]):
+                        found, outcome, coords, claims = None, "skipped", None, []
+                    else:
+                        found = self._scrape_job(driver, f"w{worker_id}#{done}", *job[:3], results, failed, *job[3:])
+                        outcome, coords, claims = self.last_outcome, self.last_coords, self.last_claims
+                        driver = self.driver_manager.after_job(outcome)
+                    if progress_queue is not None:
+                        progress_queue.put((worker_id, done, self.rows_total, len(failed), tuple(job), found,
+                                            outcome, coords))
+                    self._claim(claims)
+        finally:
+            self.driver_manager.stop_driver()
+            self._close_stores()
+
+        self._log_scroll_savings()
+        self._log_page_stats()
+        self._log_outcomes()
+        df = self._to_frame(results)
+        logging.info("✅ Worker %s finished %d jobs: %d rows, %d failed", worker_id, done, self.rows_total, len(failed))
+        return df, failed
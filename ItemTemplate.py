@@ -12,6 +12,10 @@ Usage example (inside GoogleMapsScraper):
 """
 
 import re
+from functools import lru_cache
+
+# card wrapper classes, in the order the scraper tries them
+CARD_CLASSES = ("CpccDe", "Nv2PK", "section-result")
 
 def build_item(version, card, coords, kw, anchor, safe_get_text, clean_text):
     """
@@ -26,6 +30,8 @@ def build_item(version, card, coords, kw, anchor, safe_get_text, clean_text):
         w4_blocks = card.select("div.W4Efsd")
 
         # ——— PRICE & RATING BLOCK ——————————————————————————————————
+        # a place without reviews has no rating slot at all
+        rating = ""
         price = ""
         w4_blocks = card.select("div.W4Efsd")
         if w4_blocks:
@@ -122,3 +128,113 @@ def build_item(version, card, coords, kw, anchor, safe_get_text, clean_text):
             "amenities": amenities,
         }
 
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+@lru_cache(maxsize=None)
+def _compiled_xpaths():
+    """
+    XPath equivalents of the CSS selects used by `build_item`, compiled once.
+    Descendant combinators ("span span", "div.ktbgEf div[role='img']") match
+    ancestors anywhere in the tree, exactly like soupsieve does.
+    """
+    from lxml import etree
+    return {
+        "text": etree.XPath("descendant::text()"),
+        "name": etree.XPath(f"descendant::div[{_has_class('qBF1Pd')}][1]"),
+        "w4": etree.XPath(f"descendant::div[{_has_class('W4Efsd')}]"),
+        "container": etree.XPath(f"descendant::div[{_has_class('AJB7ye')}][1]"),
+        "child_spans": etree.XPath("span"),
+        "rating": etree.XPath(f"descendant::span[{_has_class('ZkP5Je')}][1]"),
+        "price_icon": etree.XPath("descendant::span[@role='img'][@aria-label][1]"),
+        "spans": etree.XPath("descendant::span"),
+        "nested_span": etree.XPath("descendant::span[ancestor::span][1]"),
+        "amenities": etree.XPath(
+            f"descendant::div[@role='img'][ancestor::div[{_has_class('ktbgEf')}]]"
+        ),
+    }
+
+
+def build_item_lxml(version, card, coords, kw, anchor, clean_text):
+    """
+    lxml twin of `build_item`: same fields, same fallbacks, same output,
+    for cards coming from an lxml document instead of a BeautifulSoup tree.
+    """
+    xp = _compiled_xpaths()
+
+    def get_text(elem):
+        # mirrors bs4's get_text(strip=True)
+        return "".join(t.strip() for t in xp["text"](elem))
+
+    def safe_get_text(elem, default=""):
+        return clean_text(get_text(elem)) if elem is not None else default
+
+    def first(matches):
+        return matches[0] if matches else None
+
+    if version == "loc1":
+        # --- 0) Base fields ---
+        name = safe_get_text(first(xp["name"](card)))
+        link = anchor.get("href", "")
+
+        # ——— PRICE & RATING BLOCK ——————————————————————————————————
+        # a place without reviews has no rating slot at all
+        rating = ""
+        price = ""
+        w4_blocks = xp["w4"](card)
+        if w4_blocks:
+            container = first(xp["container"](w4_blocks[0]))
+            if container is not None:
+                children = xp["child_spans"](container)
+                # 1) rating
+                if len(children) > 1:
+                    rating = safe_get_text(first(xp["rating"](children[1])))
+                # 2) price in the third span
+                if len(children) > 2:
+                    icon = first(xp["price_icon"](children[2]))
+                    if icon is not None:
+                        price = icon.get("aria-label")
+                    else:
+                        # fallback to any ₲-prefixed text in that block
+                        for sp in xp["spans"](children[2]):
+                            txt = get_text(sp)
+                            if txt.startswith("₲"):
+                                price = txt
+                                break
+
+        # --- 2) Category & Address (second W4Efsd -> first nested) ---
+        category = ""
+        address = ""
+        if len(w4_blocks) > 1:
+            nested_blocks = xp["w4"](w4_blocks[1])
+            if nested_blocks:
+                cat_span = first(xp["nested_span"](nested_blocks[0]))
+                if cat_span is not None:
+                    category = re.sub(r"\d+", "", get_text(cat_span)).strip()
+
+                direct_spans = xp["child_spans"](nested_blocks[0])
+                if len(direct_spans) >= 2:
+                    raw_addr = get_text(direct_spans[-1])
+                    address = re.sub(r'^[·\s]+', '', raw_addr)
+
+        # --- 4) Amenities ---
+        amenities = [
+            clean_text(tag.get("aria-label", ""))
+            for tag in xp["amenities"](card)
+            if tag.get("aria-label") is not None
+        ]
+
+        return {
+            "latitude": coords[0],
+            "longitude": coords[1],
+            "keyword": kw,
+            "name": name,
+            "link": link,
+            "rating": rating,
+            "price": price,
+            "category": category,
+            "address": address,
+            "amenities": amenities,
+        }
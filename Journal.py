@@ -0,0 +1,148 @@
+"""
+Append-only, crash-safe job journal backed by SQLite in WAL mode.
+
+Every worker opens its own connection and records each job as soon as it
+finishes: one transaction writes the job status and all of its items, so a
+crash can lose at most the job that was running. On restart, `Main` skips the
+jobs marked "done" (or "skipped" by the keyword planner) and rebuilds the
+merged results from the journal.
+
+Jobs are keyed by (latitude, longitude, keyword) with coordinates rounded to
+5 decimals, the same precision the grid is exported with.
+
+`places` keeps every place each job found inside its radius, as a 64-bit
+fingerprint per (job rowid, place) pair (SeenSet.py), including the places
+whose items were not built because another job had them already. That is
+the keyword/grid-point association the de-duplicated items no longer carry.
+"""
+
+import json
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    latitude   REAL NOT NULL,
+    longitude  REAL NOT NULL,
+    keyword    TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    attempts   INTEGER NOT NULL DEFAULT 1,
+    found      INTEGER,
+    n_items    INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (latitude, longitude, keyword)
+);
+CREATE TABLE IF NOT EXISTS items (
+    latitude   REAL NOT NULL,
+    longitude  REAL NOT NULL,
+    keyword    TEXT NOT NULL,
+    item       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_job ON items (latitude, longitude, keyword);
+CREATE TABLE IF NOT EXISTS places (
+    job        INTEGER NOT NULL,
+    place      INTEGER NOT NULL,
+    PRIMARY KEY (job, place)
+) WITHOUT ROWID;
+"""
+
+
+def job_key(lat, lon, kw) -> tuple[float, float, str]:
+    return round(float(lat), 5), round(float(lon), 5), str(kw)
+
+
+class JobJournal:
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # FULL makes every commit durable (fsync on the WAL) — jobs are
+        # seconds long, so the extra fsync per job is noise
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript(SCHEMA)
+
+    def record(self, lat, lon, kw, status: str, items=(), found: int | None = None,
+               places=None) -> None:
+        """Stores one finished job and replaces any items (and places) from an earlier attempt."""
+        key = job_key(lat, lon, kw)
+        items = list(items)
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute(
+                """
+                INSERT INTO jobs (latitude, longitude, keyword, status, found, n_items, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (latitude, longitude, keyword) DO UPDATE SET
+                    status = excluded.status,
+                    attempts = jobs.attempts + 1,
+                    found = excluded.found,
+                    n_items = excluded.n_items,
+                    updated_at = excluded.updated_at
+                """,
+                (*key, status, found, len(items), time.time()),
+            )
+            self.conn.execute(
+                "DELETE FROM items WHERE latitude = ? AND longitude = ? AND keyword = ?", key
+            )
+            self.conn.executemany(
+                "INSERT INTO items (latitude, longitude, keyword, item) VALUES (?, ?, ?, ?)",
+                [(*key, json.dumps(it, ensure_ascii=False)) for it in items],
+            )
+            if places is not None:
+                self._record_places(key, places)
+
+    def _record_places(self, key, places) -> None:
+        job = self.conn.execute(
+            "SELECT rowid FROM jobs WHERE latitude = ? AND longitude = ? AND keyword = ?", key
+        ).fetchone()[0]
+        self.conn.execute("DELETE FROM places WHERE job = ?", (job,))
+        self.conn.executemany("INSERT OR IGNORE INTO places (job, place) VALUES (?, ?)",
+                              [(job, int(p)) for p in places])
+
+    def record_many(self, jobs) -> None:
+        """Marks several (lat, lon, kw, status, found[, places]) jobs at once, without items."""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            for lat, lon, kw, status, found, *places in jobs:
+                self.conn.execute(
+                    """
+                    INSERT INTO jobs (latitude, longitude, keyword, status, found, n_items, updated_at)
+                    VALUES (?, ?, ?, ?, ?, 0, ?)
+                    ON CONFLICT (latitude, longitude, keyword) DO UPDATE SET
+                        status = excluded.status,
+                        attempts = jobs.attempts + 1,
+                        found = excluded.found,
+                        updated_at = excluded.updated_at
+                    """,
+                    (*job_key(lat, lon, kw), status, found, time.time()),
+                )
+                if places and places[0] is not None:
+                    self._record_places(job_key(lat, lon, kw), places[0])
+
+    def completed(self) -> set[tuple[float, float, str]]:
+        rows = self.conn.execute(
+            "SELECT latitude, longitude, keyword FROM jobs WHERE status IN ('done', 'skipped')"
+        )
+        return {tuple(r) for r in rows}
+
+    def found_counts(self) -> dict[tuple[float, float, str], int | None]:
+        """Result links found per completed job, for planners resuming a run."""
+        rows = self.conn.execute(
+            "SELECT latitude, longitude, keyword, found FROM jobs WHERE status IN ('done', 'skipped')"
+        )
+        return {(r[0], r[1], r[2]): r[3] for r in rows}
+
+    def failed_jobs(self) -> list[tuple[float, float, str]]:
+        rows = self.conn.execute(
+            "SELECT latitude, longitude, keyword FROM jobs WHERE status = 'failed'"
+        )
+        return [tuple(r) for r in rows]
+
+    def load_items(self) -> "pd.DataFrame":
+        import pandas as pd
+
+        rows = self.conn.execute("SELECT item FROM items ORDER BY rowid")
+        return pd.DataFrame.from_records([json.loads(r[0]) for r in rows])
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,230 @@
+"""
+Keyword-overlap analysis and cross-keyword job pruning.
+
+Learns from past runs which places each keyword finds, then:
+
+- `overlap()`:         containment matrix, share of A's places that B also finds;
+- `reduce_keywords()`: greedy set cover, i.e. the keywords (in order of
+                       marginal value) that still reach `coverage` of all places;
+- `should_run()`:      at run time, skips a keyword at a grid point when its
+                       expected marginal yield there is below `min_yield`.
+
+The marginal yield is taken from the point's own cell (``cell_m`` metres,
+the cells YieldPlanner pools by): the keyword's mean places per search in
+that cell times the share of its places there that the keywords already
+searched at the point did not find. A cell where the keyword has no history
+always runs it, so what one part of the city learnt never prunes another.
+
+History comes from journals (`*.sqlite`), Parquet parts (directories or
+`*.parquet`) or results CSVs. A de-duplicated results CSV keeps only one
+keyword per place, so it understates overlap, and so do parts written with
+the cross-worker seen-set on; journals, whose `places` table keeps every
+job's places, are the best source.
+
+Usage:
+    python KeywordPlanner.py journal_ASUNCIÓN.sqlite [more sources...]
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pandas as pd
+
+from SeenSet import fingerprint, place_keys
+from YieldPlanner import CELL_M, _cells
+
+MAX_KEYWORDS = 63   # one bit per keyword in a signed int64 place mask
+
+
+def _place_ids(links: pd.Series) -> pd.Series:
+    # the same 64-bit place fingerprints the journal's places table stores
+    keys = place_keys(links)
+    return pd.Series([fingerprint(k) for k in keys], index=links.index, dtype=np.int64)
+
+
+def load_history(sources) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Returns (unique [place, keyword, latitude, longitude] rows, one
+    [latitude, longitude, keyword] row per completed search). Journal rows
+    carry the coordinates of the job that found the place; CSV and Parquet
+    rows those of the place itself.
+    """
+    cols = ["keyword", "link", "latitude", "longitude"]
+    frames, places, jobs = [], [], []
+    for src in sources:
+        if not os.path.exists(src):
+            continue
+        if src.endswith(".sqlite"):
+            with sqlite3.connect(src) as conn:
+                frames.append(pd.read_sql_query(
+                    "SELECT keyword, json_extract(item, '$.link') AS link, latitude, longitude "
+                    "FROM items", conn))
+                if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'places'").fetchone():
+                    places.append(pd.read_sql_query(
+                        "SELECT j.keyword, p.place, j.latitude, j.longitude "
+                        "FROM places p JOIN jobs j ON j.rowid = p.job", conn))
+                jobs.append(pd.read_sql_query(
+                    "SELECT latitude, longitude, keyword FROM jobs WHERE status = 'done'", conn))
+        elif os.path.isdir(src) or src.endswith(".parquet"):
+            from ResultSink import iter_batches
+            for batch in iter_batches(src, cols):
+                frames.append(batch.to_pandas())
+        else:
+            frames.append(pd.read_csv(src, usecols=cols))
+
+    searches = pd.concat(jobs, ignore_index=True) if jobs else \
+        pd.DataFrame(columns=["latitude", "longitude", "keyword"])
+    out = ["place", "keyword", "latitude", "longitude"]
+    if not frames and not places:
+        return pd.DataFrame(columns=out), searches
+    hist = pd.concat(frames, ignore_index=True).dropna() if frames else pd.DataFrame(columns=cols)
+    hist["place"] = _place_ids(hist["link"].astype(str))
+    hist = pd.concat([hist[out]] + places, ignore_index=True) \
+        .drop_duplicates(["place", "keyword"]).reset_index(drop=True)
+    return hist, searches
+
+
+class KeywordPlanner:
+    def __init__(self, history: pd.DataFrame, searches: pd.DataFrame | None = None,
+                 min_yield: float = 0.5, cell_m: float = CELL_M):
+        self.min_yield = min_yield
+        self.cell_m = cell_m
+        self.keywords = sorted(history["keyword"].unique())
+        if len(self.keywords) > MAX_KEYWORDS:
+            raise ValueError(f"{len(self.keywords)} keywords in the history; the place bitmasks "
+                             f"hold at most {MAX_KEYWORDS}")
+        self.index = {kw: i for i, kw in enumerate(self.keywords)}
+
+        # one bitmask per place: bit i set if keyword i found it
+        bits = np.left_shift(np.int64(1), history["keyword"].map(self.index).astype(np.int64))
+        masks = bits.groupby(history["place"]).agg(np.bitwise_or.reduce)
+        self.place_masks = masks.to_numpy(dtype=np.int64)
+        self.masks_by_kw = {
+            kw: self.place_masks[(self.place_masks >> i) & 1 == 1]
+            for kw, i in self.index.items()
+        }
+
+        # mean places per search; without job counts, assume the busiest
+        # keyword was searched as often as any other
+        counts = history["keyword"].value_counts()
+        searches = searches if searches is not None else pd.DataFrame(columns=["keyword"])
+        per_kw = searches["keyword"].value_counts()
+        fallback = per_kw.max() if len(per_kw) else max(counts.max(), 1)
+        self.yields = {
+            kw: float(counts.get(kw, 0) / max(per_kw.get(kw, fallback), 1))
+            for kw in self.keywords
+        }
+
+        # the same per cell: each place's mask over the keywords that found it
+        # in that cell, and every keyword's places per search there
+        cells = pd.Series(_cells(history["latitude"], history["longitude"], cell_m),
+                          index=history.index)
+        cell_masks = bits.groupby([cells, history["place"]]).agg(np.bitwise_or.reduce)
+        self.cell_masks = {
+            cell: grp.to_numpy(dtype=np.int64)
+            for cell, grp in cell_masks.groupby(level=0)
+        }
+        cell_counts = history.groupby([cells, history["keyword"]]).size()
+        if len(searches):
+            cell_searches = searches.groupby(
+                [_cells(searches["latitude"], searches["longitude"], cell_m), searches["keyword"]]
+            ).size()
+        else:
+            # no job counts: only the keywords that found something in a cell
+            # count as searched there, the busiest of them as often as any other
+            cell_searches = cell_counts.groupby(level=0).transform("max")
+        cell_counts = cell_counts.reindex(cell_searches.index, fill_value=0)
+        self.cell_yields = (cell_counts / cell_searches.clip(lower=1)).to_dict()
+        self._cache: dict[tuple, float] = {}
+        self.skipped = 0
+
+    @classmethod
+    def from_sources(cls, sources, min_yield: float = 0.5, cell_m: float = CELL_M):
+        history, searches = load_history(sources)
+        if history.empty:
+            return None
+        return cls(history, searches, min_yield, cell_m)
+
+    def overlap(self) -> pd.DataFrame:
+        """C[a, b] = share of a's places that b also finds."""
+        out = pd.DataFrame(0.0, index=self.keywords, columns=self.keywords)
+        for a, i in self.index.items():
+            masks = self.masks_by_kw[a]
+            if not len(masks):
+                continue
+            for b, j in self.index.items():
+                out.loc[a, b] = float(((masks >> j) & 1).mean())
+        return out
+
+    def reduce_keywords(self, keywords, coverage: float = 0.98) -> list:
+        """
+        Greedy set cover over the history: keywords ordered by how many not
+        yet covered places they add, cut once `coverage` of all known places is
+        reached. Keywords without history are kept, at the end.
+        """
+        unknown = [kw for kw in keywords if kw not in self.index]
+        remaining = [kw for kw in keywords if kw in self.index]
+        total = len(self.place_masks)
+        covered = np.zeros(total, dtype=bool)
+        chosen = []
+        while remaining and covered.mean() < coverage:
+            gains = {
+                kw: int(((self.place_masks >> self.index[kw]) & 1).astype(bool)[~covered].sum())
+                for kw in remaining
+            }
+            best = max(remaining, key=gains.get)
+            if gains[best] == 0:
+                break
+            chosen.append(best)
+            remaining.remove(best)
+            covered |= ((self.place_masks >> self.index[best]) & 1).astype(bool)
+        logging.info(
+            "🔑 %d of %d keywords cover %.1f%% of %d known places; dropped: %s",
+            len(chosen), len(chosen) + len(remaining), 100 * covered.mean() if total else 0,
+            total, ", ".join(remaining) or "none"
+        )
+        return chosen + unknown
+
+    def marginal_yield(self, kw: str, done, lat: float, lon: float) -> float:
+        """
+        Expected new places from searching `kw` at (lat, lon) where `done` was
+        already searched, from the history of the point's cell; infinite where
+        that cell holds no search of `kw`.
+        """
+        cell = int(_cells([lat], [lon], self.cell_m)[0])
+        if kw not in self.index or (cell, kw) not in self.cell_yields:
+            return float("inf")
+        done_mask = 0
+        for d in done:
+            if d in self.index:
+                done_mask |= 1 << self.index[d]
+        key = (cell, kw, done_mask)
+        if key not in self._cache:
+            masks = self.cell_masks.get(cell, np.empty(0, dtype=np.int64))
+            masks = masks[(masks >> self.index[kw]) & 1 == 1]
+            novel = float(((masks & done_mask) == 0).mean()) if len(masks) else 0.0
+            self._cache[key] = self.cell_yields[(cell, kw)] * novel
+        return self._cache[key]
+
+    def should_run(self, kw: str, done, lat: float, lon: float) -> bool:
+        if self.marginal_yield(kw, done, lat, lon) >= self.min_yield:
+            return True
+        self.skipped += 1
+        return False
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python KeywordPlanner.py <journal.sqlite|parts_dir|results.csv> ...")
+    planner = KeywordPlanner.from_sources(sys.argv[1:])
+    if planner is None:
+        sys.exit("No history found in the given sources.")
+    pd.set_option("display.width", 200)
+    print((planner.overlap() * 100).round(0).astype(int).to_string())
+    print("\nMean places per search:")
+    for kw, y in sorted(planner.yields.items(), key=lambda kv: -kv[1]):
+        print(f"  {kw:<20}{y:8.2f}")
+    print("\nReduced keyword set:", planner.reduce_keywords(planner.keywords))
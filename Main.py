@@ -1,22 +1,78 @@
 import logging
 import os
-import pandas as pd
+import queue
+import time
 from concurrent.futures import ProcessPoolExecutor
 from multiprocessing import get_context
 
-from CleanDep   import clean_department_names
-from Departamento import build_grid_from_shapefile
-from Gridexporter import export_grid_to_csv
-from GoogleMapsScraper import DriverManager, GridLoader, GoogleMapsScraper
-from Retry      import retry_and_merge, load_failed
-from Processor import process_scraped_csv
+_IMPORT_T0 = time.time()   # startup benchmark: when the project imports below begin
+
+# Spawned workers import this module too, so only what they need is imported
+# here; the parent-only steps (geopandas, shapely, post-processing) import
+# theirs in main(). See Startup.py.
+from GoogleMapsScraper import DriverManager, GoogleMapsScraper
+from DriverPool import DriverPool, format_pool_stats, merge_pool_stats
+from Retry      import RETRYABLE, RetryScheduler, job_attempt, write_dead_letters
+from Journal    import JobJournal, job_key
+from ResultCache import format_stats, merge_stats
+from Throttle   import AIMDController
+from SeenSet    import SeenSet
+from Startup    import report_startup, startup_stats
+from JobOrder   import order_jobs
 
 # ───── GLOBAL CONFIG ─────────────────────────────────────────
 SCROLL_MAX       = 50        # how many PAGE_DOWNs per job
 WAIT_TIMEOUT     = 20        # seconds to wait for results panel
-NUM_PROCESSES    = 3         # parallel job chunks
+NUM_PROCESSES    = 3         # parallel workers pulling from the job queue
+JOB_BATCH_SIZE   = 2         # jobs a worker takes from the queue at a time
 SCROLL_INTERVAL  = 0.8       # time between scrolls
 SCROLL_TIMEOUT   = 4         # seconds to wait with no new cards
+SCROLL_MODE      = "event"   # "event" (wait on DOM changes), "incremental" (poll in-browser) or "legacy"
+PARSER_BACKEND   = "lxml"    # "lxml" (compiled XPath) or "bs4" (reference parser)
+RECORD_DIR       = None      # e.g. "fixtures" to save every job's panel HTML for Benchmark.py
+JOURNAL_PATH     = "journal_{city}.sqlite"  # per-job checkpoint journal; None disables resume
+RESULT_FORMAT    = "parquet" # "parquet" (streaming sink, bounded memory) or "csv" (in-memory merge)
+GRID_LAYOUT      = "square"  # "square" grid or "hex" lattice (same coverage, fewer points)
+GRID_MODE        = "uniform" # "uniform" grid or "adaptive" quadtree refined where results saturate
+ADAPTIVE_COARSE_FACTOR = 4   # adaptive mode: coarse cells are this many times the radius
+RESULT_CEILING   = 110       # result links at which Google's list counts as capped
+KEYWORD_PRUNING  = False     # learn keyword overlap from past runs and drop redundant searches
+KEYWORD_HISTORY  = None      # journals/parts/results to learn from; None = this city's own, once complete
+KEYWORD_COVERAGE = 0.98      # share of known places the reduced keyword set must still find
+KEYWORD_MIN_YIELD = 0.5      # skip a keyword at a point below this many expected new places
+KEYWORD_CELL_M   = 1000      # a point's expected yield comes from the history of its cell of this size
+LEAN_BROWSER     = True      # block tiles/images/fonts/telemetry and run a small, stripped-down Chrome
+PROFILE_DIR      = "chrome_profiles"  # per-worker Chrome profiles (keeps the HTTP cache); None = temporary
+ASYNC_TABS       = 0         # tabs per browser in the asyncio/Playwright scraper; 0 = one Selenium tab per process
+ASYNC_BROWSERS   = 1         # browsers per process when ASYNC_TABS > 0
+CACHE_PATH       = "search_cache.sqlite"  # panel HTML + items per search, reused on re-runs; None disables
+CACHE_TTL_DAYS   = 7         # cached searches older than this are scraped again
+CACHE_MAX_MB     = 2048      # least recently used entries are evicted past this size
+FORCE_REFRESH    = False     # ignore cached searches (fresh results still refresh the cache)
+THROTTLE         = True      # AIMD control of active workers and per-job delay from CAPTCHA/timeout signals
+THROTTLE_MAX_DELAY = 30      # seconds; upper bound of the per-job delay under throttling
+METRICS_DIR      = "metrics" # per-job phase timings (JSON lines + Prometheus snapshots); None disables
+RETRY_ATTEMPTS   = 3         # tries per job, retries included; later ones wait and scroll longer
+RETRY_BACKOFF_S  = 30        # first retry delay, doubled per attempt (±50% jitter)
+RETRY_BACKOFF_MAX_S = 600    # cap on the retry delay
+DEDUP_PLACES     = True      # shared seen-set: build each place's item once per run, across workers
+SEEN_CAPACITY    = 1 << 22   # seen-set slots (8 bytes each); dedup stops past 75% full
+DRIVER_SPARES    = 1         # warm browsers per worker, launched ahead and swapped in on recycle; 0 = relaunch in place
+DRIVER_RECYCLE_JOBS = 250    # restart a worker's browser after this many jobs
+DRIVER_MAX_HEAP_MB = 512     # ... or when its page's JS heap grows past this
+DRIVER_CHECK_EVERY = 10      # jobs between responsiveness/memory checks (always after a failed job)
+JOB_ORDER        = "hilbert" # "hilbert" or "zorder": nearby points one after another, keyword by keyword; None = grid order
+NAV_MODE         = "soft"    # "soft" (move the loaded Maps app in-page, full load as fallback) or "full" (reload every job)
+SOFT_NAV_TIMEOUT = 5         # seconds for an in-page move to change the results before falling back to a full load
+RESULTS_INDEX    = True      # spatial index next to the results (results_<city>.index.npz) + coverage report
+INDEX_CELL_M     = 250       # index cell size in meters
+YIELD_PLANNING   = False     # estimate each job's time and new places from past runs; ETA and best jobs first
+YIELD_HISTORY    = None      # journals/metrics dirs to learn from; None = this city's journal + METRICS_DIR
+                             # (metrics records of other cities or radii are left out either way)
+YIELD_CELL_M     = 1000      # history is pooled per (cell of this size, keyword)
+YIELD_TIERS      = 4         # yield bands run best first; JOB_ORDER keeps locality within a band
+YIELD_MIN        = 0         # drop jobs expected to find fewer new places than this; 0 keeps all
+TIME_BUDGET_H    = None      # hours; keep only the jobs (best places per second) that fit, e.g. 6
 
 KEYWORDS = [
     "Centro Comercial", "Mercado", "Concesionario", "Supermercado",
@@ -35,34 +91,249 @@ CLEAN_NAMES = {
 }
 
 
-def process_job_chunk(chunk, city_name, radius_m):
-    mgr = DriverManager(headless=True)
-    scraper = GoogleMapsScraper(
-        driver_manager=mgr,
-        jobs=chunk,
+# set by _init_worker in each pool process
+_WORKER_START: dict = {}
+
+
+def _init_worker():
+    """Pool initializer: logging for the spawned process, and when it was ready for work."""
+    logging.basicConfig(level=logging.INFO)
+    _WORKER_START.update(import_t0=_IMPORT_T0, up=time.time())
+
+
+def make_scraper(worker_id, city_name, radius_m, **stores):
+    """
+    The scraper one worker process runs, built from the config above;
+    ``stores`` are further GoogleMapsScraper keyword arguments (journal,
+    sink, keyword policy, throttle, seen-set handle).
+    """
+    settings = dict(
         city_name=city_name,
         radius_m=radius_m,
         scroll_max=SCROLL_MAX,
         wait_timeout=WAIT_TIMEOUT,
         scroll_interval=SCROLL_INTERVAL,
         scroll_timeout=SCROLL_TIMEOUT,
+        scroll_mode=SCROLL_MODE,
+        parser=PARSER_BACKEND,
+        record_dir=RECORD_DIR,
+        worker_id=worker_id,
+        cache_path=CACHE_PATH,
+        cache_ttl_s=CACHE_TTL_DAYS * 86400,
+        cache_max_mb=CACHE_MAX_MB,
+        force_refresh=FORCE_REFRESH,
+        metrics_dir=METRICS_DIR,
+        **stores,
     )
-    df, failed = scraper.scrape()
-    logging.info(f"🔎 Chunk done: {len(df)} rows, {len(failed)} failures")
-    return df, failed
+    if ASYNC_TABS:
+        from AsyncScraper import AsyncScraper
+        scraper = AsyncScraper(browsers=ASYNC_BROWSERS, tabs=ASYNC_TABS, headless=True,
+                               lean=LEAN_BROWSER, profile_dir=PROFILE_DIR, **settings)
+    else:
+        mgr = DriverPool(
+            DriverManager(headless=True, lean=LEAN_BROWSER, profile_dir=PROFILE_DIR, worker_id=worker_id),
+            spares=DRIVER_SPARES, recycle_after=DRIVER_RECYCLE_JOBS,
+            max_heap_mb=DRIVER_MAX_HEAP_MB, check_every=DRIVER_CHECK_EVERY,
+        )
+        scraper = GoogleMapsScraper(driver_manager=mgr, jobs=[], nav_mode=NAV_MODE,
+                                    soft_nav_timeout=SOFT_NAV_TIMEOUT, **settings)
+    return scraper
+
+
+def process_job_chunk(job_queue, progress_queue, worker_id, city_name, radius_m,
+                      journal_path=None, sink_dir=None, keyword_policy=None, throttle=None,
+                      seen=None, submitted=None):
+    scraper = make_scraper(worker_id, city_name, radius_m, journal_path=journal_path,
+                           sink_dir=sink_dir, keyword_policy=keyword_policy,
+                           throttle=throttle, seen=seen)
+    ready = time.time()
+    df, failed = scraper.scrape_queue(job_queue, progress_queue, worker_id)
+    logging.info(f"🔎 Worker {worker_id} done: {len(df)} rows, {len(failed)} failures")
+    pool_stats = None
+    if isinstance(scraper.driver_manager, DriverPool):
+        pool_stats = scraper.driver_manager.stats
+        logging.info("🧰 Worker %s browsers: %s", worker_id, format_pool_stats(pool_stats))
+    startup = None
+    if submitted is not None and _WORKER_START:
+        startup = dict(worker=worker_id, **startup_stats(submitted, _WORKER_START["import_t0"], _WORKER_START["up"],
+                                ready, scraper.first_job_at))
+    return df, failed, scraper.cache_stats, startup, pool_stats
+
+
+def batch_jobs(jobs, size):
+    return [jobs[i:i + size] for i in range(0, len(jobs), size)]
+
+
+def batch_jobs_by_point(jobs):
+    """One batch per run of consecutive jobs at the same point, so one worker
+    sees every keyword of a point and can prune the redundant ones."""
+    batches = []
+    for job in jobs:
+        if batches and tuple(batches[-1][-1][:2]) == tuple(job[:2]):
+            batches[-1].append(job)
+        else:
+            batches.append([job])
+    return batches
+
 
+def _log_progress(msg, total, finished):
+    worker_id, done, rows, failed, *_ = msg
+    logging.info(
+        "📊 [%d/%d] worker %s: %d jobs, %d rows, %d failed",
+        finished, total, worker_id, done, rows, failed
+    )
+
+
+def resume_filter(jobs, journal):
+    """Drops jobs the journal has as done; returns (remaining, [(job, found)] for the dropped)."""
+    if journal is None:
+        return jobs, []
+    found = journal.found_counts()
+    if not found:
+        return jobs, []
+    remaining, prior = [], []
+    for job in jobs:
+        key = job_key(*job[:3])
+        if key in found:
+            prior.append((tuple(job), found[key]))
+        else:
+            remaining.append(job)
+    logging.info("⏩ Resuming from %s: skipping %d completed jobs, %d left",
+                 journal.path, len(prior), len(remaining))
+    return remaining, prior
+
+
+def run_jobs(jobs, city_name, radius_m, journal_path=None, parts_dir=None, keyword_policy=None,
+             controller=None, seen=None, yield_planner=None):
+    """
+    Scrapes `jobs` with NUM_PROCESSES workers pulling small batches from a
+    shared queue, so a dense slice of the grid no longer holds up the whole run.
+    With a `controller` (Throttle.AIMDController), every job's outcome adjusts
+    how many of those workers may run and how long they wait between jobs.
+    With a `seen` set (SeenSet.py) each place's item is built by the first
+    worker to find it only. Failed jobs go back on the queue after a backoff (Retry.RetryScheduler)
+    and run with escalated waits and scrolls, up to RETRY_ATTEMPTS in all, so
+    the queue's sentinels are only sent once no job is running or waiting.
+    Each worker's startup, from submit to its first job, and its browser
+    launches and recycles (DriverPool.py) are logged at the end. With a
+    JOB_ORDER the jobs are queued along a space-filling curve (JobOrder.py),
+    so each worker's next search is close to its last one. A `yield_planner`
+    (YieldPlanner.py) logs the ETA first, drops jobs below its yield threshold
+    or past its time budget, and puts the highest expected yield first.
+    Returns (result frames, dead-letter jobs, [(job, found, coords)] per
+    finished job, with the (lat, lon) of the places a live search found).
+    """
+    ctx = get_context("spawn")
+    all_results, outcomes = [], []
+    tiers = None
+    if yield_planner is not None and jobs:
+        jobs, tiers = yield_planner.plan(jobs, NUM_PROCESSES)
+    if not jobs:
+        return all_results, [], outcomes
+    if JOB_ORDER:
+        # the keyword policy decides per point, so a point's keywords stay together
+        jobs = order_jobs(jobs, JOB_ORDER, by_keyword=keyword_policy is None, tiers=tiers)
+    t_run = time.time()
+    scheduler = RetryScheduler(RETRY_ATTEMPTS, RETRY_BACKOFF_S, RETRY_BACKOFF_MAX_S)
+
+    with ctx.Manager() as manager, \
+         ProcessPoolExecutor(max_workers=NUM_PROCESSES, mp_context=ctx,
+                             initializer=_init_worker) as exe:
+        job_q, progress_q = manager.Queue(), manager.Queue()
+        batches = batch_jobs_by_point(jobs) if keyword_policy else batch_jobs(jobs, JOB_BATCH_SIZE)
+        for batch in batches:
+            job_q.put(batch)
+        throttle = manager.dict(controller.state()) if controller else None
+        seen_handle = seen.handle(manager.Lock()) if seen is not None else None
+
+        futures = [
+            exe.submit(process_job_chunk, job_q, progress_q, wid, city_name, radius_m,
+                       journal_path, parts_dir, keyword_policy, throttle, seen_handle, time.time())
+            for wid in range(NUM_PROCESSES)
+        ]
+
+        # Report per-worker progress while the pool drains the queue, and
+        # requeue failed jobs as their backoff runs out
+        finished, total, pending, recovered = 0, len(jobs), len(jobs), 0
+        closed = False
+        while not all(fut.done() for fut in futures) or not progress_q.empty():
+            # once the sentinels are queued nobody takes a retry any more
+            if closed and scheduler:
+                logging.warning("🔁 Pool closed; %d pending retries become dead letters",
+                                scheduler.abandon())
+            for job in scheduler.due():
+                job_q.put([job])
+                pending += 1
+            # a worker that is done before the sentinels has crashed; its jobs never report
+            if not closed and (pending == 0 and not scheduler or any(f.done() for f in futures)):
+                closed = True
+                for _ in range(NUM_PROCESSES):
+                    job_q.put(None)
+                if throttle is not None:
+                    # parked workers hold no jobs; let them take their sentinel and exit
+                    throttle.update(active=NUM_PROCESSES, pause_until=0.0)
+            try:
+                msg = progress_q.get(timeout=1)
+            except queue.Empty:
+                continue
+            finished += 1
+            pending -= 1
+            job, found, outcome, coords = msg[4:8]
+            if outcome in RETRYABLE and scheduler.failed(job, outcome):
+                total += 1
+            else:
+                if job_attempt(job) > 1 and outcome not in RETRYABLE:
+                    recovered += 1
+                outcomes.append((job, found, coords))
+            _log_progress(msg, total, finished)
+            if throttle is not None and not closed and controller.observe(outcome):
+                throttle.update(controller.state())
+        if scheduler:
+            logging.warning("🔁 Pool closed; %d pending retries become dead letters",
+                            scheduler.abandon())
+
+        cache_stats, startups, pool_stats = [], [], []
+        for fut in futures:
+            df_chunk, _, stats, startup, pool = fut.result()
+            all_results.append(df_chunk)
+            cache_stats.append(stats)
+            if startup is not None:
+                startups.append(startup)
+            pool_stats.append(pool)
 
-def chunk_jobs(jobs, n):
-    k, m = divmod(len(jobs), n)
-    return [
-        jobs[i*k + min(i,m):(i+1)*k + min(i+1,m)]
-        for i in range(n)
-    ]
+    report_startup(startups)
+    if yield_planner is not None and yield_planner.eta_s:
+        logging.info("📅 Took %.0f min against an ETA of %.0f min",
+                     (time.time() - t_run) / 60, yield_planner.eta_s / 60)
+    if any(pool_stats):
+        logging.info("🧰 Browsers: %s", format_pool_stats(merge_pool_stats(pool_stats)))
+
+    if CACHE_PATH:
+        logging.info("🗄️  Search cache: %s", format_stats(merge_stats(cache_stats)))
+    if scheduler.scheduled:
+        logging.info("🔁 Retries: %d scheduled, %d jobs recovered, %d failed every attempt",
+                     scheduler.scheduled, recovered, len(scheduler.dead))
+
+    return all_results, scheduler.dead, outcomes
 
 
 def main():
+    import pandas as pd
+    from CleanDep   import clean_department_names
+    from Departamento import select_department, grid_from_geometry, HEX_POINT_SHARE
+    from AdaptiveGrid import AdaptivePlanner
+    from KeywordPlanner import KeywordPlanner
+    from Gridexporter import export_grid_to_csv
+    from GoogleMapsScraper import GridLoader, RESULT_COLUMNS
+    from Processor import process_scraped_csv, process_scraped_parquet
+    from ResultSink import merge_parts
+    from Metrics    import run_report
+    from ResultsIndex import ResultsIndex, coverage_report
+    from YieldPlanner import YieldPlanner
+
     logging.basicConfig(level=logging.INFO)
     logging.info("🚀 Starting full scrape workflow")
+    t_start = time.time()
 
     # 1) Clean shapefile names
     shp = input("Shapefile path (default Departamentos.shp): ").strip() or "Departamentos.shp"
@@ -72,94 +343,160 @@ def main():
     rad = input("Search radius in meters (default 1000): ").strip()
     radius_m = int(rad) if rad.isdigit() else 1000
     spacing = radius_m * 0.8
-    grid_pts, city_name = build_grid_from_shapefile(cleaned_shp, spacing = spacing)
+    ecity, city_name = select_department(cleaned_shp)
+    grid_pts = grid_from_geometry(ecity, spacing, GRID_LAYOUT)
+    print(f"Retained {len(grid_pts)} grid points inside {city_name}.")
+    if GRID_LAYOUT == "hex":
+        logging.info("⬡ Hex grid: %d points, ~%d for a square grid with the same coverage (%.0f%% fewer)",
+                     len(grid_pts), len(grid_pts) / HEX_POINT_SHARE, 100 * (1 - HEX_POINT_SHARE))
 
     # 3) Export grid CSV
     grid_csv = f"{city_name}_grid.csv"
     export_grid_to_csv(grid_pts, grid_csv, force=False)
 
-    # 4) Generate jobs
-    loader = GridLoader(grid_csv, KEYWORDS)
-    jobs = loader.generate_jobs()
-    jobs_csv = f"all_jobs_{city_name}.csv"
-    
-    if os.path.exists(jobs_csv):
-        resp = input(f"⚠️ '{jobs_csv}' already exists. Overwrite? [y/n]: ").strip().lower()
-        if resp == 'y':
-            pd.DataFrame(jobs, columns=["latitude","longitude","keyword"]) \
-            .to_csv(jobs_csv, index=False)
-            logging.info("✅ Overwrote existing job file.")
+    # Resume: jobs the journal already has as done are skipped
+    journal_path = JOURNAL_PATH.format(city=city_name) if JOURNAL_PATH else None
+    journal = JobJournal(journal_path) if journal_path else None
+
+    # rows stream into Parquet parts instead of coming back through the pool
+    parts_dir = f"parts_{city_name}" if RESULT_FORMAT == "parquet" else None
+
+    controller = AIMDController(NUM_PROCESSES, max_delay_s=THROTTLE_MAX_DELAY) if THROTTLE else None
+    # one seen-set for the whole run, so later adaptive rounds skip known places too;
+    # if the run dies, the resource tracker frees the shared memory
+    seen = SeenSet(SEEN_CAPACITY) if DEDUP_PLACES else None
+
+    # Keyword pruning: fewer keywords overall, and per point only while they pay off
+    keywords, keyword_policy = KEYWORDS, None
+    if KEYWORD_PRUNING:
+        sources = KEYWORD_HISTORY
+        if not sources and journal is not None:
+            # this department's own history only once its grid is done: a resumed
+            # run would otherwise learn from the area it reached before crashing
+            done = journal.completed()
+            if GRID_MODE == "uniform" and all(job_key(lat, lon, kw) in done
+                                              for lat, lon in grid_pts for kw in KEYWORDS):
+                sources = [s for s in (journal_path, parts_dir) if s]
+            elif done:
+                logging.info("🔑 %s holds an unfinished run; not learning keyword overlap from it",
+                             journal_path)
+        keyword_policy = KeywordPlanner.from_sources(sources or [], KEYWORD_MIN_YIELD, KEYWORD_CELL_M)
+        if keyword_policy is None:
+            logging.info("🔑 No keyword history yet; searching all %d keywords", len(KEYWORDS))
         else:
-            logging.info("📄 Using existing job file instead.")
-            jobs = pd.read_csv(jobs_csv).values.tolist()
-    else:
-        pd.DataFrame(jobs, columns=["latitude","longitude","keyword"]) \
-        .to_csv(jobs_csv, index=False)
-        logging.info("✅ Saved new job file.")
+            keywords = keyword_policy.reduce_keywords(KEYWORDS, KEYWORD_COVERAGE)
 
+    # Yield planning: ETA, best jobs first, and what fits the time budget
+    yield_planner = None
+    if YIELD_PLANNING:
+        sources = YIELD_HISTORY or [s for s in (journal_path, METRICS_DIR) if s]
+        yield_planner = YieldPlanner.from_sources(
+            sources, city=city_name, radius_m=radius_m, cell_m=YIELD_CELL_M, min_yield=YIELD_MIN, tiers=YIELD_TIERS,
+            budget_s=TIME_BUDGET_H * 3600 if TIME_BUDGET_H else None,
+        )
+        if yield_planner is None:
+            logging.info("📅 No job history yet; no ETA or yield ordering for this run")
 
-    # 5) Parallel scrape
-    job_chunks = chunk_jobs(jobs, NUM_PROCESSES)
-    ctx = get_context("spawn")
-    all_results, all_failed = [], []
+    if GRID_MODE == "adaptive":
+        # 4-6) Coarse grid first, refined round by round where results saturate
+        planner = AdaptivePlanner(
+            ecity, radius_m, keywords,
+            coarse_factor=ADAPTIVE_COARSE_FACTOR, ceiling=RESULT_CEILING
+        )
+        all_results, all_failed = [], []
+        jobs, rnd = planner.initial_jobs(), 0
+        while jobs:
+            rnd += 1
+            todo, prior = resume_filter(jobs, journal)
+            logging.info("🌳 Round %d: %d jobs", rnd, len(todo))
+            results, failed, outcomes = run_jobs(todo, city_name, radius_m, journal_path,
+                                                 parts_dir, keyword_policy, controller, seen, yield_planner)
+            all_results.extend(results)
+            all_failed.extend(failed)
+            jobs = planner.feedback(prior + outcomes)
+        planner.report(len(grid_pts) * len(KEYWORDS))
+    else:
+        # 4) Generate jobs
+        loader = GridLoader(grid_csv, keywords)
+        jobs = loader.generate_jobs()
+        jobs_csv = f"all_jobs_{city_name}.csv"
 
-    with ProcessPoolExecutor(max_workers=NUM_PROCESSES, mp_context=ctx) as exe:
-        futures = [
-            exe.submit(process_job_chunk, chunk, city_name, radius_m)
-            for chunk in job_chunks
-        ]
-        for fut in futures:
-            df_chunk, failed_chunk = fut.result()
-            all_results.append(df_chunk)
-            all_failed.extend(failed_chunk)
+        if os.path.exists(jobs_csv):
+            resp = input(f"⚠️ '{jobs_csv}' already exists. Overwrite? [y/n]: ").strip().lower()
+            if resp == 'y':
+                pd.DataFrame(jobs, columns=["latitude","longitude","keyword"]) \
+                .to_csv(jobs_csv, index=False)
+                logging.info("✅ Overwrote existing job file.")
+            else:
+                logging.info("📄 Using existing job file instead.")
+                jobs = pd.read_csv(jobs_csv).values.tolist()
+        else:
+            pd.DataFrame(jobs, columns=["latitude","longitude","keyword"]) \
+            .to_csv(jobs_csv, index=False)
+            logging.info("✅ Saved new job file.")
+
+        # 5-6) Parallel scrape with per-worker progress
+        jobs, _ = resume_filter(jobs, journal)
+        all_results, all_failed, _ = run_jobs(jobs, city_name, radius_m, journal_path,
+                                              parts_dir, keyword_policy, controller, seen, yield_planner)
+    if controller is not None:
+        controller.report(time.time() - t_start)
+    if seen is not None:
+        logging.info("🧬 %d distinct places claimed across workers", len(seen))
+        seen.close()
+    if METRICS_DIR:
+        run_report(METRICS_DIR, since=t_start)
 
     # 7) Merge results and de-duplicate
-    merged = pd.concat(all_results, ignore_index=True)
-    total_before = len(merged)
-
-    deduped = (
-        merged
-        .drop_duplicates(subset=["link"])
-        .sort_values(["longitude", "latitude"])
-        .reset_index(drop=True)
-    )
-    total_after = len(deduped)
+    results_csv = f"results_{city_name}.csv"
+    if parts_dir:
+        results_pq = f"results_{city_name}.parquet"
+        total_before, total_after = merge_parts(parts_dir, results_pq)
+        deduped = None
+    else:
+        # with a journal the merge is rebuilt from it, so rows from
+        # earlier (crashed) runs are included
+        if journal is not None:
+            merged = journal.load_items()
+            if merged.empty:
+                merged = pd.concat(all_results or [pd.DataFrame(columns=RESULT_COLUMNS)], ignore_index=True)
+        else:
+            merged = pd.concat(all_results or [pd.DataFrame(columns=RESULT_COLUMNS)], ignore_index=True)
+        total_before = len(merged)
+
+        deduped = (
+            merged
+            .drop_duplicates(subset=["link"])
+            .sort_values(["longitude", "latitude"])
+            .reset_index(drop=True)
+        )
+        total_after = len(deduped)
     removed = total_before - total_after
 
     # log how many got deduped
     logging.info("🔀 Dropped %d duplicate rows (from %d → %d)", removed, total_before, total_after)
-    logging.info("✅ Final results: %d rows → results_%s.csv", total_after, city_name)
-
-    # write out
-    deduped.to_csv(f"results_{city_name}.csv", index=False)
-    # Only postprocess if there were NO failures
-    if not all_failed:
-        process_scraped_csv(f"results_{city_name}.csv")
-
-    # 8) Write the single failure file
-    failure_file = f"jobs_failed_{city_name}.csv"
-    if all_failed:
-        pd.DataFrame(all_failed, columns=["latitude","longitude","keyword"]) \
-          .to_csv(failure_file, index=False)
-        logging.info("💾 Wrote %d failed jobs → %s", len(all_failed), failure_file)
+    logging.info("✅ Final results: %d rows → %s", total_after, results_csv)
+
+    # write out (the Parquet path only writes CSV once, when post-processing)
+    if deduped is not None:
+        deduped.to_csv(results_csv, index=False)
+    # failures were already retried in-band, so post-process what we have
+    if parts_dir:
+        process_scraped_parquet(results_pq, results_csv)
     else:
-        if os.path.exists(failure_file):
-            os.remove(failure_file)
-            logging.info("🗑️  No failures → removed %s", failure_file)
-
-    # 9) Retry failures
-    failed_jobs = load_failed(failure_file)
-    if failed_jobs:
-        # feed full_df back into retry_and_merge, overwrite full_df
-        full_df = retry_and_merge(
-            deduped,
-            failed_jobs,
-            city_name,
-            radius_m=radius_m
-        )
-        full_df.to_csv(f"results_{city_name}.csv", index=False)
-        process_scraped_csv(f"results_{city_name}.csv")
-        logging.info("🔁 Retried failures; now %d rows → %s", len(full_df), f"results_{city_name}.csv")
+        process_scraped_csv(results_csv)
+
+    # Spatial index for radius/bbox/cell queries, and which grid points were
+    # saturated, failed or empty (adaptive jobs are not on the exported grid)
+    if RESULTS_INDEX:
+        index = ResultsIndex.build(results_csv, INDEX_CELL_M)
+        if journal is not None:
+            coverage_report(index, journal, radius_m, RESULT_CEILING,
+                            grid_csv if GRID_MODE == "uniform" else None, f"coverage_{city_name}.csv")
+
+    # 8) Jobs that failed every attempt go to the dead-letter file; the
+    # journal has them as failed, so the next run tries them again
+    write_dead_letters(all_failed, f"jobs_dead_{city_name}.csv")
 
     logging.info("🎉 Workflow complete.")
 
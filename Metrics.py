@@ -0,0 +1,228 @@
+"""
+Per-phase job timings: JSON lines, Prometheus snapshots and a run report.
+
+Every job is timed phase by phase:
+
+    cache → pace → soft_nav (in-page navigation, soft mode) → navigate
+    (driver.get) → wait_panel (a.hfpxzc) → settle (the fixed 1 s sleep) →
+    scroll → parse → radius_filter → card_lookup → build_item → record →
+    checkpoint
+
+Each worker appends one JSON line per job to `metrics/jobs-<worker>-<pid>.jsonl`,
+tagged with the run's city and search radius since the runs of every city
+share the directory, and keeps cumulative histograms per (phase, keyword),
+rewritten as a Prometheus text-format snapshot (`metrics/worker-<worker>.prom`)
+every few jobs, e.g. for node_exporter's textfile collector. At the end of a run
+`run_report` reads the JSON lines back and logs p50/p95/p99 per phase and per
+keyword, and writes the merged histograms to `metrics/run.prom`.
+
+Usage:
+    python Metrics.py metrics
+"""
+
+import glob
+import json
+import logging
+import math
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+PHASES = [
+    "cache", "pace", "soft_nav", "navigate", "wait_panel", "settle", "scroll", "parse",
+    "radius_filter", "card_lookup", "build_item", "record", "checkpoint",
+]
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, math.inf)
+METRIC = "gmaps_job_phase_seconds"
+
+
+class JobTiming:
+    """Seconds per phase for one job; phases entered twice accumulate."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def move(self, src: str, dst: str, seconds: float) -> None:
+        """Re-books part of one phase as another (e.g. the parse done inside scroll)."""
+        seconds = min(seconds, self.phases.get(src, 0.0))
+        self.phases[src] = self.phases.get(src, 0.0) - seconds
+        self.add(dst, seconds)
+
+    def total(self) -> float:
+        return time.perf_counter() - self.t0
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, le in enumerate(BUCKETS):
+            if value <= le:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(hists: dict, outcomes: dict) -> str:
+    """Text exposition of {(phase, keyword): Histogram} and {outcome: count}."""
+    lines = [
+        f"# HELP {METRIC} Time spent in each phase of a scrape job.",
+        f"# TYPE {METRIC} histogram",
+    ]
+    for (phase, kw), h in sorted(hists.items()):
+        labels = f'phase="{_label(phase)}",keyword="{_label(kw)}"'
+        cumulative = 0
+        for le, n in zip(BUCKETS, h.counts):
+            cumulative += n
+            le_txt = "+Inf" if le == math.inf else repr(le)
+            lines.append(f'{METRIC}_bucket{{{labels},le="{le_txt}"}} {cumulative}')
+        lines.append(f"{METRIC}_sum{{{labels}}} {h.sum:.6f}")
+        lines.append(f"{METRIC}_count{{{labels}}} {h.count}")
+    lines += ["# HELP gmaps_jobs_total Finished jobs by outcome.", "# TYPE gmaps_jobs_total counter"]
+    lines += [f'gmaps_jobs_total{{outcome="{_label(k)}"}} {v}' for k, v in sorted(outcomes.items())]
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+
+
+class MetricsWriter:
+    def __init__(self, out_dir: str, worker_id: int | str = 0, snapshot_every: int = 20,
+                 city: str | None = None, radius_m: float | None = None):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.worker_id = worker_id
+        self.city = city                    # the run's region, so planners can tell runs apart
+        self.radius_m = radius_m
+        self.path = os.path.join(out_dir, f"jobs-{worker_id}-{os.getpid()}.jsonl")
+        self.fh = open(self.path, "a", encoding="utf-8")
+        self.snapshot_every = snapshot_every
+        self.hists: dict[tuple[str, str], Histogram] = {}
+        self.outcomes: dict[str, int] = {}
+        self.n = 0
+
+    def record(self, timing: JobTiming, lat, lon, kw, outcome, found, items: int) -> None:
+        total = timing.total()
+        phases = {k: round(v, 6) for k, v in timing.phases.items()}
+        self.fh.write(json.dumps({
+            "ts": time.time(), "worker": self.worker_id, "city": self.city,
+            "radius_m": self.radius_m, "latitude": lat, "longitude": lon, "keyword": kw, "outcome": outcome, "found": found, "items": items,
+            "total_s": round(total, 6), "phases": phases,
+        }, ensure_ascii=False) + "\n")
+        for phase, seconds in list(phases.items()) + [("total", total)]:
+            self.hists.setdefault((phase, kw), Histogram()).observe(seconds)
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        self.n += 1
+        if self.n % self.snapshot_every == 0:
+            self.snapshot()
+
+    def snapshot(self) -> None:
+        self.fh.flush()
+        _write_atomic(os.path.join(self.out_dir, f"worker-{self.worker_id}.prom"),
+                      prometheus_text(self.hists, self.outcomes))
+
+    def close(self) -> None:
+        self.snapshot()
+        self.fh.close()
+
+
+def load_records(metrics_dir: str, since: float | None = None) -> "pd.DataFrame":
+    """One row per job, one `phase.<name>` column per phase (NaN where not entered)."""
+    import pandas as pd
+
+    rows = []
+    for path in sorted(glob.glob(os.path.join(metrics_dir, "jobs-*.jsonl"))):
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue   # a line cut short by a crash
+                if since is not None and rec["ts"] < since:
+                    continue
+                phases = rec.pop("phases")
+                rec.update({f"phase.{k}": v for k, v in phases.items()})
+                rows.append(rec)
+    return pd.DataFrame(rows)
+
+
+def _quantiles(df: "pd.DataFrame", cols: list[str]) -> "pd.DataFrame":
+    q = df[cols].quantile([0.5, 0.95, 0.99]).T * 1000
+    q.columns = ["p50_ms", "p95_ms", "p99_ms"]
+    q.insert(0, "jobs", df[cols].notna().sum())
+    q["share_pct"] = 100 * df[cols].sum() / df["total_s"].sum()
+    q.index = ["total" if c == "total_s" else c.removeprefix("phase.") for c in cols]
+    return q.round(1)
+
+
+def run_report(metrics_dir: str, since: float | None = None) -> "pd.DataFrame | None":
+    """Logs p50/p95/p99 per phase and per keyword; writes the merged run.prom."""
+    df = load_records(metrics_dir, since)
+    if df.empty:
+        logging.info("📈 No job metrics in %s", metrics_dir)
+        return None
+    phase_cols = [f"phase.{p}" for p in PHASES if f"phase.{p}" in df.columns]
+    phase_cols += sorted(c for c in df.columns if c.startswith("phase.") and c not in phase_cols)
+
+    by_phase = _quantiles(df, phase_cols + ["total_s"])
+    logging.info("📈 Job phases over %d jobs (ms):\n%s", len(df), by_phase.to_string())
+
+    ran = df[df["outcome"].isin(["ok", "empty"])]
+    if not ran.empty:
+        by_kw = ran.groupby("keyword")["total_s"].quantile([0.5, 0.95, 0.99]).unstack() * 1000
+        by_kw.columns = ["p50_ms", "p95_ms", "p99_ms"]
+        by_kw.insert(0, "jobs", ran.groupby("keyword").size())
+        for col in ("phase.scroll", "phase.wait_panel"):
+            if col in ran.columns:
+                by_kw[col.removeprefix("phase.") + "_p50_ms"] = ran.groupby("keyword")[col].median() * 1000
+        logging.info("📈 Job time per keyword (ms):\n%s",
+                     by_kw.sort_values("p50_ms", ascending=False).round(1).to_string())
+
+    hists: dict[tuple[str, str], Histogram] = {}
+    for rec in df[["keyword"] + phase_cols + ["total_s"]].to_dict("records"):
+        for col in phase_cols + ["total_s"]:
+            value = rec[col]
+            if value != value:   # NaN: phase not entered by this job
+                continue
+            phase = "total" if col == "total_s" else col.removeprefix("phase.")
+            hists.setdefault((phase, rec["keyword"]), Histogram()).observe(value)
+    _write_atomic(os.path.join(metrics_dir, "run.prom"),
+                  prometheus_text(hists, df["outcome"].value_counts().to_dict()))
+    return by_phase
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python Metrics.py <metrics_dir>")
+    import pandas as pd
+
+    pd.set_option("display.width", 200)
+    run_report(sys.argv[1])
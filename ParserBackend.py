@@ -0,0 +1,110 @@
+"""
+Parser backends for the results panel.
+
+Each backend turns the panel HTML into a document once and then answers the
+three questions `GoogleMapsScraper` asks per job: which result anchors are
+there, which card wraps a given anchor, and what item that card produces.
+
+- "bs4":  BeautifulSoup + html.parser, using `ItemTemplate.build_item` (reference).
+- "lxml": libxml2 parse + precompiled XPath, using `ItemTemplate.build_item_lxml`.
+
+Both return field-for-field identical items for the same panel.
+"""
+
+import logging
+
+from ItemTemplate import build_item, build_item_lxml, CARD_CLASSES
+
+ANCHOR_SELECTOR = "a.hfpxzc[aria-label]"
+
+
+class Bs4Backend:
+    name = "bs4"
+
+    def __init__(self, clean_text):
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+        self.clean_text = clean_text
+
+    def parse(self, html: str):
+        return self._soup(html, "html.parser")
+
+    def anchors(self, doc) -> list:
+        return doc.select(ANCHOR_SELECTOR)
+
+    def href(self, anchor) -> str:
+        return anchor.get("href", "")
+
+    def find_card(self, anchor):
+        # try several ways to find the "card" wrapper
+        for cls in CARD_CLASSES:
+            card = anchor.find_parent("div", class_=cls)
+            if card:
+                return card
+        return None
+
+    def build(self, card, anchor, coords, kw) -> dict:
+        clean_text = self.clean_text
+
+        def safe_get_text(elem, default=""):
+            return clean_text(elem.get_text(strip=True)) if elem else default
+
+        return build_item(
+            version="loc1",
+            card=card,
+            coords=coords,
+            kw=kw,
+            anchor=anchor,
+            safe_get_text=safe_get_text,
+            clean_text=clean_text
+        )
+
+
+class LxmlBackend:
+    name = "lxml"
+
+    def __init__(self, clean_text):
+        from lxml import etree, html as lxml_html
+        self._fragment = lxml_html.fragment_fromstring
+        self._anchors = etree.XPath(
+            "descendant::a[contains(concat(' ', normalize-space(@class), ' '), ' hfpxzc ')]"
+            "[@aria-label]"
+        )
+        self.clean_text = clean_text
+
+    def parse(self, html: str):
+        return self._fragment(html, create_parent="div")
+
+    def anchors(self, doc) -> list:
+        return self._anchors(doc)
+
+    def href(self, anchor) -> str:
+        return anchor.get("href", "")
+
+    def find_card(self, anchor):
+        # one walk up the tree, then pick by the same priority as find_parent
+        ancestors = [
+            (el, set((el.get("class") or "").split()))
+            for el in anchor.iterancestors("div")
+        ]
+        for cls in CARD_CLASSES:
+            for el, classes in ancestors:
+                if cls in classes:
+                    return el
+        return None
+
+    def build(self, card, anchor, coords, kw) -> dict:
+        return build_item_lxml("loc1", card, coords, kw, anchor, self.clean_text)
+
+
+BACKENDS = {"bs4": Bs4Backend, "lxml": LxmlBackend}
+
+
+def get_backend(name: str, clean_text):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown parser backend '{name}'")
+    try:
+        return BACKENDS[name](clean_text)
+    except ImportError as exc:
+        logging.warning("⚠️  Parser '%s' unavailable (%s); falling back to bs4", name, exc)
+        return Bs4Backend(clean_text)
@@ -2,52 +2,189 @@
 
 import pandas as pd
 import ast
-import re
 
-def process_scraped_csv(filename):
-    df = pd.read_csv(filename)
+EXPECTED_COLUMNS = ['num_id', 'prop_id', 'latitude', 'longitude', 'keyword', 'name',
+                    'link', 'num_rating', 'rating', 'price', 'category', 'address']
+CATEGORICAL_COLUMNS = ['keyword', 'category']
+
+PROP_ID_RE = r'(?P<prop_id>ChIJ[^?]+)'
+RATING_RE = r'(?P<rating>[\d.]+)\((?P<num_rating>\d+)\)'
+
+
+def _arrow_strings(s):
+    import pyarrow as pa
+
+    return pa.array(s.astype(object).where(s.notna(), None).to_numpy(), type=pa.string())
+
+
+def _extract(s, pattern):
+    """The named groups of ``pattern`` in a text column, matched in Arrow; NA where it does not match."""
+    import pyarrow.compute as pc
+
+    m = pc.extract_regex(_arrow_strings(s), pattern)
+    return pd.DataFrame({
+        name: pd.Series(m.field(name).to_numpy(zero_copy_only=False), index=s.index, dtype='string')
+        for name in (m.type.field(i).name for i in range(m.type.num_fields))
+    })
+
 
+def _amenities_from_repr(s):
+    """
+    (row positions, amenities) from list reprs like "['Wi-Fi', 'Baños']", as
+    written by a CSV round-trip. Unless an element is double-quoted (it had
+    a ' in it) or has backslash escapes, every element sits in plain single
+    quotes and the repr is split in Arrow on "', '"; only the rare remaining
+    rows go through literal_eval.
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    arr = _arrow_strings(s)
+    # a double-quoted element opens the list or follows a ", "
+    odd = pc.match_substring_regex(arr, r'\["|, "|\\')
+    simple = pc.if_else(odd, None, arr)
+    # "['a', 'b']" → "a', 'b" → ["a", "b"]; "[]" → [""], dropped later as blank
+    parts = pc.split_pattern(pc.utf8_slice_codeunits(simple, 2, -2), "', '")
+    rows, values = _amenities_from_arrow(parts)
+
+    odd_rows = np.flatnonzero(pc.fill_null(odd, False).to_numpy(zero_copy_only=False))
+    if len(odd_rows):
+        lists = [ast.literal_eval(x) for x in arr.take(pa.array(odd_rows)).to_pylist()]
+        rows = np.concatenate([rows, np.repeat(odd_rows, [len(x) for x in lists])])
+        values = np.concatenate([values, np.array([v for x in lists for v in x], dtype=object)])
+        order = np.argsort(rows, kind='stable')
+        rows, values = rows[order], values[order]
+    return rows, values
+
+
+def _amenities_from_arrow(col):
+    """(row positions, amenities) of an Arrow list<string> column, flattened without Python loops."""
+    import pyarrow.compute as pc
+
+    return (pc.list_parent_indices(col).to_numpy(),
+            pc.list_flatten(col).to_numpy(zero_copy_only=False))
+
+
+def _process_frame(df, num_id_start=1, amenities=None):
+    """
+    Applies the post-processing to one frame; returns (df, amenities_df or None).
+    ``amenities`` is a pre-flattened (row positions, amenities) pair, for
+    frames whose list column never went through pandas.
+    """
     # Create a new column with num id
     if 'num_id' not in df.columns:
-        df['num_id'] = range(1, len(df) + 1)
+        df['num_id'] = range(num_id_start, num_id_start + len(df))
 
     # Extract the ChIJ property ID
-    def extract_prop_id(url):
-        match = re.search(r'(ChIJ[^\?]+)', str(url))
-        return match.group(1) if match else None
-
     if 'prop_id' not in df.columns:
-        df['prop_id'] = df['link'].apply(extract_prop_id)
+        df['prop_id'] = _extract(df['link'], PROP_ID_RE)['prop_id'].astype(object)
 
     # Extract rating and num_rating from "4.5(2)"
     if 'num_rating' not in df.columns:
-        extracted = df['rating'].str.extract(r'([\d.]+)\((\d+)\)')
-        df['rating'] = pd.to_numeric(extracted[0], errors='coerce')
-        df['num_rating'] = pd.to_numeric(extracted[1], errors='coerce')
+        extracted = _extract(df['rating'], RATING_RE)
+        df['rating'] = pd.to_numeric(extracted['rating'], errors='coerce')
+        df['num_rating'] = pd.to_numeric(extracted['num_rating'], errors='coerce')
         df['num_rating'] = df['num_rating'].fillna(0).astype('int64')
 
-    # Process amenities if present
-    if 'amenities' in df.columns:
-        df['amenities'] = df['amenities'].apply(
-            lambda x: ast.literal_eval(str(x)) if pd.notnull(x) else [])
-
-        df_exploded = df[['prop_id', 'amenities']].explode('amenities')
-        df_exploded = df_exploded[
-            df_exploded['amenities'].notnull() & (df_exploded['amenities'].str.strip() != '')
-        ]
-        df_exploded.rename(columns={'amenities': 'amenity'}, inplace=True)
-        df_exploded.to_csv(filename.replace(".csv", "_amenities.csv"), index=False)
+    # Low-cardinality text: a few hundred distinct values over millions of rows
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
 
-        # Optionally drop the column (safe after file is written)
-        df.drop(columns='amenities', inplace=True)
+    # Process amenities if present
+    if amenities is None and 'amenities' in df.columns:
+        amenities = _amenities_from_repr(df['amenities'])
+    df_exploded = None
+    if amenities is not None:
+        rows, values = amenities
+        df_exploded = pd.DataFrame({'prop_id': df['prop_id'].to_numpy()[rows],
+                                    'amenity': pd.Series(values, dtype='string')})
+        amenity = df_exploded['amenity']
+        df_exploded = df_exploded[(amenity.notna() & (amenity.str.strip() != '')).fillna(False)]
+        df = df.drop(columns='amenities', errors='ignore')
 
     # Reorder columns if present
-    expected = ['num_id', 'prop_id', 'latitude', 'longitude', 'keyword', 'name',
-                'link', 'num_rating', 'rating', 'price', 'category', 'address']
-    if all(col in df.columns for col in expected):
-        df = df[expected]
+    if all(col in df.columns for col in EXPECTED_COLUMNS):
+        df = df[EXPECTED_COLUMNS]
+    return df, df_exploded
+
+
+class _AmenityTable:
+    """Columnar twin of `_amenities.csv`: (prop_id, amenity) written batch by batch to Parquet."""
+
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+
+    def write(self, df_exploded):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([('prop_id', pa.string()), ('amenity', pa.dictionary(pa.int32(), pa.string()))])
+        table = pa.Table.from_pandas(df_exploded, schema=schema, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def process_scraped_csv(filename):
+    df = pd.read_csv(filename, dtype={col: 'category' for col in CATEGORICAL_COLUMNS})
+    df, df_exploded = _process_frame(df)
+    if df_exploded is not None:
+        df_exploded.to_csv(filename.replace(".csv", "_amenities.csv"), index=False)
+        side = _AmenityTable(filename.replace(".csv", "_amenities.parquet"))
+        side.write(df_exploded)
+        side.close()
 
     # Rewrite processed file (now with num_rating as int64)
     df.to_csv(filename, index=False)
 
-process_scraped_csv("results_ASUNCIÓN.csv")  # Replace with actual filename
\ No newline at end of file
+
+def process_scraped_parquet(parquet_path, csv_out, batch_size=50_000):
+    """
+    Streaming twin of `process_scraped_csv` for the Parquet sink: reads the
+    merged file batch by batch and appends the processed rows to `csv_out`
+    and the exploded amenities to `<csv_out>_amenities.csv` (and `.parquet`),
+    so memory stays bounded by one batch. The amenities list column is
+    flattened in Arrow and never becomes Python lists.
+    """
+    import pyarrow as pa
+    from ResultSink import iter_batches
+
+    amenities_out = csv_out.replace(".csv", "_amenities.csv")
+    side = _AmenityTable(csv_out.replace(".csv", "_amenities.parquet"))
+    num_id = 1
+    first = True
+    for batch in iter_batches(parquet_path, batch_size=batch_size):
+        table = pa.Table.from_batches([batch])
+        amenities = None
+        if 'amenities' in table.column_names:
+            amenities = _amenities_from_arrow(table.column('amenities'))
+            table = table.select([c for c in table.column_names if c != 'amenities'])
+        df, df_exploded = _process_frame(table.to_pandas(), num_id_start=num_id, amenities=amenities)
+        num_id += len(df)
+        mode = 'w' if first else 'a'
+        df.to_csv(csv_out, index=False, mode=mode, header=first)
+        if df_exploded is not None:
+            df_exploded.to_csv(amenities_out, index=False, mode=mode, header=first)
+            side.write(df_exploded)
+        first = False
+    side.close()
+    if first:
+        pd.DataFrame(columns=EXPECTED_COLUMNS).to_csv(csv_out, index=False)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python Processor.py <results.csv> | <results.parquet> <out.csv>")
+    if sys.argv[1].endswith(".parquet"):
+        process_scraped_parquet(sys.argv[1], sys.argv[2])
+    else:
+        process_scraped_csv(sys.argv[1])
@@ -0,0 +1,52 @@
+"""
+Recording and loading of results-panel fixtures for offline replay.
+
+While recording, every finished job appends one gzip member holding a JSON
+line {latitude, longitude, keyword, radius_m, html} to
+`<record_dir>/panels_<city>_<pid>.jsonl.gz`. One file per process keeps
+parallel workers from interleaving writes, and appending whole gzip members
+means a crash can only cut the member being written: `load_corpus` keeps
+every panel before it and skips the truncated tail.
+"""
+
+import glob
+import gzip
+import json
+import logging
+import os
+import zlib
+
+
+class PanelRecorder:
+    def __init__(self, record_dir: str, city_name: str):
+        os.makedirs(record_dir, exist_ok=True)
+        self.path = os.path.join(record_dir, f"panels_{city_name}_{os.getpid()}.jsonl.gz")
+
+    def record(self, lat: float, lon: float, kw: str, radius_m: int, html: str) -> None:
+        line = json.dumps({
+            "latitude": lat,
+            "longitude": lon,
+            "keyword": kw,
+            "radius_m": radius_m,
+            "html": html,
+        }, ensure_ascii=False)
+        with gzip.open(self.path, "ab") as f:
+            f.write(line.encode("utf-8") + b"\n")
+
+
+def load_corpus(path: str):
+    """Yields recorded panels from a fixture file or a directory of them."""
+    files = sorted(glob.glob(os.path.join(path, "*.jsonl.gz"))) if os.path.isdir(path) else [path]
+    for fn in files:
+        with gzip.open(fn, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    # a record always ends in a newline; a line without one was cut short
+                    if line.strip() and line.endswith("\n"):
+                        yield json.loads(line)
+            except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+                logging.warning("⚠️  %s ends in a truncated record (%s); keeping the panels before it", fn, e)
+
+
+def panel_key(rec: dict) -> str:
+    return f"{rec['latitude']:.5f},{rec['longitude']:.5f},{rec['keyword']},{rec['radius_m']}"
@@ -0,0 +1,197 @@
+"""
+Content-addressed cache of search panels, so re-runs skip the browser.
+
+Each finished search is stored under a hash of its normalized parameters
+(lat/lon rounded to 5 decimals, NFKC-casefolded keyword, radius, locale)
+together with the final panel HTML and the items extracted from it. Entries
+expire after `ttl_s`; past `max_bytes` the least recently used ones are
+evicted.
+
+Items are tagged with a fingerprint of the extraction code (ItemTemplate,
+ParserBackend, extract_panel_items). When that code changes, a hit still
+skips the browser but the items are re-extracted from the cached HTML,
+which is what a parser test run needs.
+"""
+
+import hashlib
+import inspect
+import json
+import sqlite3
+import time
+import unicodedata
+import zlib
+from functools import lru_cache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS panels (
+    key         TEXT PRIMARY KEY,
+    latitude    REAL NOT NULL,
+    longitude   REAL NOT NULL,
+    keyword     TEXT NOT NULL,
+    radius_m    INTEGER NOT NULL,
+    html        BLOB NOT NULL,
+    items       BLOB,
+    fingerprint TEXT,
+    found       INTEGER,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    last_used   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS panels_lru ON panels (last_used);
+"""
+
+LOCALE = "es-419|PY"   # hl/gl of the search URL; part of the key
+EVICT_EVERY = 50       # puts between size checks
+
+
+def normalize_keyword(kw: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", str(kw)).casefold().split())
+
+
+def cache_key(lat, lon, kw, radius_m) -> str:
+    raw = f"{round(float(lat), 5):.5f}|{round(float(lon), 5):.5f}|{normalize_keyword(kw)}|{int(radius_m)}|{LOCALE}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+@lru_cache(maxsize=1)
+def parser_fingerprint() -> str:
+    """Hash of the code that turns panel HTML into items."""
+    import GoogleMapsScraper
+    import ItemTemplate
+    import ParserBackend
+
+    h = hashlib.sha256()
+    for src in (inspect.getsource(ItemTemplate), inspect.getsource(ParserBackend),
+                inspect.getsource(GoogleMapsScraper.extract_panel_items),
+                inspect.getsource(GoogleMapsScraper.clean_text)):
+        h.update(src.encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+class ResultCache:
+    def __init__(self, path: str, ttl_s: float = 7 * 86400, max_bytes: int = 2 << 30,
+                 force_refresh: bool = False):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.force_refresh = force_refresh
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # losing the last entries in a crash only costs a re-scrape
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.stats = {"hits": 0, "reparsed": 0, "misses": 0, "expired": 0,
+                      "bypassed": 0, "stored": 0, "evicted": 0}
+        self._puts = 0
+
+    def get(self, lat, lon, kw, radius_m) -> dict | None:
+        """
+        Returns {"html", "items", "found"} for a live entry, None on a miss.
+        "items" is None when they were extracted by a different parser version.
+        """
+        if self.force_refresh:
+            self.stats["bypassed"] += 1
+            return None
+        key = cache_key(lat, lon, kw, radius_m)
+        row = self.conn.execute(
+            "SELECT html, items, fingerprint, found, created_at FROM panels WHERE key = ?", (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        html, items, fingerprint, found, created_at = row
+        if now - created_at > self.ttl_s:
+            self.conn.execute("DELETE FROM panels WHERE key = ?", (key,))
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self.conn.execute("UPDATE panels SET last_used = ? WHERE key = ?", (now, key))
+        self.stats["hits"] += 1
+        if items is not None and fingerprint == parser_fingerprint():
+            items = json.loads(zlib.decompress(items))
+        else:
+            items = None
+            self.stats["reparsed"] += 1
+        return {"html": zlib.decompress(html).decode("utf-8"), "items": items, "found": found}
+
+    def put(self, lat, lon, kw, radius_m, html: str, items: list | None, found: int | None,
+            refresh: bool = False) -> None:
+        """
+        Stores a search; ``refresh`` only updates the items of an existing entry.
+        With ``items=None`` only the HTML is kept and hits re-extract from it.
+        """
+        key = cache_key(lat, lon, kw, radius_m)
+        blob = zlib.compress(html.encode("utf-8"))
+        packed = None if items is None else \
+            zlib.compress(json.dumps(items, ensure_ascii=False).encode("utf-8"))
+        size = len(blob) + len(packed or b"")
+        now = time.time()
+        if refresh:
+            self.conn.execute(
+                "UPDATE panels SET items = ?, fingerprint = ?, size = ? WHERE key = ?",
+                (packed, parser_fingerprint(), size, key),
+            )
+            return
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO panels
+                (key, latitude, longitude, keyword, radius_m, html, items, fingerprint,
+                 found, size, created_at, last_used)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (key, round(float(lat), 5), round(float(lon), 5), str(kw), int(radius_m), blob,
+             packed, parser_fingerprint(), found, size, now, now),
+        )
+        self.stats["stored"] += 1
+        self._puts += 1
+        if self._puts % EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drops expired entries, then the least recently used ones down to 90% of max_bytes."""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            n = self.conn.execute(
+                "DELETE FROM panels WHERE created_at < ?", (time.time() - self.ttl_s,)
+            ).rowcount
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM panels").fetchone()[0]
+            if total > self.max_bytes:
+                target = total - int(self.max_bytes * 0.9)
+                freed = 0
+                doomed = []
+                for key, size in self.conn.execute("SELECT key, size FROM panels ORDER BY last_used"):
+                    doomed.append((key,))
+                    freed += size
+                    if freed >= target:
+                        break
+                self.conn.executemany("DELETE FROM panels WHERE key = ?", doomed)
+                n += len(doomed)
+        self.stats["evicted"] += n
+        return n
+
+    def summary(self) -> str:
+        return format_stats(self.stats)
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def format_stats(s: dict) -> str:
+    lookups = s.get("hits", 0) + s.get("misses", 0)
+    return (
+        f"{s.get('hits', 0)} hits ({s.get('reparsed', 0)} re-parsed), {s.get('misses', 0)} misses "
+        f"({s.get('expired', 0)} expired), {s.get('bypassed', 0)} bypassed, "
+        f"{s.get('stored', 0)} stored, {s.get('evicted', 0)} evicted; "
+        f"hit rate {100 * s.get('hits', 0) / lookups if lookups else 0:.0f}%"
+    )
+
+
+def merge_stats(stats_list) -> dict:
+    """Sums the per-worker stats dicts."""
+    out: dict[str, int] = {}
+    for stats in stats_list:
+        for k, v in (stats or {}).items():
+            out[k] = out.get(k, 0) + v
+    return out
@@ -0,0 +1,145 @@
+"""
+Streaming, bounded-memory result sink with Parquet output.
+
+Workers buffer items and write them as `parts/part-<worker>-<pid>-<seq>.parquet`,
+one row group per file, every `batch_rows` rows. Each part is complete on disk
+once written, so a crash only loses the rows still in the buffer; the
+scraper defers marking those jobs "done" in the journal until their part is
+written, so a resume re-runs them instead of losing them.
+
+`merge_parts` streams the parts into one de-duplicated, sorted Parquet file
+without ever holding the full result set in memory.
+"""
+
+import glob
+import logging
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+SCHEMA = pa.schema([
+    ("latitude", pa.float64()),
+    ("longitude", pa.float64()),
+    ("keyword", pa.string()),
+    ("name", pa.string()),
+    ("link", pa.string()),
+    ("rating", pa.string()),
+    ("price", pa.string()),
+    ("category", pa.string()),
+    ("address", pa.string()),
+    ("amenities", pa.list_(pa.string())),
+])
+
+MERGE_BUCKETS = 64   # longitude buckets used to sort the merge out of core
+
+
+class ParquetSink:
+    def __init__(self, out_dir: str, worker_id: int | str = 0, batch_rows: int = 5000):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.prefix = f"part-{worker_id}-{os.getpid()}"
+        self.batch_rows = batch_rows
+        self.buffer: list[dict] = []
+        self.seq = 0
+        self.rows_written = 0
+
+    def write(self, items: list[dict]) -> bool:
+        """Buffers items; returns True if that triggered a flush to disk."""
+        self.buffer.extend(items)
+        if len(self.buffer) >= self.batch_rows:
+            self.flush()
+            return True
+        return False
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        table = pa.Table.from_pylist(
+            [{col: item.get(col) for col in SCHEMA.names} for item in self.buffer],
+            schema=SCHEMA,
+        )
+        path = os.path.join(self.out_dir, f"{self.prefix}-{self.seq:05d}.parquet")
+        tmp = path + ".tmp"
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)   # a part either exists whole or not at all
+        self.seq += 1
+        self.rows_written += len(self.buffer)
+        self.buffer = []
+
+    def close(self) -> None:
+        self.flush()
+
+
+def iter_batches(path: str, columns: list[str] | None = None, batch_size: int = 50_000):
+    """Lazily yields record batches from a Parquet file or a directory of parts."""
+    files = sorted(glob.glob(os.path.join(path, "*.parquet"))) if os.path.isdir(path) else [path]
+    if not files:
+        return
+    yield from ds.dataset(files, schema=SCHEMA, format="parquet").to_batches(
+        columns=columns, batch_size=batch_size
+    )
+
+
+def _first_rows(links: pa.ChunkedArray) -> pa.Array:
+    """Indices of the first row of each distinct link, in row order."""
+    rows = pa.table({"link": links, "row": pa.array(range(len(links)), pa.int64())})
+    first = rows.group_by("link", use_threads=False).aggregate([("row", "min")]).column("row_min")
+    return pc.take(first, pc.sort_indices(first))
+
+
+def merge_parts(parts_dir: str, out_path: str, batch_size: int = 50_000) -> tuple[int, int]:
+    """
+    De-duplicates the parts by link and writes them sorted by
+    (longitude, latitude) into one Parquet file, out of core: rows are
+    routed into longitude buckets first, then each bucket is de-duplicated
+    and sorted alone. A link always decodes to the same coordinates, so its
+    duplicates share a bucket, and only one bucket is in memory at a time.
+
+    Returns (rows_in, rows_out).
+    """
+    # 1) longitude range, for the bucket boundaries
+    lo, hi = float("inf"), float("-inf")
+    for batch in iter_batches(parts_dir, ["longitude"], batch_size):
+        lons = batch.column(0).drop_null()
+        if len(lons):
+            lo = min(lo, pc.min(lons).as_py())
+            hi = max(hi, pc.max(lons).as_py())
+    if lo > hi:
+        pq.write_table(SCHEMA.empty_table(), out_path)
+        return 0, 0
+    width = (hi - lo) / MERGE_BUCKETS or 1.0
+
+    # 2) route rows into their bucket, in part order
+    tmp_dir = out_path + ".buckets"
+    os.makedirs(tmp_dir, exist_ok=True)
+    writers: dict[int, pq.ParquetWriter] = {}
+    rows_in = rows_out = 0
+    try:
+        for batch in iter_batches(parts_dir, None, batch_size):
+            rows_in += batch.num_rows
+            table = pa.Table.from_batches([batch])
+            lons = table.column("longitude").to_numpy(zero_copy_only=False)
+            buckets = ((lons - lo) / width).clip(0, MERGE_BUCKETS - 1).astype(int)
+            for b in set(buckets.tolist()):
+                if b not in writers:
+                    writers[b] = pq.ParquetWriter(os.path.join(tmp_dir, f"{b:03d}.parquet"), SCHEMA)
+                writers[b].write_table(table.filter(pa.array(buckets == b)))
+        for w in writers.values():
+            w.close()
+
+        # 3) bucket by bucket: keep each link's first row, sort, append to the final file
+        with pq.ParquetWriter(out_path, SCHEMA) as out:
+            for b in sorted(writers):
+                table = pq.read_table(os.path.join(tmp_dir, f"{b:03d}.parquet"))
+                table = table.take(_first_rows(table.column("link")))
+                rows_out += table.num_rows
+                out.write_table(table.sort_by([("longitude", "ascending"), ("latitude", "ascending")]))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    logging.info("🧱 Merged %d part rows into %d unique rows → %s", rows_in, rows_out, out_path)
+    return rows_in, rows_out
@@ -0,0 +1,315 @@
+"""
+Spatial index over a merged results file, saved next to it.
+
+Rows are bucketed into square cells of ``cell_m`` metres on a regular
+lat/lon grid and their coordinates stored sorted by cell id. Ids run row by
+row of cells, so the cells of one grid row a query spans are a single id
+range: a bbox query is one binary search per cell row plus an exact filter
+on the candidates, a radius query is the bbox of its circle plus a
+haversine filter, and per-cell counts are kept precomputed. Queries return
+row positions in the results file, so they answer in milliseconds however
+large the file is; `frame` loads the rows themselves.
+
+The index is built when a run writes its results (`Main`, `Distributed`)
+and saved as results_<CITY>.index.npz. `coverage_report` then flags the
+grid points whose searches were saturated (the result list hit its ceiling,
+so places are missing), failed or came back empty, with the number of
+indexed places around each point, from a journal's (or broker's) found
+counts.
+
+Usage:
+    python ResultsIndex.py build results_ASUNCIÓN.csv
+    python ResultsIndex.py radius results_ASUNCIÓN.csv -25.2637 -57.5759 500
+    python ResultsIndex.py bbox results_ASUNCIÓN.csv -25.30 -57.65 -25.25 -57.55
+    python ResultsIndex.py cells results_ASUNCIÓN.csv
+    python ResultsIndex.py coverage results_ASUNCIÓN.csv journal_ASUNCIÓN.sqlite 1000 --grid ASUNCIÓN_grid.csv
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from Geo import EARTH_RADIUS_M, haversine_np
+
+M_PER_DEG = 111_320
+CELL_M = 250
+COVERAGE_FLAGS = ("unsearched", "saturated", "failed", "empty", "ok")
+
+
+def index_path(data_path: str) -> str:
+    return os.path.splitext(data_path)[0] + ".index.npz"
+
+
+def _ranges(lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(lo[i], hi[i]) over all i, without a Python loop."""
+    lens = hi - lo
+    total = int(lens.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(lo - np.concatenate(([0], np.cumsum(lens)[:-1])), lens)
+    return offsets + np.arange(total)
+
+
+class ResultsIndex:
+    def __init__(self, arrays: dict, meta: dict):
+        self.cells = arrays["cells"]       # cell id per indexed row, ascending
+        self.lat = arrays["lat"]
+        self.lon = arrays["lon"]
+        self.rows = arrays["rows"]         # row position in the results file
+        self.cell_ids = arrays["cell_ids"]
+        self.per_cell = arrays["cell_counts"]
+        self.meta = meta
+        self._frame = None
+
+    @classmethod
+    def from_points(cls, lats, lons, cell_m: float = CELL_M, data_path: str | None = None) -> "ResultsIndex":
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        rows = np.flatnonzero(~(np.isnan(lats) | np.isnan(lons)))
+        la, lo = lats[rows], lons[rows]
+        if len(rows):
+            lat0, lon0 = float(la.min()), float(lo.min())
+            mid = float(np.radians((la.min() + la.max()) / 2))
+        else:
+            lat0 = lon0 = mid = 0.0
+        dlat = cell_m / M_PER_DEG
+        dlon = cell_m / (M_PER_DEG * max(np.cos(mid), 1e-6))
+        nrows = int((la.max() - lat0) // dlat) + 1 if len(rows) else 0
+        ncols = int((lo.max() - lon0) // dlon) + 1 if len(rows) else 0
+        cells = ((la - lat0) // dlat).astype(np.int64) * ncols + ((lo - lon0) // dlon).astype(np.int64)
+        order = np.argsort(cells, kind="stable")
+        cells = cells[order]
+        cell_ids, cell_counts = np.unique(cells, return_counts=True)
+        meta = {"cell_m": cell_m, "lat0": lat0, "lon0": lon0, "dlat": dlat, "dlon": dlon,
+                "nrows": nrows, "ncols": ncols, "n_rows": int(len(lats)),
+                "data_path": os.path.abspath(data_path) if data_path else None}
+        return cls({"cells": cells, "lat": la[order], "lon": lo[order], "rows": rows[order],
+                    "cell_ids": cell_ids, "cell_counts": cell_counts}, meta)
+
+    @classmethod
+    def build(cls, data_path: str, cell_m: float = CELL_M, out_path: str | None = None) -> "ResultsIndex":
+        """Indexes a results CSV/Parquet file and saves the index next to it."""
+        import pandas as pd
+
+        t0 = time.perf_counter()
+        cols = ["latitude", "longitude"]
+        df = pd.read_parquet(data_path, columns=cols) if data_path.endswith(".parquet") \
+            else pd.read_csv(data_path, usecols=cols)
+        index = cls.from_points(pd.to_numeric(df["latitude"], errors="coerce"),
+                                pd.to_numeric(df["longitude"], errors="coerce"), cell_m, data_path)
+        out_path = out_path or index_path(data_path)
+        index.save(out_path)
+        logging.info("🗺️  Indexed %d of %d rows into %d cells of %d m in %.2f s → %s",
+                     len(index.rows), len(df), len(index.cell_ids), cell_m,
+                     time.perf_counter() - t0, out_path)
+        return index
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as fh:
+            np.savez(fh, cells=self.cells, lat=self.lat, lon=self.lon, rows=self.rows,
+                     cell_ids=self.cell_ids, cell_counts=self.per_cell,
+                     meta=np.array(json.dumps(self.meta)))
+
+    @classmethod
+    def load(cls, path: str) -> "ResultsIndex":
+        """Loads an index file, or the index saved next to a results file."""
+        if not path.endswith(".npz"):
+            path = index_path(path)
+        with np.load(path) as z:
+            arrays = {k: z[k] for k in z.files if k != "meta"}
+            meta = json.loads(str(z["meta"]))
+        return cls(arrays, meta)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    # ── queries ──
+    def _candidates(self, min_lat, min_lon, max_lat, max_lon) -> np.ndarray:
+        """Positions in the sorted arrays of the rows whose cells overlap the box."""
+        m = self.meta
+        if not len(self.cells) or min_lat > max_lat or min_lon > max_lon:
+            return np.empty(0, dtype=np.int64)
+        cy0 = max(int((min_lat - m["lat0"]) // m["dlat"]), 0)
+        cy1 = min(int((max_lat - m["lat0"]) // m["dlat"]), m["nrows"] - 1)
+        cx0 = max(int((min_lon - m["lon0"]) // m["dlon"]), 0)
+        cx1 = min(int((max_lon - m["lon0"]) // m["dlon"]), m["ncols"] - 1)
+        if cy0 > cy1 or cx0 > cx1:
+            return np.empty(0, dtype=np.int64)
+        base = np.arange(cy0, cy1 + 1, dtype=np.int64) * m["ncols"]
+        lo = np.searchsorted(self.cells, base + cx0, side="left")
+        hi = np.searchsorted(self.cells, base + cx1, side="right")
+        return _ranges(lo, hi)
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon) -> np.ndarray:
+        """Row positions (ascending) of the places inside the box."""
+        idx = self._candidates(min_lat, min_lon, max_lat, max_lon)
+        la, lo = self.lat[idx], self.lon[idx]
+        keep = (la >= min_lat) & (la <= max_lat) & (lo >= min_lon) & (lo <= max_lon)
+        return np.sort(self.rows[idx[keep]])
+
+    def radius(self, lat, lon, radius_m, return_distance: bool = False):
+        """Row positions of the places within ``radius_m`` of (lat, lon), nearest first."""
+        # the circle's bbox on the haversine sphere, widest at its poleward edge
+        dlat = np.degrees(radius_m / EARTH_RADIUS_M)
+        dlon = dlat / max(np.cos(np.radians(min(abs(lat) + dlat, 89.9))), 1e-6)
+        idx = self._candidates(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+        dist = haversine_np(lat, lon, self.lat[idx], self.lon[idx])
+        keep = dist <= radius_m
+        idx, dist = idx[keep], dist[keep]
+        order = np.argsort(dist, kind="stable")
+        rows = self.rows[idx[order]]
+        return (rows, dist[order]) if return_distance else rows
+
+    def count_within(self, lat, lon, radius_m) -> int:
+        return len(self.radius(lat, lon, radius_m))
+
+    def cell_counts(self) -> "pd.DataFrame":
+        """Places per non-empty cell, with the cell's centre."""
+        import pandas as pd
+
+        m = self.meta
+        cy, cx = np.divmod(self.cell_ids, max(m["ncols"], 1))
+        return pd.DataFrame({
+            "cell": self.cell_ids,
+            "latitude": m["lat0"] + (cy + 0.5) * m["dlat"],
+            "longitude": m["lon0"] + (cx + 0.5) * m["dlon"],
+            "count": self.per_cell,
+        })
+
+    def frame(self, rows=None) -> "pd.DataFrame":
+        """The indexed results file's rows at ``rows`` (all rows if None); the file is read once."""
+        import pandas as pd
+
+        if self._frame is None:
+            path = self.meta["data_path"]
+            self._frame = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+        return self._frame if rows is None else self._frame.iloc[np.asarray(rows)]
+
+
+def coverage_report(index: ResultsIndex, journal, radius_m: float, ceiling: int = 110,
+                    grid_csv: str | None = None, out_csv: str | None = None) -> "pd.DataFrame":
+    """
+    One row per grid point: searches run, keywords that hit the result
+    ``ceiling`` (saturated), failed every attempt or found nothing, and the
+    indexed places within ``radius_m``. ``journal`` is a JobJournal or
+    SqliteBroker (``found_counts`` / ``failed_jobs``). Points are flagged, in
+    this order of precedence: unsearched (in ``grid_csv`` but never
+    searched), saturated, failed, empty (every search found nothing), ok.
+    """
+    import pandas as pd
+
+    points: dict[tuple, dict] = {}
+
+    def point(lat, lon):
+        return points.setdefault((round(float(lat), 5), round(float(lon), 5)),
+                                 {"searches": 0, "saturated": [], "failed": [], "empty": []})
+
+    for (lat, lon, kw), found in journal.found_counts().items():
+        p = point(lat, lon)
+        if found is None:   # skipped by the keyword planner
+            continue
+        p["searches"] += 1
+        if found >= ceiling:
+            p["saturated"].append(kw)
+        elif found == 0:
+            p["empty"].append(kw)
+    for lat, lon, kw in journal.failed_jobs():
+        point(lat, lon)["failed"].append(kw)
+    if grid_csv:
+        grid = pd.read_csv(grid_csv)
+        for lat, lon in zip(grid["latitude"], grid["longitude"]):
+            point(lat, lon)
+
+    records = []
+    for (lat, lon), p in points.items():
+        if not p["searches"] and not p["failed"]:
+            flag = "unsearched"
+        elif p["saturated"]:
+            flag = "saturated"
+        elif p["failed"]:
+            flag = "failed"
+        elif len(p["empty"]) == p["searches"]:
+            flag = "empty"
+        else:
+            flag = "ok"
+        records.append({
+            "latitude": lat, "longitude": lon, "flag": flag, "searches": p["searches"],
+            "saturated": ";".join(sorted(p["saturated"])), "failed": ";".join(sorted(p["failed"])),
+            "empty": len(p["empty"]), "places": index.count_within(lat, lon, radius_m),
+        })
+    report = pd.DataFrame.from_records(records, columns=[
+        "latitude", "longitude", "flag", "searches", "saturated", "failed", "empty", "places"])
+    counts = report["flag"].value_counts()
+    logging.info("🗺️  Coverage of %d grid points: %s", len(report), ", ".join(
+        f"{flag} {counts[flag]}" for flag in COVERAGE_FLAGS if flag in counts))
+    if out_csv:
+        report.to_csv(out_csv, index=False)
+        logging.info("🗺️  Coverage report → %s", out_csv)
+    return report
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="index a results file")
+    b.add_argument("results")
+    b.add_argument("--cell", type=float, default=CELL_M, help="cell size in metres")
+    r = sub.add_parser("radius", help="places within a radius of a point")
+    r.add_argument("results")
+    r.add_argument("lat", type=float)
+    r.add_argument("lon", type=float)
+    r.add_argument("radius_m", type=float)
+    x = sub.add_parser("bbox", help="places inside a box")
+    x.add_argument("results")
+    for name in ("min_lat", "min_lon", "max_lat", "max_lon"):
+        x.add_argument(name, type=float)
+    c = sub.add_parser("cells", help="places per cell, densest first")
+    c.add_argument("results")
+    v = sub.add_parser("coverage", help="flag saturated, failed and empty grid points")
+    v.add_argument("results")
+    v.add_argument("journal", help="journal_<CITY>.sqlite or broker_<CITY>.sqlite")
+    v.add_argument("radius_m", type=float)
+    v.add_argument("--grid", help="grid CSV, to flag points never searched")
+    v.add_argument("--ceiling", type=int, default=110)
+    v.add_argument("--out", help="CSV to write (default coverage_<results stem>.csv)")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        ResultsIndex.build(args.results, args.cell)
+        return
+    index = ResultsIndex.load(args.results)
+    t0 = time.perf_counter()
+    if args.cmd == "radius":
+        rows = index.radius(args.lat, args.lon, args.radius_m)
+    elif args.cmd == "bbox":
+        rows = index.bbox(args.min_lat, args.min_lon, args.max_lat, args.max_lon)
+    elif args.cmd == "cells":
+        print(index.cell_counts().sort_values("count", ascending=False).head(20).to_string(index=False))
+        return
+    else:
+        import sqlite3
+
+        tables = {r[0] for r in sqlite3.connect(args.journal).execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if "workers" in tables:
+            from Broker import SqliteBroker
+            journal = SqliteBroker(args.journal)
+        else:
+            from Journal import JobJournal
+            journal = JobJournal(args.journal)
+        stem = os.path.splitext(os.path.basename(args.results))[0].removeprefix("results_")
+        coverage_report(index, journal, args.radius_m, args.ceiling, args.grid,
+                        args.out or f"coverage_{stem}.csv")
+        journal.close()
+        return
+    logging.info("🗺️  %d places in %.2f ms", len(rows), (time.perf_counter() - t0) * 1000)
+    print(index.frame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
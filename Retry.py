@@ -1,7 +1,117 @@
-import logging, os, pandas as pd
-from GoogleMapsScraper import GoogleMapsScraper, DriverManager
+"""
+Retry policy for failed jobs, applied inside the main worker pool.
+
+A failed job goes back on the shared queue after an exponential backoff with
+jitter, tagged with its attempt number: `(lat, lon, keyword, radius_m, attempt)`.
+The scraper runs later attempts with an escalation profile — longer waits,
+more scrolls — scaled from its own settings. Jobs still failing after
+`max_attempts` are dead letters, written to `jobs_dead_<city>.csv`.
+
+`retry_and_merge` is the old standalone serial pass, kept for re-running a
+dead-letter file by hand.
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import random
+import time
+
+# outcomes (Throttle.OUTCOMES) worth another attempt
+# ("empty" is not: Google answered, and another attempt gets the same answer)
+RETRYABLE = ("timeout", "consent", "captcha", "error")
+
+# multipliers on the scraper's own settings, per attempt; the last one repeats
+ESCALATION = [
+    {},
+    {"wait_timeout": 1.75, "scroll_max": 2.4, "scroll_interval": 1.9, "scroll_timeout": 2.0},
+    {"wait_timeout": 2.25, "scroll_max": 3.0, "scroll_interval": 2.5, "scroll_timeout": 2.5},
+]
+
+
+def escalate(settings: dict, attempt: int) -> dict:
+    """The scraper settings to use for `attempt` (1 = the first try)."""
+    profile = ESCALATION[min(max(attempt, 1), len(ESCALATION)) - 1]
+    out = dict(settings)
+    for key, factor in profile.items():
+        value = settings[key] * factor
+        out[key] = int(round(value)) if isinstance(settings[key], int) else value
+    return out
+
+
+def job_attempt(job) -> int:
+    return int(job[4]) if len(job) > 4 and job[4] else 1
+
+
+def backoff_delay(attempt: int, base_delay_s: float, max_delay_s: float) -> float:
+    """Seconds to wait before the attempt after ``attempt``: doubling, capped, ±50% jitter."""
+    return min(base_delay_s * 2 ** (attempt - 1), max_delay_s) * random.uniform(0.5, 1.5)
+
+
+class RetryScheduler:
+    """Backoff queue of failed jobs, drained by the coordinator as they come due."""
+
+    def __init__(self, max_attempts: int = 3, base_delay_s: float = 30.0,
+                 max_delay_s: float = 600.0):
+        self.max_attempts = max_attempts
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self._heap: list = []
+        self._tie = itertools.count()
+        self.scheduled = 0
+        self.dead: list[tuple] = []
+
+    def failed(self, job, outcome: str, now: float | None = None) -> bool:
+        """Schedules the next attempt of a failed job; False once its budget is spent."""
+        now = time.time() if now is None else now
+        attempt = job_attempt(job)
+        lat, lon, kw = job[:3]
+        radius = job[3] if len(job) > 3 else None
+        if attempt >= self.max_attempts:
+            self.dead.append((lat, lon, kw, radius, attempt, outcome))
+            return False
+        delay = backoff_delay(attempt, self.base_delay_s, self.max_delay_s)
+        heapq.heappush(self._heap, (now + delay, next(self._tie), (lat, lon, kw, radius, attempt + 1),
+                                    outcome))
+        self.scheduled += 1
+        logging.info("🔁 %s at (%.5f, %.5f) failed (%s); attempt %d/%d in %.0f s",
+                     kw, float(lat), float(lon), outcome, attempt + 1, self.max_attempts, delay)
+        return True
+
+    def due(self, now: float | None = None) -> list[tuple]:
+        now = time.time() if now is None else now
+        out = []
+        while self._heap and self._heap[0][0] <= now:
+            out.append(heapq.heappop(self._heap)[2])
+        return out
+
+    def abandon(self) -> int:
+        """Moves every job still waiting for its next attempt to the dead letters."""
+        for _, _, (lat, lon, kw, radius, attempt), outcome in self._heap:
+            self.dead.append((lat, lon, kw, radius, attempt - 1, outcome))
+        n, self._heap = len(self._heap), []
+        return n
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+def write_dead_letters(dead: list, path: str) -> None:
+    if dead:
+        import pandas as pd
+
+        pd.DataFrame(dead, columns=["latitude", "longitude", "keyword", "radius_m",
+                                    "attempts", "last_outcome"]).to_csv(path, index=False)
+        logging.info("💀 Wrote %d jobs that failed every attempt → %s", len(dead), path)
+    elif os.path.exists(path):
+        os.remove(path)
+        logging.info("🗑️  No dead letters → removed %s", path)
+
 
 def load_failed(path: str):
+    import pandas as pd
+
     if not os.path.exists(path):
         logging.info("No failures to retry.")
         return []
@@ -13,24 +123,29 @@ def load_failed(path: str):
     ]
 
 def retry_and_merge(
-    master_df: pd.DataFrame,
+    master_df: "pd.DataFrame",
     failed_jobs: list,
     city_name: str,
     radius_m: int = 1000,
-    scroll_max: int = 150,
-    wait_timeout: int = 40
-) -> pd.DataFrame:
+    scroll_max: int = 120,
+    wait_timeout: int = 35,
+    scroll_interval: float = 1.5,
+    scroll_timeout: int = 8
+) -> "pd.DataFrame":
     if not failed_jobs:
         return master_df
 
-    mgr = DriverManager(headless=True)
+    import pandas as pd
+    from DriverPool import DriverPool
+    from GoogleMapsScraper import GoogleMapsScraper, DriverManager
+    mgr = DriverPool(DriverManager(headless=True))
     scraper = GoogleMapsScraper(
         mgr, failed_jobs, city_name,
-        radius_m=1000,
-        scroll_max=120,
-        wait_timeout=35,
-        scroll_interval=1.5,
-        scroll_timeout=8
+        radius_m=radius_m,
+        scroll_max=scroll_max,
+        wait_timeout=wait_timeout,
+        scroll_interval=scroll_interval,
+        scroll_timeout=scroll_timeout
     )
     retry_df, still = scraper.scrape()
 
@@ -0,0 +1,151 @@
+"""
+Cross-worker set of places already scraped, in shared memory.
+
+The same place turns up under many overlapping grid points and keywords.
+Workers skip `build_item` for the in-radius places of a panel that are
+already in the set and build the rest. The scrapers claim a job's built
+places only once its rows are handed off (its progress message sent, which
+for a broker worker completes the lease), so a place is never marked seen
+by a job whose build raised, that failed, or whose process died first: the
+retry, or the next job that finds it, builds it. Two jobs in flight may both
+build a place; the final merge drops the duplicate link. Rows of
+already-seen places are never sent back. Which jobs saw which place is
+still recorded in the journal's `places` table (see Journal.py), so keyword
+planning keeps the full overlap.
+
+Places are identified by the ChIJ id in the link, else the CID
+(`!1s0x…:0x…`), else the link itself, hashed to 64 bits with BLAKE2b. At
+that width a false "already seen" needs ~2^32 places, so the set is exact in
+practice. It is an open-addressing table of fixed capacity; once it is 75%
+full, new places are let through un-deduplicated (the final merge still
+drops duplicate links).
+"""
+
+import hashlib
+import logging
+import re
+
+import numpy as np
+from multiprocessing import shared_memory
+
+PROP_ID_RE = re.compile(r"(ChIJ[^?]+)")
+CID_RE = re.compile(r"!1s(0x[0-9a-f]+:0x[0-9a-f]+)")
+MAX_LOAD = 0.75
+
+
+def place_key(link: str) -> str:
+    link = link or ""
+    m = PROP_ID_RE.search(link) or CID_RE.search(link)
+    return m.group(1) if m else link
+
+
+def place_keys(links: "pd.Series") -> "pd.Series":
+    """Vectorized `place_key` for a column of links."""
+    links = links.astype(str)
+    return (links.str.extract(PROP_ID_RE, expand=False)
+            .fillna(links.str.extract(CID_RE, expand=False))
+            .fillna(links))
+
+
+def fingerprint(key: str) -> int:
+    """Stable signed 64-bit hash (Python's hash() differs per process)."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(),
+                          "little", signed=True)
+
+
+def place_fingerprints(links) -> np.ndarray:
+    return np.fromiter((fingerprint(place_key(link)) for link in links), dtype=np.int64,
+                       count=len(links))
+
+
+class SeenSet:
+    """
+    Open-addressing table of place fingerprints in a SharedMemory block:
+    slot 0 holds the number of entries, 0 marks an empty slot. The creating
+    process owns (and unlinks) the block; workers `attach` to it by handle.
+    """
+
+    def __init__(self, capacity: int = 1 << 22, lock=None, name: str | None = None):
+        self.capacity = capacity
+        self.lock = lock
+        self.owner = name is None
+        size = (capacity + 1) * 8
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            # pool workers share the parent's resource tracker, so attaching
+            # does not hand them ownership of the block
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.table = np.ndarray((capacity + 1,), dtype=np.int64, buffer=self.shm.buf)
+        if self.owner:
+            self.table[:] = 0
+        self.skipped = 0
+        self._full_warned = False
+
+    def handle(self, lock) -> tuple:
+        """Picklable (name, capacity, lock) for `attach`; ``lock`` is e.g. a Manager lock."""
+        return self.shm.name, self.capacity, lock
+
+    @classmethod
+    def attach(cls, handle) -> "SeenSet":
+        name, capacity, lock = handle
+        return cls(capacity, lock, name)
+
+    def __len__(self) -> int:
+        return int(self.table[0])
+
+    def _slot(self, fp: int) -> int:
+        """Table index holding ``fp``, or the empty one where it would go."""
+        table, cap = self.table, self.capacity
+        slot = fp % cap
+        while table[slot + 1] != fp and table[slot + 1] != 0:
+            slot = (slot + 1) % cap
+        return slot + 1
+
+    def contains(self, fps) -> np.ndarray:
+        """True where a place is already in the set (it will be skipped); adds nothing."""
+        fps = np.asarray(fps, dtype=np.int64)
+        if not len(fps):
+            return np.zeros(0, dtype=bool)
+        if self.lock is not None:
+            self.lock.acquire()
+        try:
+            known = np.array([self.table[self._slot(fp or 1)] != 0 for fp in fps.tolist()])
+        finally:
+            if self.lock is not None:
+                self.lock.release()
+        self.skipped += int(known.sum())
+        return known
+
+    def claim(self, fps) -> np.ndarray:
+        """Adds the fingerprints; True where a place was not seen before (in any worker)."""
+        fps = np.asarray(fps, dtype=np.int64)
+        new = np.ones(len(fps), dtype=bool)
+        if not len(fps):
+            return new
+        table, cap = self.table, self.capacity
+        if self.lock is not None:
+            self.lock.acquire()
+        try:
+            for i, fp in enumerate(fps.tolist()):
+                fp = fp or 1                       # 0 marks an empty slot
+                slot = self._slot(fp)
+                if table[slot] == fp:
+                    new[i] = False
+                elif table[0] < cap * MAX_LOAD:
+                    table[slot] = fp
+                    table[0] += 1
+                elif not self._full_warned:
+                    self._full_warned = True
+                    logging.warning("🧬 Seen-set full (%d places); new places are no longer "
+                                    "deduplicated across workers", cap * MAX_LOAD)
+        finally:
+            if self.lock is not None:
+                self.lock.release()
+        return new
+
+    def close(self) -> None:
+        self.table = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,148 @@
+"""
+Startup cost of the scraper's processes: module import times, and the time
+each pool worker takes to reach its first job.
+
+Workers are spawned, so each one starts a fresh interpreter and imports `Main`
+(and through it the scraper) before it can take a job; whatever those modules
+import at the top is paid once per worker, per run. Heavy dependencies are
+therefore imported by the code that uses them: pandas, Selenium and pyarrow
+inside the scraper, geopandas, shapely and the post-processing inside
+`Main.main`, which only the parent runs.
+
+Every run logs each worker's startup (see `Main.run_jobs`), split into:
+
+    boot     submit → Main starts importing (interpreter, multiprocessing bootstrap)
+    import   Main's dependencies
+    setup    task arguments and the scraper's stores (journal, cache, metrics, seen-set)
+    browser  browser launch until the first job starts
+
+Usage:
+    python Startup.py                              # import times + spawn to ready, no browser
+    python Startup.py --workers 3 --repeat 5
+    python Startup.py --live -25.2637 -57.5759     # real time to first job (needs Chrome)
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+MODULES = ("Main", "GoogleMapsScraper", "AsyncScraper", "Processor", "KeywordPlanner")
+HEAVY = ("pandas", "pyarrow", "geopandas", "shapely", "selenium", "bs4", "playwright")
+
+_IMPORT_CODE = """
+import importlib, json, sys, time
+t = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({"s": time.perf_counter() - t,
+                  "heavy": [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+
+def startup_stats(submitted: float, import_t0: float, up: float, ready: float,
+                  first_job_at: float | None = None) -> dict:
+    """Per-phase seconds from wall-clock marks taken in the parent and the worker."""
+    return {
+        "boot_s": import_t0 - submitted,
+        "import_s": up - import_t0,
+        "setup_s": ready - up,
+        "browser_s": None if first_job_at is None else first_job_at - ready,
+        "first_job_s": None if first_job_at is None else first_job_at - submitted,
+    }
+
+
+def _fmt(value) -> str:
+    return "     -" if value is None else f"{value:6.2f}"
+
+
+def report_startup(stats: list[dict]) -> None:
+    """Logs one line per worker and the median time to first job."""
+    if not stats:
+        return
+    lines = ["worker   boot  import  setup  browser  first job"]
+    for i, s in enumerate(stats):
+        lines.append(f"{s.get('worker', i):>6} {_fmt(s['boot_s'])}  {_fmt(s['import_s'])} {_fmt(s['setup_s'])}"
+                     f"   {_fmt(s['browser_s'])}     {_fmt(s['first_job_s'])}")
+    logging.info("🚀 Worker startup (s):\n%s", "\n".join(lines))
+    firsts = [s["first_job_s"] for s in stats if s["first_job_s"] is not None]
+    if firsts:
+        logging.info("🚀 Time to first job: median %.2f s, slowest %.2f s",
+                     statistics.median(firsts), max(firsts))
+
+
+def import_times(modules=MODULES, repeat: int = 5) -> list[dict]:
+    """Median import time of each module in a fresh interpreter, and the heavy packages it pulls in."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = []
+    for module in modules:
+        runs = []
+        for _ in range(repeat):
+            proc = subprocess.run([sys.executable, "-c", _IMPORT_CODE, module, *HEAVY],
+                                  cwd=here, capture_output=True, text=True, check=True)
+            runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        out.append({"module": module, "median_s": statistics.median(r["s"] for r in runs),
+                    "heavy": runs[-1]["heavy"]})
+    return out
+
+
+def _probe(submitted: float, barrier) -> dict:
+    import Main
+
+    stats = startup_stats(submitted, Main._WORKER_START["import_t0"], Main._WORKER_START["up"],
+                          time.time())
+    barrier.wait(timeout=120)   # hold this worker so every probe lands on its own process
+    return stats
+
+
+def spawn_times(workers: int = 3) -> list[dict]:
+    """Spawns a pool like `Main.run_jobs` and measures each worker up to the point it would start a browser."""
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+
+    import Main
+
+    ctx = get_context("spawn")
+    with ctx.Manager() as manager, \
+         ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=Main._init_worker) as exe:
+        barrier = manager.Barrier(workers)
+        futures = [exe.submit(_probe, time.time(), barrier) for _ in range(workers)]
+        return [fut.result() for fut in futures]
+
+
+def live(lat: float, lon: float, workers: int) -> None:
+    """One real job batch per worker through `Main.run_jobs`, which logs the startup table."""
+    import Main
+
+    Main.NUM_PROCESSES = workers
+    n = workers * Main.JOB_BATCH_SIZE
+    jobs = [(lat, lon, Main.KEYWORDS[i % len(Main.KEYWORDS)]) for i in range(n)]
+    Main.run_jobs(jobs, "startup", 1000)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--workers", type=int, default=3)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--live", nargs=2, type=float, metavar=("LAT", "LON"),
+                    help="scrape one batch per worker at this point and report time to first job")
+    args = ap.parse_args(argv)
+
+    if args.live:
+        live(*args.live, args.workers)
+        return
+
+    rows = import_times(repeat=args.repeat)
+    logging.info("📦 Import time in a fresh interpreter (median of %d):\n%s", args.repeat, "\n".join(
+        f"{r['module']:<18} {r['median_s'] * 1000:7.0f} ms  {', '.join(r['heavy']) or '-'}" for r in rows
+    ))
+    report_startup(spawn_times(args.workers))
+
+
+if __name__ == "__main__":
+    main()
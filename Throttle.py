@@ -0,0 +1,203 @@
+"""
+Failure classification and AIMD rate control.
+
+Workers classify every job's outcome:
+
+- "ok":      results came back
+- "cached":  served from the search cache, no request made
+- "empty":   the search has no result list: Google's no-results message, a
+             single hit opened as a place page, or a panel with no cards
+- "timeout": neither a result list nor one of those showed up in time
+- "consent": Google's cookie-consent wall instead of Maps
+- "captcha": the "unusual traffic" / reCAPTCHA page (google.com/sorry)
+- "error":   anything else
+- "skipped": not run, dropped by the keyword planner
+
+The coordinator feeds outcomes to `AIMDController`, which publishes how many
+workers may run and how long each waits between jobs through a shared
+Manager dict:
+
+- a CAPTCHA pauses every worker (with a growing back-off), halves the active
+  workers and doubles the per-job delay;
+- a run of timeouts (`timeout_share` of the recent window) halves the same;
+- every `increase_after` clean jobs the delay drops by `delay_step_s`, and
+  once it is back at its floor one more worker is let in.
+
+Decreases are spaced by `cooldown_s`, so the jobs already in flight when the
+block started do not collapse the pool to one worker.
+"""
+
+import json
+import logging
+import random
+import time
+from collections import Counter, deque
+
+OUTCOMES = ("ok", "cached", "empty", "timeout", "consent", "captcha", "error", "skipped")
+
+# [url, title, first 3000 chars of visible text] of whatever page the tab is on
+PAGE_PROBE_FN = """
+() => [location.href, document.title || '',
+       document.body ? document.body.innerText.slice(0, 3000) : '']
+"""
+PAGE_PROBE_JS = "return (" + PAGE_PROBE_FN + ")();"
+
+CAPTCHA_MARKERS = (
+    "/sorry/", "unusual traffic", "tráfico inusual", "recaptcha", "not a robot", "no soy un robot",
+)
+CONSENT_MARKERS = (
+    "consent.google.", "before you continue", "antes de ir a google", "antes de continuar",
+)
+# a search with no result list: Google's no-results message, or a single hit
+# that Maps opens straight as a place page
+NO_RESULTS_MARKERS = (
+    "google maps can't find", "google maps can’t find", "google maps no puede encontrar", "google maps no encuentra",
+    "no se encontraron resultados", "no results found",
+)
+PLACE_PAGE_MARKER = "/maps/place/"
+
+# "cards" once the result list is up, "empty" for a no-results message or a
+# place page, null while neither has rendered; the wait condition of both
+# scrapers, so a sparse area is not mistaken for a slow page
+PANEL_STATE_FN = """
+() => {
+    if (document.querySelector("a.hfpxzc")) return "cards";
+    if (location.pathname.includes(%s)) return "empty";
+    const text = document.body ? document.body.innerText.slice(0, 3000).toLowerCase() : "";
+    return %s.some(m => text.includes(m)) ? "empty" : null;
+}
+""" % (json.dumps(PLACE_PAGE_MARKER), json.dumps(NO_RESULTS_MARKERS))
+PANEL_STATE_JS = "return (" + PANEL_STATE_FN + ")();"
+
+
+def classify_failure(exc: BaseException | None, page: tuple | None = None) -> str:
+    """
+    Class of a failed job from the exception it raised and, if available, the
+    (url, title, text) the tab ended up on.
+    """
+    if page:
+        url, title, text = (str(part or "").lower() for part in page)
+        blob = " ".join((url, title, text))
+        if any(m in blob for m in CAPTCHA_MARKERS):
+            return "captcha"
+        if any(m in blob for m in CONSENT_MARKERS):
+            return "consent"
+        if PLACE_PAGE_MARKER in url or any(m in text for m in NO_RESULTS_MARKERS):
+            return "empty"
+    if exc is not None and "timeout" in type(exc).__name__.lower():
+        return "timeout"
+    return "error"
+
+
+class AIMDController:
+    def __init__(self, max_workers: int, start_workers: int | None = None,
+                 min_delay_s: float = 0.0, max_delay_s: float = 30.0,
+                 delay_step_s: float = 0.5, increase_after: int = 20, window: int = 20,
+                 timeout_share: float = 0.3, cooldown_s: float = 60.0, pause_s: float = 120.0):
+        self.max_workers = max_workers
+        self.active = min(start_workers or max_workers, max_workers)
+        self.min_delay_s = min_delay_s
+        self.max_delay_s = max_delay_s
+        self.delay_s = min_delay_s
+        self.delay_step_s = delay_step_s
+        self.increase_after = increase_after
+        self.timeout_share = timeout_share
+        self.cooldown_s = cooldown_s
+        self.pause_s = pause_s
+        self.pause_until = 0.0
+        self.recent: deque[str] = deque(maxlen=window)
+        self.streak = 0
+        self.last_decrease = float("-inf")
+        self.pauses = 0
+        self.counts: Counter = Counter()
+        self.changes = 0
+
+    def state(self) -> dict:
+        return {"active": self.active, "delay_s": self.delay_s, "pause_until": self.pause_until}
+
+    def observe(self, outcome: str, now: float | None = None) -> bool:
+        """Feeds one job outcome; returns True if the published state changed."""
+        now = time.time() if now is None else now
+        self.counts[outcome] += 1
+        self.recent.append(outcome)
+
+        if outcome == "captcha":
+            self.pauses += 1
+            self.pause_until = max(self.pause_until,
+                                   now + self.pause_s * min(2 ** (self.pauses - 1), 8))
+            logging.warning("🚦 CAPTCHA seen: pausing all workers until %s",
+                            time.strftime("%H:%M:%S", time.localtime(self.pause_until)))
+            self._decrease(now, "captcha")
+            return True
+
+        if outcome == "timeout":
+            self.streak = 0
+            share = self.recent.count("timeout") / len(self.recent)
+            if len(self.recent) >= self.recent.maxlen // 2 and share >= self.timeout_share:
+                return self._decrease(now, f"{share:.0%} of recent jobs timed out")
+            return False
+
+        if outcome == "ok":
+            self.streak += 1
+            if self.streak >= self.increase_after:
+                self.streak = 0
+                return self._increase()
+        # cached / empty / consent / error / skipped say nothing about the rate limit
+        return False
+
+    def _decrease(self, now: float, reason: str) -> bool:
+        if now - self.last_decrease < self.cooldown_s:
+            return False
+        self.last_decrease = now
+        self.active = max(1, self.active // 2)
+        self.delay_s = min(self.max_delay_s, max(self.delay_s * 2, self.delay_step_s * 2))
+        self.recent.clear()
+        self.streak = 0
+        self.changes += 1
+        logging.warning("🚦 Backing off (%s): %d active workers, %.1f s between jobs",
+                        reason, self.active, self.delay_s)
+        return True
+
+    def _increase(self) -> bool:
+        if self.delay_s > self.min_delay_s:
+            self.delay_s = max(self.min_delay_s, self.delay_s - self.delay_step_s)
+        elif self.active < self.max_workers:
+            self.active += 1
+        else:
+            return False
+        self.changes += 1
+        logging.info("🚦 Speeding up: %d active workers, %.1f s between jobs",
+                     self.active, self.delay_s)
+        return True
+
+    def report(self, elapsed_s: float) -> None:
+        jobs = sum(self.counts.values())
+        logging.info(
+            "🚦 %d jobs in %.1f h (%.0f jobs/h); outcomes: %s; %d rate changes, %d CAPTCHA pauses",
+            jobs, elapsed_s / 3600, 3600 * jobs / elapsed_s if elapsed_s else 0,
+            ", ".join(f"{k} {self.counts[k]}" for k in OUTCOMES if self.counts[k]) or "none",
+            self.changes, self.pauses
+        )
+
+
+def wait_for_turn(shared, worker_id: int, sleep=time.sleep) -> None:
+    """Blocks a worker while the controller has it parked or everyone paused."""
+    if shared is None:
+        return
+    while True:
+        state = shared.copy()
+        wait = state["pause_until"] - time.time()
+        if wait > 0:
+            sleep(min(wait, 5.0))
+        elif worker_id >= state["active"]:
+            sleep(2.0)
+        else:
+            return
+
+
+def pacing_delay(shared) -> float:
+    """This job's delay: the published one with ±50% jitter so workers drift apart."""
+    if shared is None:
+        return 0.0
+    delay = shared["delay_s"]
+    return delay * random.uniform(0.5, 1.5) if delay else 0.0
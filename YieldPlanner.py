@@ -0,0 +1,219 @@
+"""
+Job planner from the timing and yield history of earlier runs.
+
+Past runs left each job's duration in the metrics JSON lines (Metrics.py)
+and its new places — places no earlier job of that run had found — in the
+journal's `places` table (or, without a journal, as the items the job built
+with the seen-set on). The metrics directory is shared by every city, so
+only its records of the run's city and search radius are read. Jobs are
+grouped by (cell, keyword), with cells of ``cell_m`` metres, so a grid with
+another spacing, or the adaptive planner's cells, still finds its history. A job's estimate is its cell's mean blended
+with its keyword's mean (worth ``prior_n`` searches), and the keyword's mean
+with the mean over all jobs, so thin history falls back smoothly.
+
+`plan()` then:
+
+- logs the estimated run time over the workers (the ETA) and the expected
+  new places, before anything is scraped;
+- optionally drops the jobs expected to find fewer than ``min_yield`` new
+  places, and those that do not fit a ``budget_s`` time budget (the best
+  places per second are kept);
+- orders the rest highest expected yield first. The jobs are split into
+  ``tiers`` bands of yield, within which JobOrder keeps its locality order.
+
+Dropped jobs are not journaled, so the next run picks them up.
+
+Usage:
+    python YieldPlanner.py metrics journal_ASUNCIÓN.sqlite [more sources...]
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from Journal import job_key
+
+M_PER_DEG = 111_320
+CELL_M = 1000
+
+
+def _cells(lats, lons, cell_m: float) -> np.ndarray:
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    cy = np.floor(lats * M_PER_DEG / cell_m).astype(np.int64)
+    cx = np.floor(lons * np.cos(np.radians(lats)) * M_PER_DEG / cell_m).astype(np.int64)
+    return cy * (1 << 32) + (cx + (1 << 31))
+
+
+def _journal_history(path: str) -> pd.DataFrame:
+    """New places per done job, crediting each place to the first job (by finish time) that found it."""
+    with sqlite3.connect(path) as conn:
+        jobs = pd.read_sql_query(
+            "SELECT rowid AS job, latitude, longitude, keyword, n_items, updated_at FROM jobs "
+            "WHERE status = 'done'", conn)
+        places = pd.read_sql_query("SELECT job, place FROM places", conn) \
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'places'").fetchone() else None
+    if places is None or places.empty:
+        jobs["new"] = jobs["n_items"]   # items are only built for places new to the run
+    else:
+        first = (places.merge(jobs[["job", "updated_at"]], on="job")
+                 .sort_values("updated_at", kind="stable")
+                 .drop_duplicates("place"))
+        jobs["new"] = jobs["job"].map(first.groupby("job").size()).fillna(0)
+    jobs["duration_s"] = np.nan
+    return jobs[["latitude", "longitude", "keyword", "new", "duration_s"]]
+
+
+def load_history(sources, city: str | None = None, radius_m: float | None = None) -> pd.DataFrame:
+    """
+    (latitude, longitude, keyword, new, duration_s) per past job; NaN where
+    unknown. A metrics directory holds the runs of every city, so with
+    ``city`` / ``radius_m`` only its records of that city and search radius
+    are used (records written before they were tagged are left out); a
+    journal is already one city's.
+    """
+    from Metrics import load_records
+
+    journals, metrics = [], []
+    for src in sources:
+        if not src or not os.path.exists(src):
+            continue
+        if src.endswith(".sqlite"):
+            journals.append(_journal_history(src))
+        elif os.path.isdir(src):
+            df = load_records(src)
+            if df.empty:
+                continue
+            keep = df["outcome"].isin(["ok", "empty", "cached"])
+            if city is not None:
+                keep &= (df["city"] == city) if "city" in df else False
+            if radius_m is not None:
+                keep &= (df["radius_m"] == radius_m) if "radius_m" in df else False
+            df = df[keep]
+            metrics.append(pd.DataFrame({
+                "latitude": df["latitude"], "longitude": df["longitude"], "keyword": df["keyword"],
+                "new": df["items"].astype(float),
+                # a cached job says nothing about how long a live search takes
+                "duration_s": df["total_s"].where(df["outcome"] != "cached"),
+            }))
+    hist = pd.concat(journals + metrics, ignore_index=True) if journals or metrics else \
+        pd.DataFrame(columns=["latitude", "longitude", "keyword", "new", "duration_s"])
+    if journals and metrics:
+        # the same job in a journal and in the metrics: yield from the
+        # journal, duration from the metrics
+        hist["key"] = [job_key(*k) for k in zip(hist["latitude"], hist["longitude"], hist["keyword"])]
+        hist = hist.groupby("key", sort=False).agg(
+            latitude=("latitude", "first"), longitude=("longitude", "first"),
+            keyword=("keyword", "first"), new=("new", "first"), duration_s=("duration_s", "mean"),
+        ).reset_index(drop=True)
+    return hist
+
+
+def _shrunk(hist: pd.DataFrame, col: str, prior_n: float) -> tuple[pd.Series, pd.Series, float]:
+    """Per-(cell, keyword) and per-keyword means of ``col``, each blended with the level above."""
+    known = hist.dropna(subset=[col])
+    overall = float(known[col].mean()) if len(known) else float("nan")
+    by_kw = known.groupby("keyword")[col].agg(["sum", "count"])
+    kw_mean = (by_kw["sum"] + prior_n * overall) / (by_kw["count"] + prior_n)
+    by_cell = known.groupby(["cell", "keyword"])[col].agg(["sum", "count"])
+    prior = kw_mean.reindex(by_cell.index.get_level_values("keyword")).to_numpy()
+    cell_mean = (by_cell["sum"] + prior_n * prior) / (by_cell["count"] + prior_n)
+    return cell_mean, kw_mean, overall
+
+
+class YieldPlanner:
+    def __init__(self, history: pd.DataFrame, cell_m: float = CELL_M, prior_n: float = 2.0,
+                 min_yield: float = 0.0, budget_s: float | None = None, tiers: int = 4):
+        self.cell_m = cell_m
+        self.min_yield = min_yield
+        self.tiers = max(tiers, 1)
+        self.deadline = time.time() + budget_s if budget_s else None
+        hist = history.copy()
+        hist["cell"] = _cells(hist["latitude"], hist["longitude"], cell_m)
+        self.n_history = len(hist)
+        self.new_cell, self.new_kw, self.new_all = _shrunk(hist, "new", prior_n)
+        self.dur_cell, self.dur_kw, self.dur_all = _shrunk(hist, "duration_s", prior_n)
+        if self.dur_all != self.dur_all:   # no timings yet: a typical live search
+            self.dur_all = 30.0
+        self.eta_s = None
+
+    @classmethod
+    def from_sources(cls, sources, city: str | None = None, radius_m: float | None = None, **kwargs):
+        history = load_history(sources, city, radius_m)
+        if history.empty:
+            return None
+        return cls(history, **kwargs)
+
+    def _lookup(self, cells, kws, by_cell: pd.Series, by_kw: pd.Series, overall: float) -> np.ndarray:
+        est = by_cell.reindex(pd.MultiIndex.from_arrays([cells, kws])).to_numpy(dtype=float, copy=True)
+        missing = np.isnan(est)
+        est[missing] = by_kw.reindex(np.asarray(kws)[missing]).to_numpy(dtype=float)
+        return np.where(np.isnan(est), overall, est)
+
+    def estimate(self, jobs) -> tuple[np.ndarray, np.ndarray]:
+        """(expected new places, expected seconds) per job."""
+        lats = [float(j[0]) for j in jobs]
+        lons = [float(j[1]) for j in jobs]
+        kws = [str(j[2]) for j in jobs]
+        cells = _cells(lats, lons, self.cell_m)
+        new = self._lookup(cells, kws, self.new_cell, self.new_kw, self.new_all)
+        dur = self._lookup(cells, kws, self.dur_cell, self.dur_kw, self.dur_all)
+        return np.nan_to_num(new), dur
+
+    def plan(self, jobs: list, workers: int = 1) -> tuple[list, list[int]]:
+        """The jobs to run, highest expected yield first, and each one's yield tier (0 = best)."""
+        if not jobs:
+            return [], []
+        new, dur = self.estimate(jobs)
+        keep = new >= self.min_yield if self.min_yield else np.ones(len(jobs), dtype=bool)
+        if self.min_yield and not keep.all():
+            logging.info("✂️  Dropping %d jobs expected to find under %.1f new places (~%.0f places in all)",
+                         (~keep).sum(), self.min_yield, new[~keep].sum())
+        if self.deadline is not None:
+            capacity = max(self.deadline - time.time(), 0.0) * workers
+            # best places per second first, until the workers' time runs out
+            idx = np.flatnonzero(keep)
+            by_rate = idx[np.argsort(-new[idx] / np.maximum(dur[idx], 1e-3), kind="stable")]
+            over = by_rate[np.cumsum(dur[by_rate]) > capacity]
+            if len(over):
+                keep[over] = False
+                logging.info("✂️  Dropping %d jobs (~%.0f expected places) that do not fit the %.1f h left",
+                             len(over), new[over].sum(), capacity / workers / 3600)
+
+        idx = np.flatnonzero(keep)
+        order = idx[np.argsort(-new[idx], kind="stable")]
+        self.eta_s = float(dur[order].sum()) / max(workers, 1)
+        logging.info("📅 Plan: %d jobs, ~%.0f new places expected, ETA %s with %d workers "
+                     "(from %d past jobs)", len(order), new[order].sum(), _hms(self.eta_s),
+                     workers, self.n_history)
+        tiers = (np.arange(len(order)) * self.tiers // max(len(order), 1)).tolist()
+        if len(order):
+            top = new[order[: max(len(order) // self.tiers, 1)]]
+            logging.info("📅 Top %d%% of jobs: ~%.1f new places each; the rest ~%.1f",
+                         100 // self.tiers, top.mean(),
+                         new[order[len(top):]].mean() if len(order) > len(top) else 0.0)
+        return [jobs[i] for i in order], tiers
+
+
+def _hms(seconds: float) -> str:
+    h, rem = divmod(int(seconds), 3600)
+    return f"{h}h{rem // 60:02d}m"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python YieldPlanner.py <metrics dir | journal.sqlite> [...]")
+    hist = load_history(sys.argv[1:])
+    if hist.empty:
+        sys.exit("No job history in the given sources")
+    planner = YieldPlanner(hist)
+    pd.set_option("display.width", 200)
+    by_kw = pd.DataFrame({"new_places": planner.new_kw, "seconds": planner.dur_kw}).round(2)
+    logging.info("📅 %d past jobs; expected per search by keyword:\n%s", len(hist),
+                 by_kw.sort_values("new_places", ascending=False).to_string())
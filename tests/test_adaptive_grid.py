@@ -0,0 +1,75 @@
+import shapely.geometry as geom
+
+from AdaptiveGrid import SPACING_FACTOR, AdaptivePlanner
+
+RADIUS_M = 1000
+CEILING = 110
+
+
+def _planner():
+    # one coarse cell, in EPSG:5880 metres around Asunción
+    side = RADIUS_M * SPACING_FACTOR * 4
+    x, y = 4_630_000.0, 7_190_000.0
+    area = geom.box(x, y, x + side, y + side)
+    return AdaptivePlanner(area, RADIUS_M, ["farmacia"], coarse_factor=4, ceiling=CEILING)
+
+
+def test_saturated_parent_queues_all_children():
+    planner = _planner()
+    [root] = planner.initial_jobs()
+    children = planner.feedback([(root, CEILING)])
+    assert len(children) == 4
+    assert {job[3] for job in children} == {root[3] // 2}
+    assert planner.splits == 1
+
+
+def test_empty_child_keeps_its_siblings():
+    planner = _planner()
+    [root] = planner.initial_jobs()
+    first, *siblings = planner.feedback([(root, CEILING)])
+    # the siblings were queued with it, so an empty first child drops nothing
+    assert planner.feedback([(first, 0)]) == []
+    assert planner.feedback([(job, 5) for job in siblings]) == []
+    assert planner.jobs_planned == 5
+
+
+def test_dead_child_does_not_hold_back_its_siblings():
+    planner = _planner()
+    [root] = planner.initial_jobs()
+    _dead, *siblings = planner.feedback([(root, CEILING)])
+    # the dead job never reports back; its siblings still run and can split
+    grandchildren = planner.feedback([(siblings[0], CEILING)] + [(job, 3) for job in siblings[1:]])
+    assert len(grandchildren) == 4
+    assert planner.splits == 2
+
+
+def test_unsaturated_search_is_not_split():
+    planner = _planner()
+    [root] = planner.initial_jobs()
+    assert planner.feedback([(root, CEILING - 1)]) == []
+    assert planner.feedback([(root, None)]) == []
+
+
+def _at(planner, child):
+    lon, lat = planner.to_wgs.transform(child.x, child.y)
+    return lat, lon
+
+
+def test_quadrants_without_parent_places_are_skipped():
+    planner = _planner()
+    [root] = planner.initial_jobs()
+    cell, _ = planner.jobs_by_key[next(iter(planner.jobs_by_key))]
+    children = planner._children(cell)
+    # the parent's places all fall in two of its four quadrants
+    coords = [_at(planner, children[0])] * 60 + [_at(planner, children[3])] * 60
+    kept = planner.feedback([(root, CEILING, coords)])
+    assert len(kept) == 2
+    assert planner.skipped == 2
+    assert planner.report(100)["skipped"] == 2
+
+
+def test_unknown_parent_places_queue_every_child():
+    planner = _planner()
+    [root] = planner.initial_jobs()
+    assert len(planner.feedback([(root, CEILING, None)])) == 4
+    assert planner.skipped == 0
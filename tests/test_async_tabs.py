@@ -0,0 +1,82 @@
+import asyncio
+import queue
+
+import pytest
+
+from AsyncScraper import AsyncScraper, _Tab
+
+
+@pytest.fixture(autouse=True)
+def _in_tmp(monkeypatch, tmp_path):
+    # the scraper opens its error log in the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+class FakeCDP:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+
+def _run_tabs(scraper, batches, n_tabs, progress):
+    """Runs the tab workers the way ``AsyncScraper._run`` does, on fake tabs."""
+    results, failed = [], []
+    tabs = [_Tab(f"t{i}", None, FakeCDP()) for i in range(n_tabs)]
+
+    async def main():
+        local = asyncio.Queue(maxsize=n_tabs)
+
+        async def feed():
+            for batch in batches:
+                await local.put(batch)
+            for _ in range(n_tabs):
+                await local.put(None)
+
+        await asyncio.gather(feed(), *(scraper._tab_worker(tab, local, results, failed, progress)
+                                       for tab in tabs))
+
+    asyncio.run(main())
+    return results, failed
+
+
+def test_tabs_overlap_their_waits_and_keep_a_batch_together():
+    scraper = AsyncScraper("T", tabs=3)
+    in_flight, peak, ran_on = 0, 0, {}
+
+    async def fake_job(tab, idx, lat, lon, kw, radius_m=None, attempt=1):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        ran_on[(lat, lon, kw)] = tab.name
+        await asyncio.sleep(0.01)   # the page wait, during which other tabs run
+        in_flight -= 1
+        if kw == "roto":
+            return [], None, True, "timeout"
+        return [{"link": f"{lat},{kw}"}], 1, False, "ok"
+
+    scraper._scrape_job_async = fake_job
+    batches = [[(p, -57.6, kw) for kw in ("farmacia", "tienda", "roto")] for p in range(6)]
+    progress = queue.Queue()
+    results, failed = _run_tabs(scraper, batches, 3, progress)
+
+    assert peak == 3
+    assert len(results) == 12
+    assert sorted(failed) == [(p, -57.6, "roto") for p in range(6)]
+    # a point's keywords all ran on one tab, as keyword pruning needs
+    for p in range(6):
+        assert len({ran_on[(p, -57.6, kw)] for kw in ("farmacia", "tienda", "roto")}) == 1
+    msgs = [progress.get_nowait() for _ in range(progress.qsize())]
+    assert len(msgs) == 18 and all(len(m) == 8 for m in msgs)
+    assert {m[4] for m in msgs} == {job for batch in batches for job in batch}
+
+
+def test_tab_counts_the_network_of_its_own_page():
+    cdp = FakeCDP()
+    tab = _Tab("t0", None, cdp)
+    cdp.handlers["Network.loadingFinished"]({"encodedDataLength": 700})
+    cdp.handlers["Network.loadingFailed"]({"blockedReason": "inspector"})
+    cdp.handlers["Network.loadingFailed"]({"errorText": "net::ERR_ABORTED"})
+    assert tab.take_network() == {"bytes": 700, "requests": 1, "blocked": 1}
+    assert tab.take_network() == {"bytes": 0, "requests": 0, "blocked": 0}
@@ -0,0 +1,146 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+import Broker
+from Broker import BrokerServer, HttpBroker, SqliteBroker
+
+JOBS = [(-25.30, -57.60, "farmacia"), (-25.31, -57.61, "farmacia")]
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(Broker.time, "time", c)
+    return c
+
+
+@pytest.fixture
+def broker(tmp_path, clock):
+    b = SqliteBroker(str(tmp_path / "broker.sqlite"), max_attempts=2, base_delay_s=10, max_delay_s=10)
+    b.add_jobs(JOBS, meta={"city": "X", "radius_m": 1000})
+    yield b
+    b.close()
+
+
+def test_claim_leases_each_job_once(broker):
+    first = broker.claim("a", n=1)
+    second = broker.claim("b", n=5)
+    assert [job[:3] for _, job in first + second] == JOBS
+    assert first[0][1][4] == 1   # first attempt
+    assert broker.claim("c", n=5) == []
+    assert broker.counts()["leased"] == 2
+
+
+def test_expired_lease_goes_to_the_next_worker(broker, clock):
+    [(job_id, _)] = broker.claim("a", n=1, lease_s=60)
+    clock.now += 61
+    broker.reap()
+    assert broker.heartbeat("a", [job_id]) == [job_id]   # no longer held
+    clock.now += 20                                      # past the backoff (±50% jitter)
+    claimed = broker.claim("b", n=2)
+    assert job_id in [jid for jid, _ in claimed]
+    assert dict(claimed)[job_id][4] == 2                 # a failed attempt: escalated
+
+
+def test_heartbeat_keeps_the_lease(broker, clock):
+    [(job_id, _)] = broker.claim("a", n=1, lease_s=60)
+    clock.now += 50
+    assert broker.heartbeat("a", [job_id], lease_s=60) == []
+    clock.now += 50
+    assert [jid for jid, _ in broker.claim("b", n=5)] != [job_id]
+    assert broker.fail("a", job_id, "timeout")
+
+
+def test_late_complete_is_kept_and_second_is_ignored(broker, clock):
+    [(job_id, _)] = broker.claim("a", n=1, lease_s=60)
+    clock.now += 61
+    broker.reap()
+    clock.now += 20
+    assert job_id in [jid for jid, _ in broker.claim("b", n=5)]
+    # the old holder finishes after all: its work is kept
+    assert broker.complete("a", job_id, [{"link": "x"}], found=1)
+    assert not broker.complete("b", job_id, [{"link": "y"}], found=1)
+    assert broker.load_items() == [{"link": "x"}]
+
+
+def test_fail_retires_a_job_after_max_attempts(broker, clock):
+    [(job_id, _)] = broker.claim("a", n=1)
+    assert broker.fail("a", job_id, "timeout")
+    clock.now += 20
+    claimed = dict(broker.claim("a", n=5))
+    assert claimed[job_id][4] == 2
+    assert broker.fail("a", job_id, "captcha")
+    assert broker.dead_letters() == [(-25.3, -57.6, "farmacia", None, 2, "captcha")]
+    assert not broker.fail("b", job_id)   # not held by anyone any more
+
+
+def test_server_requires_the_token(tmp_path):
+    broker = SqliteBroker(str(tmp_path / "broker.sqlite"))
+    broker.add_jobs(JOBS, meta={"city": "X"})
+    with pytest.raises(ValueError):
+        BrokerServer(broker, "")
+    server = BrokerServer(broker, "s3cret", port=0).start()
+    try:
+        assert server.url.startswith("http://127.0.0.1:")
+        assert HttpBroker(server.url, "s3cret").meta() == {"city": "X"}
+        for token in (None, "wrong"):
+            with pytest.raises(urllib.error.HTTPError) as err:
+                HttpBroker(server.url, token, retries=1).claim("intruder", n=5)
+            assert err.value.code == 401
+        assert broker.counts()["leased"] == 0
+    finally:
+        server.stop()
+        broker.close()
+
+
+def test_fail_from_a_worker_without_the_lease_costs_no_attempt(broker, clock):
+    [(job_id, _)] = broker.claim("a", n=1, lease_s=60)
+    assert not broker.fail("b", job_id, "timeout")
+    assert broker.conn.execute("SELECT state, attempts FROM jobs WHERE id = ?", (job_id,)).fetchone() \
+        == ("leased", 0)
+    assert {w["name"]: w["failed"] for w in broker.workers()} == {"a": 0, "b": 0}
+
+
+@pytest.fixture
+def served(tmp_path, monkeypatch):
+    """A served broker whose client loses the first response of every call after the server ran it."""
+    broker = SqliteBroker(str(tmp_path / "broker.sqlite"), max_attempts=3)
+    broker.add_jobs(JOBS, meta={"city": "X"})
+    server = BrokerServer(broker, "s3cret", port=0).start()
+    urlopen = urllib.request.urlopen
+    lost = set()
+
+    def lossy_urlopen(req, timeout=None):
+        resp = urlopen(req, timeout=timeout)
+        key = req.get_header(Broker.REQUEST_ID_HEADER.capitalize())
+        if key not in lost:
+            lost.add(key)
+            resp.read()
+            raise TimeoutError("response lost")
+        return resp
+
+    monkeypatch.setattr(Broker.urllib.request, "urlopen", lossy_urlopen)
+    monkeypatch.setattr(Broker.time, "sleep", lambda s: None)
+    yield broker, HttpBroker(server.url, "s3cret", retries=3)
+    server.stop()
+    broker.close()
+
+
+def test_retried_claim_and_fail_apply_once(served):
+    broker, client = served
+    [(job_id, _)] = client.claim("a", n=1)
+    assert broker.counts()["leased"] == 1            # the retry got the first lease back
+    assert client.fail("a", job_id, "timeout")
+    assert broker.conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0] == 1
+    # a new call is a new request
+    assert [jid for jid, _ in client.claim("a", n=5)] == [job_id + 1]
@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+
+from DriverPool import DriverPool
+from GoogleMapsScraper import DriverManager
+
+
+class FakeDriver:
+    def __init__(self, profile):
+        self.profile = profile
+
+    def execute_script(self, js):
+        return 1
+
+    def execute_cdp_cmd(self, cmd, args):
+        return {"metrics": []}
+
+    def quit(self):
+        pass
+
+
+class Chrome:
+    """Launches fake browsers, failing while ``broken``; notes a profile launched twice."""
+
+    def __init__(self):
+        self.broken = False
+        self.live = set()
+        self.clashes = []
+        self.lock = threading.Lock()
+
+
+@pytest.fixture
+def chrome():
+    return Chrome()
+
+
+@pytest.fixture
+def manager(chrome):
+    class FakeManager(DriverManager):
+        def start_driver(self):
+            with chrome.lock:
+                if chrome.broken:
+                    raise RuntimeError("chrome not reachable")
+                profile = f"worker-{self.worker_id}"
+                if profile in chrome.live:
+                    chrome.clashes.append(profile)
+                chrome.live.add(profile)
+            self.driver = FakeDriver(profile)
+            return self.driver
+
+        def stop_driver(self):
+            with chrome.lock:
+                chrome.live.discard(self.driver.profile)
+
+    return FakeManager(worker_id=7)
+
+
+def _settle(pool):
+    """Waits for the background launches and retirements, including those they start."""
+    while any(t.is_alive() for t in list(pool._threads)):
+        for t in list(pool._threads):
+            t.join()
+
+
+def _pool(manager, spares):
+    return DriverPool(manager, spares=spares, recycle_after=1000, check_every=0,
+                      launch_retries=2, launch_backoff_s=0)
+
+
+def test_failed_relaunch_keeps_the_old_browser(manager, chrome):
+    pool = _pool(manager, spares=1)
+    first = pool.start_driver()
+    _settle(pool)
+    chrome.broken = True
+    second = pool.after_job("captcha")   # the warm spare takes over; its replacement fails
+    assert second is not first
+    _settle(pool)
+    assert pool.after_job("captcha") is second   # nothing to swap in: keeps its browser
+    chrome.broken = False
+    _settle(pool)
+    assert pool.after_job("captcha") not in (first, second)
+    pool.stop_driver()
+    assert chrome.live == set() and chrome.clashes == []
+
+
+def test_without_spares_a_failed_relaunch_is_retried_by_the_next_job(manager, chrome):
+    pool = _pool(manager, spares=0)
+    pool.start_driver()
+    chrome.broken = True
+    assert pool.after_job("captcha") is None
+    assert pool.after_job("error") is None
+    chrome.broken = False
+    assert pool.after_job("error") is not None
+    assert pool.stats["recycles"] == {"captcha": 1, "no_browser": 2}
+    pool.stop_driver()
+    assert chrome.live == set()
+
+
+def test_slots_stay_unique_across_many_recycles(manager, chrome):
+    pool = _pool(manager, spares=2)
+    pool.start_driver()
+    for _ in range(40):
+        pool.after_job("captcha")
+    _settle(pool)
+    # one browser in use and both spares warm, each on its own slot
+    assert pool._free_slots == [] and pool._warm.qsize() == 2
+    assert len(chrome.live) == 3
+    pool.stop_driver()
+    assert chrome.live == set() and chrome.clashes == []
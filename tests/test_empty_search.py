@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+import AsyncScraper
+import GoogleMapsScraper
+from AsyncScraper import _Tab
+from Throttle import PANEL_STATE_FN, PANEL_STATE_JS
+
+EMPTY_LIST = "<div aria-label='Resultados de farmacia'><div class='Nv2PK'></div></div>"
+
+
+@pytest.fixture(autouse=True)
+def _in_tmp(monkeypatch, tmp_path):
+    # the scraper opens its error log in the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(GoogleMapsScraper.time, "sleep", lambda s: None)
+
+
+def _status(scraper):
+    return scraper.journal.conn.execute("SELECT status, found FROM jobs").fetchone()
+
+
+class FakeDriver:
+    def __init__(self, state):
+        self.state = state
+
+    def execute_script(self, js, *args):
+        if js == PANEL_STATE_JS:
+            return self.state
+        return None
+
+    def find_element(self, by, value):
+        return object()
+
+    def get_log(self, kind):
+        return []
+
+
+@pytest.mark.parametrize("state", ["cards", "empty"])
+def test_selenium_records_a_list_without_links_as_done(tmp_path, state):
+    scraper = GoogleMapsScraper.GoogleMapsScraper(None, [], "T", journal_path=str(tmp_path / "j.sqlite"))
+    scraper._navigate = lambda driver, url, timing: "full"
+    scraper._scroll_and_check = lambda panel, **kw: (EMPTY_LIST, scraper.parser.parse(EMPTY_LIST))
+    results, failed = [], []
+    found = scraper._scrape_job(FakeDriver(state), 1, -25.3, -57.6, "farmacia", results, failed)
+    assert (found, failed, scraper.last_outcome) == (0, [], "empty")
+    assert _status(scraper) == ("done", 0)
+
+
+class FakeHandle:
+    def __init__(self, value):
+        self.value = value
+
+    async def json_value(self):
+        return self.value
+
+
+class FakePage:
+    def __init__(self, state):
+        self.state = state
+
+    async def goto(self, url, **kw):
+        pass
+
+    async def wait_for_function(self, fn, **kw):
+        assert fn == PANEL_STATE_FN
+        return FakeHandle(self.state)
+
+    async def query_selector(self, sel):
+        return object()
+
+
+class FakeCDP:
+    def on(self, event, handler):
+        pass
+
+
+@pytest.mark.parametrize("state", ["cards", "empty"])
+def test_async_records_a_list_without_links_as_done(tmp_path, monkeypatch, state):
+    async def no_sleep(s):
+        pass
+
+    monkeypatch.setattr(AsyncScraper.asyncio, "sleep", no_sleep)
+    scraper = AsyncScraper.AsyncScraper("T", journal_path=str(tmp_path / "j.sqlite"))
+
+    async def scroll(panel, s):
+        return EMPTY_LIST, scraper.parser.parse(EMPTY_LIST)
+
+    scraper._scroll_async = scroll
+    tab = _Tab("t0", FakePage(state), FakeCDP())
+    items, found, failed, outcome = asyncio.run(
+        scraper._scrape_job_async(tab, 1, -25.3, -57.6, "farmacia"))
+    assert (items, found, failed, outcome) == ([], 0, False, "empty")
+    assert _status(scraper) == ("done", 0)
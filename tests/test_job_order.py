@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from JobOrder import hilbert_index, mean_hop_m, order_jobs, zorder_index
+
+
+def _grid(side):
+    y, x = np.divmod(np.arange(side * side), side)
+    return x, y
+
+
+@pytest.mark.parametrize("bits", [1, 2, 3, 5])
+def test_hilbert_visits_every_cell_once_in_unit_steps(bits):
+    x, y = _grid(1 << bits)
+    d = hilbert_index(x, y, bits)
+    assert sorted(d.tolist()) == list(range(len(d)))
+    walk = np.argsort(d)
+    steps = np.abs(np.diff(x[walk])) + np.abs(np.diff(y[walk]))
+    assert (steps == 1).all()
+
+
+def test_hilbert_order_two():
+    x, y = _grid(2)
+    assert hilbert_index(x, y, 1).tolist() == [0, 3, 1, 2]   # (0,0) (1,0) (0,1) (1,1)
+
+
+def test_zorder_interleaves_bits():
+    assert zorder_index(np.array([0, 1, 0, 1, 2, 3]), np.array([0, 0, 1, 1, 0, 3])).tolist() \
+        == [0, 1, 2, 3, 4, 15]
+    assert int(zorder_index(np.array([0xFFFF]), np.array([0]))[0]) == 0x55555555
+
+
+def _points(side, step=0.01):
+    return [(-25.3 + i * step, -57.6 + j * step) for i in range(side) for j in range(side)]
+
+
+def test_order_keeps_every_job_and_shortens_hops():
+    jobs = [(lat, lon, kw) for kw in ("farmacia", "tienda") for lat, lon in _points(8)]
+    # a row-major sweep jumps back across the department at the end of every row
+    for curve in ("hilbert", "zorder"):
+        ordered = order_jobs(jobs, curve)
+        assert sorted(ordered) == sorted(jobs)
+        assert mean_hop_m(ordered) < mean_hop_m(jobs)
+    # the Hilbert curve only moves between neighbouring points
+    assert mean_hop_m(order_jobs(jobs, "hilbert")) == pytest.approx(mean_hop_m(jobs[:2]), rel=0.15)
+
+
+def test_by_keyword_groups_keywords_and_by_point_keeps_a_points_jobs_together():
+    jobs = [(lat, lon, kw, 500) for lat, lon in _points(4) for kw in ("tienda", "farmacia")]
+    by_kw = order_jobs(jobs)
+    assert [j[2] for j in by_kw] == ["tienda"] * 16 + ["farmacia"] * 16
+    assert all(len(j) == 4 for j in by_kw)   # extra fields ride along
+
+    by_point = order_jobs(jobs, by_keyword=False)
+    assert all(a[:2] == b[:2] for a, b in zip(by_point[::2], by_point[1::2]))
+
+
+def test_tiers_come_first_and_keep_the_curve_inside():
+    jobs = [(lat, lon, "farmacia") for lat, lon in _points(4)]
+    tiers = [0 if i % 3 else 1 for i in range(len(jobs))]
+    ordered = order_jobs(jobs, tiers=tiers)
+    curve = order_jobs(jobs)
+    for tier in (0, 1):
+        block = [j for j in curve if tiers[jobs.index(j)] == tier]
+        assert ordered[:len(block)] == block
+        ordered = ordered[len(block):]
+
+
+def test_unknown_curve():
+    with pytest.raises(ValueError):
+        order_jobs([(0, 0, "a"), (1, 1, "a")], "peano")
@@ -0,0 +1,37 @@
+from Journal import JobJournal, job_key
+from Main import resume_filter
+
+
+def _journal(tmp_path):
+    return JobJournal(str(tmp_path / "journal.sqlite"))
+
+
+def test_resume_skips_done_and_skipped_jobs(tmp_path):
+    journal = _journal(tmp_path)
+    journal.record(-25.300001, -57.6, "farmacia", "done", [{"link": "a"}], found=3)
+    journal.record(-25.31, -57.6, "farmacia", "failed")
+    journal.record_many([(-25.32, -57.6, "tienda", "skipped", None)])
+    assert journal.completed() == {job_key(-25.3, -57.6, "farmacia"), job_key(-25.32, -57.6, "tienda")}
+    assert journal.failed_jobs() == [job_key(-25.31, -57.6, "farmacia")]
+
+    jobs = [(-25.3, -57.6, "farmacia"), (-25.31, -57.6, "farmacia"), (-25.32, -57.6, "tienda"),
+            (-25.33, -57.6, "tienda")]
+    remaining, prior = resume_filter(jobs, journal)
+    assert remaining == [(-25.31, -57.6, "farmacia"), (-25.33, -57.6, "tienda")]
+    assert prior == [((-25.3, -57.6, "farmacia"), 3), ((-25.32, -57.6, "tienda"), None)]
+    journal.close()
+
+
+def test_retry_replaces_items_and_survives_reopen(tmp_path):
+    journal = _journal(tmp_path)
+    journal.record(-25.3, -57.6, "farmacia", "failed", [{"link": "a"}])
+    journal.record(-25.3, -57.6, "farmacia", "done", [{"link": "b"}, {"link": "c"}], found=2,
+                   places=[1, 2])
+    journal.close()
+
+    journal = _journal(tmp_path)
+    assert journal.failed_jobs() == []
+    assert journal.load_items()["link"].tolist() == ["b", "c"]
+    assert journal.conn.execute("SELECT attempts FROM jobs").fetchone()[0] == 2
+    assert journal.conn.execute("SELECT COUNT(*) FROM places").fetchone()[0] == 2
+    journal.close()
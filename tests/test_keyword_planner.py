@@ -0,0 +1,45 @@
+from Journal import JobJournal
+from KeywordPlanner import KeywordPlanner
+
+CENTRO = (-25.2900, -57.6300)   # farmacia and droguería find the same places
+LUQUE = (-25.2700, -57.4900)    # droguería finds places farmacia does not
+
+
+def _history(tmp_path):
+    journal = JobJournal(str(tmp_path / "journal.sqlite"))
+    for i in range(4):
+        lat, lon = CENTRO[0], CENTRO[1] + i * 0.001
+        shared = [100 * i + p for p in range(5)]
+        journal.record(lat, lon, "farmacia", "done", found=5, places=shared)
+        journal.record(lat, lon, "droguería", "done", found=5, places=shared)
+        lat, lon = LUQUE[0], LUQUE[1] + i * 0.001
+        journal.record(lat, lon, "farmacia", "done", found=5, places=[1000 + 10 * i + p for p in range(5)])
+        journal.record(lat, lon, "droguería", "done", found=5, places=[2000 + 10 * i + p for p in range(5)])
+    journal.close()
+    return KeywordPlanner.from_sources([str(tmp_path / "journal.sqlite")], min_yield=0.5)
+
+
+def test_skip_depends_on_the_points_own_cell(tmp_path):
+    planner = _history(tmp_path)
+    # the same keywords done, two different decisions
+    assert planner.marginal_yield("droguería", {"farmacia"}, *CENTRO) == 0
+    assert planner.marginal_yield("droguería", {"farmacia"}, *LUQUE) == 5
+    assert not planner.should_run("droguería", {"farmacia"}, *CENTRO)
+    assert planner.should_run("droguería", {"farmacia"}, *LUQUE)
+    assert planner.skipped == 1
+
+
+def test_cell_without_history_runs_every_keyword(tmp_path):
+    planner = _history(tmp_path)
+    assert planner.marginal_yield("droguería", {"farmacia"}, -25.5, -57.0) == float("inf")
+    assert planner.should_run("droguería", {"farmacia"}, -25.5, -57.0)
+    assert planner.skipped == 0
+
+
+def test_keyword_never_searched_in_the_cell_runs(tmp_path):
+    journal = JobJournal(str(tmp_path / "journal.sqlite"))
+    journal.record(*CENTRO, "farmacia", "done", found=3, places=[1, 2, 3])
+    journal.record(*LUQUE, "droguería", "done", found=3, places=[1, 2, 3])
+    journal.close()
+    planner = KeywordPlanner.from_sources([str(tmp_path / "journal.sqlite")])
+    assert planner.should_run("droguería", {"farmacia"}, *CENTRO)
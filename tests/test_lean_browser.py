@@ -0,0 +1,61 @@
+import json
+import re
+
+from GoogleMapsScraper import BLOCKED_URL_PATTERNS, DriverManager, search_url
+
+
+def _blocked(url):
+    # Network.setBlockedURLs patterns: '*' is the only wildcard, the rest is literal
+    return any(re.fullmatch(".*".join(map(re.escape, p.split("*"))), url)
+               for p in BLOCKED_URL_PATTERNS)
+
+
+def test_lean_mode_blocks_tiles_photos_and_beacons():
+    for url in (
+        "https://www.google.com/maps/vt?pb=!1m5!1m4!1i14!2i5624",
+        "https://lh5.googleusercontent.com/p/AF1QipN=w80-h106-k-no",
+        "https://maps.gstatic.com/mapfiles/transparent.png",
+        "https://fonts.gstatic.com/s/roboto/v30/KFOmCnqEu92Fr1Mu4mxK.woff2",
+        "https://www.google.com/gen_204?atyp=csi&ei=abc",
+        "https://www.google.com/log?format=json&hasfast=true",
+    ):
+        assert _blocked(url), url
+
+
+def test_lean_mode_keeps_the_search_and_the_app():
+    for url in (
+        search_url("farmacia", -25.29, -57.63, 1000),
+        "https://www.google.com/search?tbm=map&q=farmacia&pb=!4m12",
+        "https://www.google.com/maps/_/js/k=maps.m.es_419.abc/m=sc2,per,mo",
+        "https://www.google.com/maps/preview/place?authuser=0&pb=!1m14",
+    ):
+        assert not _blocked(url), url
+
+
+class FakeDriver:
+    def __init__(self, events):
+        self.events = events
+
+    def get_log(self, kind):
+        assert kind == "performance"
+        entries, self.events = self.events, []
+        return [{"message": json.dumps({"message": {"method": m, "params": p}})} for m, p in entries]
+
+
+def test_network_stats_drain_the_performance_log():
+    manager = DriverManager(lean=True)
+    manager.driver = FakeDriver([
+        ("Network.requestWillBeSent", {"requestId": "1"}),
+        ("Network.loadingFinished", {"encodedDataLength": 1500}),
+        ("Network.loadingFinished", {"encodedDataLength": 500}),
+        ("Network.loadingFailed", {"blockedReason": "inspector"}),
+        ("Network.loadingFailed", {"errorText": "net::ERR_ABORTED"}),
+    ])
+    assert manager.network_stats() == {"bytes": 2000, "requests": 2, "blocked": 1}
+    assert manager.network_stats() == {"bytes": 0, "requests": 0, "blocked": 0}
+
+
+def test_network_stats_off_without_tracking():
+    manager = DriverManager(track_network=False)
+    manager.driver = FakeDriver([("Network.loadingFinished", {"encodedDataLength": 10})])
+    assert manager.network_stats() is None
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from GoogleMapsScraper import clean_text, extract_panel_items
+from ParserBackend import get_backend
+
+PANEL = os.path.join(os.path.dirname(__file__), "fixtures", "panel_sample.html")
+
+
+def _items(name):
+    parser = get_backend(name, clean_text)
+    assert parser.name == name
+    with open(PANEL, encoding="utf-8") as f:
+        doc = parser.parse(f.read())
+    items, n_anchors, outside, _ = extract_panel_items(parser, doc, -25.30, -57.63, "farmacia", 5000)
+    return items, n_anchors, outside
+
+
+def test_lxml_items_match_bs4():
+    ref, n_ref, out_ref = _items("bs4")
+    got, n_got, out_got = _items("lxml")
+    assert (n_got, out_got) == (n_ref, out_ref)
+    assert len(ref) == n_ref == 7
+    assert got == ref
+
+
+@pytest.mark.parametrize("backend", ["bs4", "lxml"])
+def test_missing_rating_and_price(backend):
+    items = {item["name"]: item for item in _items(backend)[0]}
+    # no rating span inside the rating slot
+    assert items["Place 1"]["rating"] == ""
+    # a place without reviews has no rating slot at all
+    assert items["Kiosco Nuevo"]["rating"] == ""
+    assert items["Kiosco Nuevo"]["price"] == ""
+    assert items["Kiosco Nuevo"]["category"] == "Kiosco"
+    assert items["Place 0"]["rating"] and items["Place 2"]["price"]
@@ -0,0 +1,79 @@
+import pytest
+
+import ResultCache
+from ResultCache import cache_key
+
+ITEMS = [{"name": "Farmacia Catedral", "link": "https://www.google.com/maps/place/a"}]
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(ResultCache.time, "time", c)
+    return c
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    c = ResultCache.ResultCache(str(tmp_path / "cache.sqlite"), ttl_s=3600, max_bytes=1 << 20)
+    yield c
+    c.close()
+
+
+def test_key_normalizes_keyword_and_coordinates():
+    assert cache_key(-25.300001, -57.6, "  Farmacia ", 1000) == cache_key(-25.3, -57.6, "farmacia", 1000)
+    assert cache_key(-25.3, -57.6, "farmacia", 1000) != cache_key(-25.3, -57.6, "farmacia", 500)
+
+
+def test_hit_until_the_ttl_runs_out(cache, clock):
+    cache.put(-25.3, -57.6, "farmacia", 1000, "<div>panel</div>", ITEMS, 1)
+    clock.now += 3000
+    assert cache.get(-25.3, -57.6, "Farmacia", 1000) == {"html": "<div>panel</div>", "items": ITEMS,
+                                                        "found": 1}
+    clock.now += 601
+    assert cache.get(-25.3, -57.6, "farmacia", 1000) is None
+    assert (cache.stats["hits"], cache.stats["expired"], cache.stats["misses"]) == (1, 1, 1)
+    # an expired entry is gone, not just hidden
+    assert cache.conn.execute("SELECT COUNT(*) FROM panels").fetchone()[0] == 0
+
+
+def test_parser_change_keeps_the_html_but_drops_the_items(cache):
+    cache.put(-25.3, -57.6, "farmacia", 1000, "<div>panel</div>", ITEMS, 1)
+    cache.conn.execute("UPDATE panels SET fingerprint = 'older-parser'")
+    hit = cache.get(-25.3, -57.6, "farmacia", 1000)
+    assert hit["html"] == "<div>panel</div>" and hit["items"] is None
+    assert cache.stats["reparsed"] == 1
+
+    # the re-extracted items are written back under the current parser
+    cache.put(-25.3, -57.6, "farmacia", 1000, hit["html"], ITEMS, 1, refresh=True)
+    assert cache.get(-25.3, -57.6, "farmacia", 1000)["items"] == ITEMS
+
+
+def test_lru_eviction_keeps_the_recently_used(cache, clock):
+    html = "".join(f"<div>{i:06d}</div>" for i in range(20000))
+    for i in range(4):
+        clock.now += 1
+        cache.put(-25.3 - i / 100, -57.6, "farmacia", 1000, html + str(i), ITEMS, 1)
+    size = cache.conn.execute("SELECT MAX(size) FROM panels").fetchone()[0]
+    cache.max_bytes = int(size * 2.5)
+    clock.now += 1
+    assert cache.get(-25.3, -57.6, "farmacia", 1000) is not None   # oldest entry, now touched
+    assert cache.evict() == 2
+    kept = {row[0] for row in cache.conn.execute("SELECT latitude FROM panels")}
+    assert kept == {-25.3, -25.33}
+
+
+def test_force_refresh_bypasses_reads(tmp_path, clock):
+    cache = ResultCache.ResultCache(str(tmp_path / "cache.sqlite"), force_refresh=True)
+    cache.put(-25.3, -57.6, "farmacia", 1000, "<div/>", ITEMS, 1)
+    assert cache.get(-25.3, -57.6, "farmacia", 1000) is None
+    assert cache.stats["bypassed"] == 1
+    cache.close()
@@ -0,0 +1,48 @@
+import pyarrow.parquet as pq
+
+from ResultSink import ParquetSink, merge_parts
+
+
+def _item(i, kw):
+    lat, lon = -25.3 - (i % 7) * 0.01, -57.6 + (i * 37 % 50) * 0.01
+    return {"latitude": lat, "longitude": lon, "keyword": kw, "name": f"Place {i}",
+            "link": f"https://www.google.com/maps/place/P{i}/!3d{lat}!4d{lon}", "amenities": ["Wi-Fi"]}
+
+
+def test_sink_writes_whole_parts(tmp_path):
+    sink = ParquetSink(str(tmp_path / "parts"), worker_id=1, batch_rows=3)
+    assert not sink.write([_item(0, "a"), _item(1, "a")])
+    assert sink.write([_item(2, "a")])
+    sink.write([_item(3, "a")])
+    sink.close()
+    parts = sorted(p.name for p in (tmp_path / "parts").iterdir())
+    assert len(parts) == 2 and not any(p.endswith(".tmp") for p in parts)
+    assert sink.rows_written == 4
+
+
+def test_merge_drops_cross_part_duplicates_and_sorts(tmp_path):
+    parts = str(tmp_path / "parts")
+    first, second = ParquetSink(parts, "w0", batch_rows=10), ParquetSink(parts, "w1", batch_rows=10)
+    first.write([_item(i, "farmacia") for i in range(0, 60)])
+    second.write([_item(i, "tienda") for i in range(40, 100)])   # 40..59 seen by both
+    first.close()
+    second.close()
+
+    out = str(tmp_path / "merged.parquet")
+    assert merge_parts(parts, out, batch_size=7) == (120, 100)
+    table = pq.read_table(out)
+    assert table.num_rows == 100
+    assert len(set(table.column("link").to_pylist())) == 100
+    keys = list(zip(table.column("longitude").to_pylist(), table.column("latitude").to_pylist()))
+    assert keys == sorted(keys)
+    # a duplicate keeps the row of the part merged first
+    kws = {row["name"]: row["keyword"] for row in table.select(["name", "keyword"]).to_pylist()}
+    assert kws["Place 45"] == "farmacia" and kws["Place 75"] == "tienda"
+    assert not (tmp_path / "merged.parquet.buckets").exists()
+
+
+def test_merge_of_no_parts_writes_an_empty_file(tmp_path):
+    (tmp_path / "parts").mkdir()
+    out = str(tmp_path / "merged.parquet")
+    assert merge_parts(str(tmp_path / "parts"), out) == (0, 0)
+    assert pq.read_table(out).num_rows == 0
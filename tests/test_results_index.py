@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from Geo import haversine_np
+from ResultsIndex import ResultsIndex, coverage_report
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = np.random.default_rng(7)
+    lat = rng.uniform(-25.40, -25.20, 3000)
+    lon = rng.uniform(-57.70, -57.50, 3000)
+    lat[::97] = np.nan   # rows without coordinates are left out of the index
+    return lat, lon
+
+
+@pytest.fixture(scope="module")
+def index(points):
+    return ResultsIndex.from_points(*points)
+
+
+def _brute_radius(points, lat, lon, radius_m):
+    with np.errstate(invalid="ignore"):
+        return np.flatnonzero(haversine_np(lat, lon, *points) <= radius_m)
+
+
+def _brute_bbox(points, min_lat, min_lon, max_lat, max_lon):
+    lat, lon = points
+    with np.errstate(invalid="ignore"):
+        return np.flatnonzero((lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon))
+
+
+def test_nan_rows_are_not_indexed(points, index):
+    assert len(index) == int((~np.isnan(points[0])).sum())
+
+
+@pytest.mark.parametrize("radius_m", [50, 400, 1500, 30_000])
+def test_radius_matches_brute_force(points, index, radius_m):
+    rng = np.random.default_rng(radius_m)
+    # queries inside, on the edge of and outside the indexed area
+    queries = [(-25.30, -57.60), (-25.20, -57.70), (-25.45, -57.45)] \
+        + list(zip(rng.uniform(-25.42, -25.18, 20), rng.uniform(-57.72, -57.48, 20)))
+    for lat, lon in queries:
+        rows, dist = index.radius(lat, lon, radius_m, return_distance=True)
+        assert np.array_equal(np.sort(rows), _brute_radius(points, lat, lon, radius_m))
+        assert (np.diff(dist) >= 0).all()
+        assert np.allclose(dist, haversine_np(lat, lon, points[0][rows], points[1][rows]))
+        assert index.count_within(lat, lon, radius_m) == len(rows)
+
+
+def test_bbox_matches_brute_force(points, index):
+    rng = np.random.default_rng(3)
+    boxes = [(-25.40, -57.70, -25.20, -57.50), (-25.31, -57.61, -25.30, -57.60),
+             (-26.0, -58.0, -25.5, -57.8), (-25.25, -57.55, -25.30, -57.60)]   # outside, inverted
+    for _ in range(20):
+        lat = np.sort(rng.uniform(-25.42, -25.18, 2))
+        lon = np.sort(rng.uniform(-57.72, -57.48, 2))
+        boxes.append((lat[0], lon[0], lat[1], lon[1]))
+    for box in boxes:
+        assert np.array_equal(index.bbox(*box), _brute_bbox(points, *box))
+
+
+def test_cell_counts_cover_every_row(index):
+    cells = index.cell_counts()
+    assert cells["count"].sum() == len(index) and (cells["count"] > 0).all()
+    assert cells["cell"].is_unique
+    m = index.meta
+    # each cell's centre falls in the cell holding its rows
+    first = np.searchsorted(index.cells, cells["cell"].to_numpy())
+    assert (np.abs(cells["latitude"] - index.lat[first]) <= m["dlat"]).all()
+    assert (np.abs(cells["longitude"] - index.lon[first]) <= m["dlon"]).all()
+
+
+def test_empty_index():
+    index = ResultsIndex.from_points([np.nan], [np.nan])
+    assert len(index) == 0
+    assert index.radius(-25.3, -57.6, 1000).tolist() == []
+    assert index.bbox(-26, -58, -25, -57).tolist() == []
+    assert index.cell_counts().empty
+
+
+def test_save_and_load_round_trip(tmp_path, points, index):
+    path = str(tmp_path / "results_T.index.npz")
+    index.save(path)
+    loaded = ResultsIndex.load(path)
+    assert loaded.meta == index.meta
+    assert np.array_equal(loaded.radius(-25.30, -57.60, 1500), index.radius(-25.30, -57.60, 1500))
+    assert np.array_equal(loaded.per_cell, index.per_cell)
+
+
+class FakeJournal:
+    def found_counts(self):
+        return {(-25.30, -57.60, "farmacia"): 110, (-25.30, -57.60, "tienda"): 12,
+                (-25.25, -57.55, "farmacia"): 0, (-25.35, -57.65, "farmacia"): 4,
+                (-25.22, -57.52, "farmacia"): None}   # skipped by the keyword planner
+
+    def failed_jobs(self):
+        return [(-25.35, -57.65, "tienda")]
+
+
+def test_coverage_flags(tmp_path, points, index):
+    grid = tmp_path / "grid.csv"
+    grid.write_text("latitude,longitude\n-25.3,-57.6\n-25.38,-57.68\n")
+    report = coverage_report(index, FakeJournal(), 1000, grid_csv=str(grid)).set_index(["latitude", "longitude"])
+    assert report["flag"].to_dict() == {
+        (-25.30, -57.60): "saturated", (-25.25, -57.55): "empty", (-25.35, -57.65): "failed",
+        (-25.22, -57.52): "unsearched", (-25.38, -57.68): "unsearched"}
+    assert report.loc[(-25.30, -57.60), "saturated"] == "farmacia"
+    assert report.loc[(-25.35, -57.65), "searches"] == 1
+    assert report.loc[(-25.25, -57.55), "places"] == len(_brute_radius(points, -25.25, -57.55, 1000))
@@ -0,0 +1,38 @@
+from Retry import RETRYABLE, RetryScheduler, escalate
+
+
+def test_empty_searches_are_not_retried():
+    assert "empty" not in RETRYABLE
+    assert "timeout" in RETRYABLE
+
+
+def test_failed_job_comes_due_with_next_attempt():
+    sched = RetryScheduler(max_attempts=3, base_delay_s=10, max_delay_s=60)
+    assert sched.failed((-25.3, -57.6, "farmacia", 1000), "timeout", now=0.0)
+    assert sched.due(now=1.0) == []
+    assert sched.due(now=100.0) == [(-25.3, -57.6, "farmacia", 1000, 2)]
+
+
+def test_last_attempt_is_a_dead_letter():
+    sched = RetryScheduler(max_attempts=2)
+    assert not sched.failed((-25.3, -57.6, "farmacia", 1000, 2), "captcha", now=0.0)
+    assert sched.dead == [(-25.3, -57.6, "farmacia", 1000, 2, "captcha")]
+    assert not sched
+
+
+def test_abandon_moves_pending_retries_to_dead_letters():
+    sched = RetryScheduler(max_attempts=3)
+    sched.failed((-25.3, -57.6, "farmacia", 1000), "timeout", now=0.0)
+    sched.failed((-25.4, -57.5, "ferreteria", 1000, 2), "error", now=0.0)
+    assert sched.abandon() == 2
+    assert not sched
+    assert sorted(sched.dead) == [(-25.4, -57.5, "ferreteria", 1000, 2, "error"),
+                                  (-25.3, -57.6, "farmacia", 1000, 1, "timeout")]
+    assert sched.due(now=1e12) == []
+
+
+def test_escalate_scales_settings_per_attempt():
+    base = {"wait_timeout": 20, "scroll_max": 10, "scroll_interval": 1.0, "scroll_timeout": 4}
+    assert escalate(base, 1) == base
+    assert escalate(base, 2)["scroll_max"] == 24
+    assert escalate(base, 9) == escalate(base, 3)
@@ -0,0 +1,86 @@
+import pytest
+
+from GoogleMapsScraper import STALL_WAITS, GoogleMapsScraper, ScrollPacer, _wait_ms
+
+
+@pytest.fixture(autouse=True)
+def _in_tmp(monkeypatch, tmp_path):
+    # the scraper opens its error log in the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+def test_pacer_follows_latency_within_its_bounds():
+    pacer = ScrollPacer(initial_s=1.0, ceiling_s=2.0, floor_s=0.3, alpha=0.5)
+    assert pacer.wait_s() == 2.0            # 3 * 1.0 + 0.2, capped
+    pacer.observe(0.2)
+    assert pacer.latency_s == pytest.approx(0.6)
+    assert pacer.wait_s() == pytest.approx(2.0)
+    for _ in range(20):
+        pacer.observe(0.1)
+    assert pacer.wait_s() == pytest.approx(3 * 0.1 + 0.2, abs=1e-3)
+    for _ in range(20):
+        pacer.observe(0.0)
+    assert pacer.wait_s() == pytest.approx(0.3)
+
+
+def test_retry_wait_is_floored_but_stall_budget_still_holds():
+    pacer = ScrollPacer(initial_s=0.1, ceiling_s=2.0)
+    assert _wait_ms(pacer, 0.0, 4) == 500
+    assert _wait_ms(pacer, 1.5, 4) == 1500
+    # STALL_WAITS empty waits never add up to more than the timeout
+    assert _wait_ms(pacer, 10.0, 4) == 4000 // STALL_WAITS
+
+
+class FakeDriver:
+    """Answers each in-browser wait with the next (cards, size, at_end, waited_ms)."""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.waits_ms = []
+
+    def set_script_timeout(self, s):
+        pass
+
+    def execute_async_script(self, js, panel, cards, end, wait_ms):
+        self.waits_ms.append(wait_ms)
+        return self.answers.pop(0)
+
+
+class FakePanel:
+    def __init__(self, driver):
+        self.parent = driver
+
+    def get_attribute(self, name):
+        return "<div></div>"
+
+
+def _scroll(answers, **kw):
+    scraper = GoogleMapsScraper(None, [], "T", scroll_mode="event", scroll_interval=0.5,
+                                scroll_timeout=4)
+    driver = FakeDriver(answers)
+    scraper._scroll_event(FakePanel(driver), timeout=4, **kw)
+    return scraper, driver
+
+
+def test_stops_at_the_end_of_list_marker():
+    scraper, driver = _scroll([(20, 100, False, 300), (40, 200, False, 300), (45, 220, True, 50)])
+    stats = scraper.scroll_stats[-1]
+    assert (stats["scrolls"], stats["cards"], stats["stop"]) == (3, 45, "end_of_list")
+    assert not driver.answers
+
+
+def test_stops_after_consecutive_empty_waits_only():
+    answers = [(20, 1, False, 300), (20, 1, False, 2000), (30, 1, False, 400),
+               (30, 1, False, 2000), (30, 1, False, 2000), (99, 1, False, 10)]
+    scraper, driver = _scroll(answers)
+    stats = scraper.scroll_stats[-1]
+    assert (stats["scrolls"], stats["cards"], stats["stop"]) == (5, 30, "stall")
+    assert driver.answers == [(99, 1, False, 10)]
+    # only the waits that brought cards teach the pacer
+    assert scraper.pacer.latency_s == pytest.approx(0.5 + 0.2 * (0.3 - 0.5) + 0.2 * (0.4 - 0.46))
+
+
+def test_retries_wait_at_least_their_floor():
+    _, driver = _scroll([(10, 1, False, 100), (10, 1, False, 1500), (10, 1, False, 1500)],
+                        min_wait_s=1.5)
+    assert min(driver.waits_ms) >= 1500
@@ -0,0 +1,157 @@
+import os
+import queue
+
+import pytest
+
+import GoogleMapsScraper
+from GoogleMapsScraper import extract_panel_items
+from Journal import JobJournal
+from SeenSet import SeenSet, place_fingerprints
+from Throttle import PANEL_STATE_JS
+
+
+@pytest.fixture
+def seen():
+    s = SeenSet(capacity=1024)
+    yield s
+    s.close()
+
+
+def test_claim_only_first_time(seen):
+    assert seen.claim([11, 22]).tolist() == [True, True]
+    assert seen.claim([22, 33]).tolist() == [False, True]
+    assert len(seen) == 3
+
+
+def test_contains_adds_nothing(seen):
+    seen.claim([11])
+    assert seen.contains([11, 22]).tolist() == [True, False]
+    assert len(seen) == 1
+    assert seen.claim([22]).tolist() == [True]
+
+
+LINKS = [
+    "https://www.google.com/maps/place/A/data=!4m7!3m6!1s0x1:0x1!8m2!3d-25.30000!4d-57.60000!16s",
+    "https://www.google.com/maps/place/B/data=!4m7!3m6!1s0x2:0x2!8m2!3d-25.30100!4d-57.60100!16s",
+]
+
+
+class FakeParser:
+    """Anchors are links; the card of a link is the link itself."""
+
+    def __init__(self, broken=()):
+        self.broken = set(broken)
+
+    def anchors(self, doc):
+        return list(doc)
+
+    def href(self, anchor):
+        return anchor
+
+    def find_card(self, anchor):
+        return anchor
+
+    def build(self, card, anchor, coords, kw):
+        if anchor in self.broken:
+            raise ValueError("bad card")
+        return {"link": anchor, "keyword": kw}
+
+
+def test_failed_build_leaves_place_unclaimed(seen):
+    items, n, _, skipped = extract_panel_items(
+        FakeParser(broken={LINKS[1]}), LINKS, -25.3, -57.6, "farmacia", 1000, seen=seen)
+    assert [i["link"] for i in items] == [LINKS[0]] and n == 2 and skipped == 0
+    assert seen.contains(place_fingerprints(LINKS)).tolist() == [True, False]
+
+    # the next job that finds it builds it
+    items, _, _, skipped = extract_panel_items(
+        FakeParser(), LINKS, -25.3, -57.6, "tienda", 1000, seen=seen)
+    assert [i["link"] for i in items] == [LINKS[1]] and skipped == 1
+
+
+def test_deferred_claims_leave_the_set_alone(seen):
+    claims = []
+    items, _, _, _ = extract_panel_items(
+        FakeParser(), LINKS, -25.3, -57.6, "farmacia", 1000, seen=seen, claims=claims)
+    assert len(items) == 2 and claims == place_fingerprints(LINKS).tolist()
+    assert len(seen) == 0
+
+
+PANEL = os.path.join(os.path.dirname(__file__), "fixtures", "panel_sample.html")
+
+
+class FakeDriver:
+    def execute_script(self, js, *args):
+        return "cards" if js == PANEL_STATE_JS else None
+
+    def find_element(self, by, value):
+        return object()
+
+
+class FakeManager:
+    mode = "full"
+
+    def start_driver(self):
+        return FakeDriver()
+
+    def after_job(self, outcome=None):
+        return FakeDriver()
+
+    def network_stats(self):
+        return None
+
+    def stop_driver(self):
+        pass
+
+
+class BrokenLink(queue.Queue):
+    """A progress queue whose hand-off fails, like a broker that cannot complete the lease."""
+
+    def put(self, msg, *args, **kwargs):
+        raise ConnectionError("broker unreachable")
+
+
+def _scraper(monkeypatch, tmp_path, seen):
+    monkeypatch.chdir(tmp_path)   # the scraper opens its error log in the working directory
+    monkeypatch.setattr(GoogleMapsScraper.time, "sleep", lambda s: None)
+    scraper = GoogleMapsScraper.GoogleMapsScraper(FakeManager(), [], "T", radius_m=5000,
+                                                  seen=seen.handle(None), journal_path="j.sqlite")
+    scraper._navigate = lambda driver, url, timing: "full"
+    with open(PANEL, encoding="utf-8") as f:
+        html = f.read()
+    scraper._scroll_and_check = lambda panel, **kw: (html, scraper.parser.parse(html))
+    return scraper
+
+
+def _jobs(*jobs):
+    q = queue.Queue()
+    q.put(list(jobs))
+    q.put(None)
+    return q
+
+
+def test_failed_job_leaves_its_places_to_the_retry(monkeypatch, tmp_path, seen):
+    scraper = _scraper(monkeypatch, tmp_path, seen)
+    real_store = scraper._store_in_cache
+
+    def store_fails_once(*args):
+        scraper._store_in_cache = real_store
+        raise OSError("disk full")
+
+    scraper._store_in_cache = store_fails_once   # raises after the items are built
+    progress = queue.Queue()
+    df, failed = scraper.scrape_queue(_jobs((-25.30, -57.63, "farmacia"), (-25.30, -57.63, "farmacia")),
+                                      progress)
+    assert failed == [(-25.30, -57.63, "farmacia")]
+    # the retry built every place again, and is the one holding the rows
+    assert len(df) == 7 and len(seen) == 7
+    journal = JobJournal(str(tmp_path / "j.sqlite"))
+    assert journal.conn.execute("SELECT status, n_items FROM jobs").fetchall() == [("done", 7)]
+    journal.close()
+
+
+def test_places_are_claimed_only_after_the_hand_off(monkeypatch, tmp_path, seen):
+    scraper = _scraper(monkeypatch, tmp_path, seen)
+    with pytest.raises(ConnectionError):
+        scraper.scrape_queue(_jobs((-25.30, -57.63, "farmacia")), BrokenLink())
+    assert len(seen) == 0   # the job's lease runs out and its retry finds the places open
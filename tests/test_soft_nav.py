@@ -0,0 +1,47 @@
+import pytest
+
+from GoogleMapsScraper import _ANCHOR_HREFS_JS, _SOFT_NAV_JS, GoogleMapsScraper
+from Metrics import JobTiming
+
+
+@pytest.fixture(autouse=True)
+def _in_tmp(monkeypatch, tmp_path):
+    # the scraper opens its error log in the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+class FakeDriver:
+    """Shows ``lists[i]`` as the result links after the i-th in-page move."""
+
+    def __init__(self, lists):
+        self.lists = lists
+        self.moves = 0
+        self.gets = 0
+
+    def execute_script(self, js, *args):
+        if js == _SOFT_NAV_JS:
+            self.moves += 1
+            return True
+        assert js == _ANCHOR_HREFS_JS
+        return self.lists[min(self.moves, len(self.lists) - 1)]
+
+    def get(self, url):
+        self.gets += 1
+
+
+def _navigate(driver):
+    scraper = GoogleMapsScraper(None, [], "T", nav_mode="soft", soft_nav_timeout=1.5)
+    scraper._live_driver = driver
+    return scraper._navigate(driver, "https://www.google.com/maps/search/x", JobTiming())
+
+
+def test_new_list_with_the_same_top_result_is_a_soft_move():
+    driver = FakeDriver([["a", "b", "c"], ["a", "d", "e"]])
+    assert _navigate(driver) == "soft"
+    assert driver.gets == 0
+
+
+def test_unchanged_list_falls_back_to_a_full_load():
+    driver = FakeDriver([["a", "b", "c"], ["c", "b", "a"]])
+    assert _navigate(driver) == "fallback"
+    assert driver.gets == 1
@@ -0,0 +1,51 @@
+from Throttle import AIMDController, classify_failure
+
+
+class TimeoutException(Exception):
+    pass
+
+
+SEARCH_URL = "https://www.google.com/maps/search/farmacia/@-25.3,-57.6,1000m"
+
+
+def test_classify_captcha_and_consent_pages():
+    assert classify_failure(TimeoutException(), ("https://www.google.com/sorry/index", "", "")) == "captcha"
+    assert classify_failure(None, ("https://consent.google.com/ml", "Antes de ir a Google", "")) == "consent"
+
+
+def test_classify_no_results_message_as_empty():
+    page = (SEARCH_URL, "Google Maps", "Google Maps no puede encontrar farmacia")
+    assert classify_failure(TimeoutException(), page) == "empty"
+
+
+def test_classify_place_page_as_empty():
+    page = ("https://www.google.com/maps/place/Farmacia+Catedral/@-25.28,-57.63,17z", "Farmacia", "")
+    assert classify_failure(TimeoutException(), page) == "empty"
+
+
+def test_classify_slow_page_as_timeout():
+    assert classify_failure(TimeoutException(), (SEARCH_URL, "Google Maps", "Cargando...")) == "timeout"
+    assert classify_failure(TimeoutException()) == "timeout"
+    assert classify_failure(ValueError("boom")) == "error"
+
+
+def test_empty_searches_do_not_back_off():
+    ctl = AIMDController(8, window=20, timeout_share=0.3)
+    assert not any(ctl.observe("empty", now=float(t)) for t in range(40))
+    assert ctl.state()["active"] == 8
+    assert ctl.state()["delay_s"] == 0.0
+
+
+def test_timeouts_back_off_once_per_cooldown():
+    ctl = AIMDController(8, window=20, timeout_share=0.3, cooldown_s=60)
+    changed = [ctl.observe("ok" if t % 2 else "timeout", now=float(t)) for t in range(20)]
+    assert changed.count(True) == 1
+    assert ctl.state()["active"] == 4
+    assert ctl.state()["delay_s"] > 0
+
+
+def test_captcha_pauses_every_worker():
+    ctl = AIMDController(8, pause_s=120)
+    assert ctl.observe("captcha", now=1000.0)
+    assert ctl.state()["pause_until"] == 1120.0
+    assert ctl.state()["active"] == 4
@@ -0,0 +1,67 @@
+import json
+
+import pandas as pd
+import pytest
+
+from Metrics import JobTiming, MetricsWriter
+from YieldPlanner import YieldPlanner, load_history
+
+# points in cells of their own: expected new places and seconds per search
+HISTORY = {(-25.30, -57.60): (40, 10), (-25.35, -57.60): (20, 40),
+           (-25.40, -57.60): (10, 10), (-25.45, -57.60): (1, 10)}
+UNSEEN = (-25.50, -57.60)
+
+
+def _planner(**kwargs):
+    hist = pd.DataFrame([{"latitude": lat, "longitude": lon, "keyword": "farmacia",
+                          "new": new, "duration_s": dur} for (lat, lon), (new, dur) in HISTORY.items()])
+    return YieldPlanner(hist, prior_n=0, **kwargs)
+
+
+def _jobs():
+    return [(lat, lon, "farmacia") for lat, lon in list(HISTORY) + [UNSEEN]]
+
+
+def _points(jobs):
+    return [j[:2] for j in jobs]
+
+
+def test_plan_orders_by_yield_in_tiers_and_logs_an_eta():
+    planner = _planner()
+    ordered, tiers = planner.plan(_jobs(), workers=2)
+    # the unseen point gets the keyword's mean, 17.75 places in 17.5 s
+    assert _points(ordered) == [(-25.30, -57.60), (-25.35, -57.60), UNSEEN,
+                                (-25.40, -57.60), (-25.45, -57.60)]
+    assert tiers == [0, 0, 1, 2, 3]
+    assert planner.eta_s == pytest.approx((10 + 40 + 17.5 + 10 + 10) / 2)
+
+
+def test_min_yield_drops_the_poor_jobs():
+    ordered, tiers = _planner(min_yield=5).plan(_jobs())
+    assert (-25.45, -57.60) not in _points(ordered) and len(ordered) == len(tiers) == 4
+
+
+def test_budget_keeps_the_best_places_per_second():
+    planner = _planner(budget_s=60)
+    ordered, _ = planner.plan(_jobs(), workers=1)
+    # by places per second: 4.0, 1.01, 1.0 fit in 37.5 s; the 40 s search does not
+    assert _points(ordered) == [(-25.30, -57.60), UNSEEN, (-25.40, -57.60)]
+    assert planner.eta_s == pytest.approx(37.5)
+    # two workers have 120 s between them: every job fits
+    assert len(_planner(budget_s=60).plan(_jobs(), workers=2)[0]) == 5
+
+
+def test_history_is_read_per_city_and_radius(tmp_path):
+    for city, radius_m, new in (("ASUNCIÓN", 1000, 40), ("ASUNCIÓN", 500, 7), ("CENTRAL", 1000, 3)):
+        writer = MetricsWriter(str(tmp_path), f"{city}-{radius_m}", city=city, radius_m=radius_m)
+        writer.record(JobTiming(), -25.30, -57.60, "farmacia", "ok", new, new)
+        writer.close()
+    with open(tmp_path / "jobs-old-1.jsonl", "w", encoding="utf-8") as fh:   # before records were tagged
+        fh.write(json.dumps({"ts": 0, "worker": 0, "latitude": -25.30, "longitude": -57.60,
+                             "keyword": "farmacia", "outcome": "ok", "found": 9, "items": 9,
+                             "total_s": 1.0, "phases": {}}) + "\n")
+
+    assert sorted(load_history([str(tmp_path)])["new"]) == [3, 7, 9, 40]
+    assert load_history([str(tmp_path)], "ASUNCIÓN", 1000)["new"].tolist() == [40]
+    assert load_history([str(tmp_path)], "CENTRAL")["new"].tolist() == [3]
+    assert YieldPlanner.from_sources([str(tmp_path)], city="ITAPÚA", radius_m=1000) is None